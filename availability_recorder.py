@@ -0,0 +1,378 @@
+"""
+鲸介12306 抢票助手 - 余票变化记录
+
+开启 record_file 后，每轮轮询解析出的车次表都追加写入一个紧凑的二进制文件，
+事后可据此回看开售期间余票如何变化，也可交给 sale_simulator 重放，比较策略与刷新间隔。
+
+文件格式（整数均为 LEB128 变长编码，带符号数先做 zigzag）：
+    文件头  b'AVR1' + 席别列数 + 起始时间（Unix 毫秒）
+    0x01    车次定义：长度 + 'G1234|07:00|08:30'，编号按出现顺序从 0 递增（字符串表）
+    0x02    一轮轮询：距上一轮的毫秒数 + 变化行数，每个变化行为
+            车次编号 + 标志（bit0 可预订，bit1 已从结果中消失）+ 变化席别位图 + 各变化席别的张数差值
+    0x03    备注：键 + 值（线路、乘车日期、开售时间等）
+只写相对上一轮变化的行，余票不变的轮询只占 3~4 字节，连续记录 10 小时通常只有几 MB；
+写入端只保留上一轮状态，内存占用与记录时长无关。读取端 read_frames 按块读取、逐轮生成，
+末尾因中断而不完整的记录自动忽略。
+
+    python availability_recorder.py stats avail.bin      # 概要：轮数、车次数、时长、每轮字节数
+    python availability_recorder.py dump avail.bin -n 20 # 逐轮打印变化
+
+开源协议：MIT License
+"""
+import argparse
+import os
+import sys
+import time
+from collections import namedtuple
+from datetime import datetime
+
+from train_table import SEAT_CLASSES, SEAT_PLENTY, TrainRow, TrainTable
+
+MAGIC = b'AVR1'
+TAG_TRAIN, TAG_POLL, TAG_NOTE = 1, 2, 3
+FLAG_BOOKABLE, FLAG_GONE = 1, 2
+# 写入缓冲达到该字节数或距上次写盘超过 FLUSH_SECONDS 时写盘
+FLUSH_BYTES = 4096
+FLUSH_SECONDS = 1.0
+_READ_CHUNK = 1 << 16
+# dump 每轮最多列出的车次数
+DUMP_MAX_TRAINS = 8
+
+
+def _varint(out, n):
+    while n > 0x7F:
+        out.append((n & 0x7F) | 0x80)
+        n >>= 7
+    out.append(n)
+
+
+def _zigzag(n):
+    return n << 1 if n >= 0 else ((-n) << 1) - 1
+
+
+def _unzigzag(n):
+    return (n >> 1) if not n & 1 else -((n + 1) >> 1)
+
+
+def _text(out, s):
+    data = s.encode('utf-8')
+    _varint(out, len(data))
+    out += data
+
+
+class AvailabilityRecorder:
+    """把每轮车次表的变化追加写入 path；同一文件可多次追加（每次打开写一个新的文件头）"""
+
+    def __init__(self, path, n_classes=len(SEAT_CLASSES)):
+        self.path = path
+        self.n_classes = n_classes
+        self._f = open(path, 'ab')
+        self._buf = bytearray(MAGIC)
+        self._last_ms = int(time.time() * 1000)
+        _varint(self._buf, n_classes)
+        _varint(self._buf, self._last_ms)
+        self._ids = {}
+        self._state = {}
+        self._flushed_at = time.monotonic()
+        self.polls = 0
+        self.bytes = 0
+
+    def note(self, key, value):
+        """写入一条备注（如 route、date、sale_start）"""
+        self._buf.append(TAG_NOTE)
+        _text(self._buf, str(key))
+        _text(self._buf, str(value))
+
+    def _train_id(self, row):
+        tid = self._ids.get(row.train)
+        if tid is None:
+            tid = self._ids[row.train] = len(self._ids)
+            self._buf.append(TAG_TRAIN)
+            _text(self._buf, f'{row.train}|{row.depart or ""}|{row.arrive or ""}')
+        return tid
+
+    def record(self, table, at=None):
+        """记录一轮轮询后的车次表（TrainTable），at 为读取时刻（time.time()）"""
+        at_ms = int((time.time() if at is None else at) * 1000)
+        n = self.n_classes
+        prev = self._state
+        state = {}
+        changes = bytearray()
+        count = 0
+        for row in table.rows:
+            avail = row.avail[:n]
+            if len(avail) < n:
+                avail = avail + (0,) * (n - len(avail))
+            cur = (row.book is not None, avail)
+            state[row.train] = cur
+            old = prev.get(row.train)
+            if old == cur:
+                continue
+            old_avail = old[1] if old is not None else (0,) * n
+            mask = 0
+            for i in range(n):
+                if avail[i] != old_avail[i]:
+                    mask |= 1 << i
+            _varint(changes, self._train_id(row))
+            changes.append(FLAG_BOOKABLE if cur[0] else 0)
+            _varint(changes, mask)
+            for i in range(n):
+                if mask >> i & 1:
+                    _varint(changes, _zigzag(avail[i] - old_avail[i]))
+            count += 1
+        for train in prev.keys() - state.keys():
+            _varint(changes, self._ids[train])
+            changes.append(FLAG_GONE)
+            count += 1
+        self._state = state
+        buf = self._buf
+        buf.append(TAG_POLL)
+        _varint(buf, _zigzag(at_ms - self._last_ms))
+        _varint(buf, count)
+        buf += changes
+        self._last_ms = at_ms
+        self.polls += 1
+        if len(buf) >= FLUSH_BYTES or time.monotonic() - self._flushed_at >= FLUSH_SECONDS:
+            self.flush()
+
+    def flush(self):
+        if self._buf:
+            self._f.write(self._buf)
+            self._f.flush()
+            self.bytes += len(self._buf)
+            self._buf = bytearray()
+        self._flushed_at = time.monotonic()
+
+    def close(self):
+        try:
+            self.flush()
+            self._f.close()
+        except OSError as e:
+            print(f'写入余票记录失败: {e}')
+
+
+class NullRecorder:
+    """未开启记录时使用，所有操作为空"""
+
+    def note(self, key, value):
+        pass
+
+    def record(self, table, at=None):
+        pass
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+
+NULL_RECORDER = NullRecorder()
+
+
+def make_recorder(params, tag=None):
+    """record_file 为空（默认）时不记录；tag 附加在文件名后，用于区分并行窗口"""
+    path = params.get('record_file')
+    if not path:
+        return NULL_RECORDER
+    if tag:
+        root, ext = os.path.splitext(path)
+        path = f'{root}-{tag}{ext}'
+    try:
+        return AvailabilityRecorder(path)
+    except OSError as e:
+        print(f'无法打开余票记录文件 {path}: {e}')
+        return NULL_RECORDER
+
+
+# 一轮轮询：at 为读取时刻（Unix 秒），rows 为 {车次: TrainRow}（读取端原地更新，需要保留时请复制），
+# changed 为本轮变化的车次号，notes 为截至本轮读到的备注
+Frame = namedtuple('Frame', 'at rows changed notes')
+
+
+def _seat_text(n):
+    return '有' if n >= SEAT_PLENTY else (str(n) if n > 0 else '无')
+
+
+def frame_table(frame):
+    """把 Frame 转为 TrainTable，可直接交给 train_table 中的各策略 pick"""
+    return TrainTable(list(frame.rows.values()))
+
+
+class _Stream:
+    """按块读取的字节流；读到文件末尾抛出 EOFError"""
+
+    def __init__(self, f):
+        self._f = f
+        self._buf = b''
+        self._pos = 0
+
+    def _fill(self, need):
+        rest = self._buf[self._pos:]
+        while len(rest) < need:
+            chunk = self._f.read(_READ_CHUNK)
+            if not chunk:
+                raise EOFError
+            rest += chunk
+        self._buf, self._pos = rest, 0
+
+    def byte(self):
+        if self._pos >= len(self._buf):
+            self._fill(1)
+        b = self._buf[self._pos]
+        self._pos += 1
+        return b
+
+    def varint(self):
+        n = shift = 0
+        while True:
+            b = self.byte()
+            n |= (b & 0x7F) << shift
+            if b < 0x80:
+                return n
+            shift += 7
+
+    def take(self, size):
+        if self._pos + size > len(self._buf):
+            self._fill(size)
+        data = self._buf[self._pos:self._pos + size]
+        self._pos += size
+        return data
+
+    def text(self):
+        return self.take(self.varint()).decode('utf-8')
+
+    def peek_magic(self):
+        try:
+            if self._pos + len(MAGIC) > len(self._buf):
+                self._fill(len(MAGIC))
+        except EOFError:
+            return False
+        return self._buf[self._pos:self._pos + len(MAGIC)] == MAGIC
+
+
+def read_frames(path):
+    """逐轮读取记录文件，生成 Frame；多次追加的记录段按顺序连续读出"""
+    with open(path, 'rb') as f:
+        s = _Stream(f)
+        n = 0
+        last_ms = 0
+        trains = []
+        avails = {}
+        rows = {}
+        notes = {}
+        try:
+            while True:
+                if s.peek_magic():
+                    s.take(len(MAGIC))
+                    n = s.varint()
+                    last_ms = s.varint()
+                    trains, avails, rows = [], {}, {}
+                    continue
+                tag = s.byte()
+                if tag == TAG_TRAIN:
+                    trains.append(tuple(s.text().split('|', 2)))
+                elif tag == TAG_NOTE:
+                    key = s.text()
+                    notes[key] = s.text()
+                elif tag == TAG_POLL:
+                    last_ms += _unzigzag(s.varint())
+                    changed = []
+                    for _ in range(s.varint()):
+                        tid = s.varint()
+                        flags = s.byte()
+                        train, depart, arrive = trains[tid]
+                        changed.append(train)
+                        if flags & FLAG_GONE:
+                            rows.pop(train, None)
+                            avails.pop(train, None)
+                            continue
+                        mask = s.varint()
+                        avail = list(avails.get(train) or (0,) * n)
+                        for i in range(n):
+                            if mask >> i & 1:
+                                avail[i] += _unzigzag(s.varint())
+                        avail = tuple(avail)
+                        avails[train] = avail
+                        rows[train] = TrainRow(train, depart or None, arrive or None,
+                                               tuple(_seat_text(c) for c in avail),
+                                               train if flags & FLAG_BOOKABLE else None)
+                    yield Frame(last_ms / 1000, rows, tuple(changed), notes)
+                else:
+                    raise ValueError(f'{path} 中出现未知记录类型 {tag}')
+        except EOFError:
+            return
+
+
+def summarize(path):
+    """统计记录文件：轮数、车次数、时长，以及每个车次首次出现余票的时刻"""
+    polls = 0
+    first_at = last_at = None
+    first_open = {}
+    trains = set()
+    notes = {}
+    for frame in read_frames(path):
+        polls += 1
+        first_at = frame.at if first_at is None else first_at
+        last_at = frame.at
+        notes = frame.notes
+        for train in frame.changed:
+            row = frame.rows.get(train)
+            if row is None:
+                continue
+            trains.add(train)
+            if row.bookable and any(row.avail) and train not in first_open:
+                first_open[train] = frame.at
+    return {'polls': polls, 'trains': len(trains), 'first_at': first_at, 'last_at': last_at,
+            'bytes': os.path.getsize(path), 'first_open': first_open, 'notes': dict(notes)}
+
+
+def _clock(ts):
+    return datetime.fromtimestamp(ts).strftime('%H:%M:%S.%f')[:-3]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='余票变化记录查看')
+    sub = parser.add_subparsers(dest='command', required=True)
+    p = sub.add_parser('stats', help='记录概要与各车次首次出现余票的时刻')
+    p.add_argument('file')
+    p = sub.add_parser('dump', help='逐轮打印变化的车次')
+    p.add_argument('file')
+    p.add_argument('-n', '--limit', type=int, default=0, help='最多打印的轮数（0 为全部）')
+    args = parser.parse_args(argv)
+
+    if args.command == 'stats':
+        st = summarize(args.file)
+        if not st['polls']:
+            print(f'{args.file} 中没有轮询记录')
+            return 1
+        span = st['last_at'] - st['first_at']
+        for key, value in st['notes'].items():
+            print(f'{key}: {value}')
+        print(f"{st['polls']} 轮，{st['trains']} 个车次，时长 {span:.1f}s，"
+              f"{st['bytes']} 字节（{st['bytes'] / st['polls']:.1f} 字节/轮）")
+        for train, at in sorted(st['first_open'].items(), key=lambda kv: kv[1]):
+            print(f'  {_clock(at)}  {train}')
+    else:
+        shown = 0
+        for frame in read_frames(args.file):
+            if not frame.changed:
+                continue
+            parts = []
+            for train in frame.changed[:DUMP_MAX_TRAINS]:
+                row = frame.rows.get(train)
+                if row is None:
+                    parts.append(f'{train}(消失)')
+                else:
+                    seats = ' '.join(f'{SEAT_CLASSES[i]}{_seat_text(c)}' for i, c in enumerate(row.avail) if c)
+                    parts.append(f"{train}{'' if row.bookable else '(不可订)'} {seats}".rstrip())
+            more = len(frame.changed) - DUMP_MAX_TRAINS
+            print(f"{_clock(frame.at)}  {'；'.join(parts)}{f' 等 {len(frame.changed)} 个车次' if more > 0 else ''}")
+            shown += 1
+            if args.limit and shown >= args.limit:
+                break
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
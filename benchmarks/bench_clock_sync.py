@@ -0,0 +1,59 @@
+"""
+鲸介12306 抢票助手 - 服务器时钟同步精度测试
+
+本地 FakeSiteServer 的 Date 响应头按 --skew 偏离本机时钟（只精确到秒，与真实站点相同），
+对每个偏差运行一次 sync_server_clock，报告估计偏差、实际误差、估计的不确定度、样本数和同步耗时。
+--delay-ms 为服务端处理每个请求前的等待，模拟较长的往返时间：误差应始终落在不确定度之内，
+不确定度随往返时间增大。
+
+用法：
+    python benchmarks/bench_clock_sync.py [--skew -2.345 0 0.739 3.6] [--delay-ms 0 10]
+
+开源协议：MIT License
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from fake_site import FakeSite, FakeSiteServer
+from server_clock import sync_server_clock
+
+
+def measure(skew, delay):
+    """返回 (ServerClock, 同步耗时秒)"""
+    with FakeSiteServer(FakeSite(rows=5), delay=delay, clock_skew=skew) as server:
+        t0 = time.perf_counter()
+        clock = sync_server_clock(server.base_url + '/otn/')
+        return clock, time.perf_counter() - t0
+
+
+def main():
+    parser = argparse.ArgumentParser(description='服务器时钟同步：估计偏差与实际偏差对比')
+    parser.add_argument('--skew', type=float, nargs='+', default=[-2.345, 0.0, 0.739, 3.6],
+                        help='服务器时钟相对本机的偏差（秒）')
+    parser.add_argument('--delay-ms', type=float, nargs='+', default=[0.0, 10.0], help='服务端处理延迟')
+    args = parser.parse_args()
+
+    print(f"{'实际ms':>10}{'延迟ms':>8}{'估计ms':>12}{'误差ms':>9}{'±ms':>8}{'样本':>6}{'耗时s':>8}")
+    worst = 0.0
+    for delay_ms in args.delay_ms:
+        for skew in args.skew:
+            clock, elapsed = measure(skew, delay_ms / 1000)
+            err = (clock.offset - skew) * 1000
+            unc = (clock.uncertainty or 0.0) * 1000
+            worst = max(worst, abs(err) - unc)
+            print(f'{skew * 1000:>10.0f}{delay_ms:>8.0f}{clock.offset * 1000:>12.1f}{err:>+9.2f}{unc:>8.2f}'
+                  f'{clock.samples:>6}{elapsed:>8.1f}')
+    if worst > 0:
+        print(f'⚠ 有样本的误差超出估计的不确定度 {worst:.2f}ms')
+        return 1
+    print('✓ 所有误差都在估计的不确定度之内')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
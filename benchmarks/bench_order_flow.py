@@ -0,0 +1,103 @@
+"""
+鲸介12306 抢票助手 - 下单流程基准测试
+
+在本地订单页夹具上对比原固定 sleep 流程与 OrderFlow 状态机的端到端耗时，
+并输出状态机每一步的耗时。不访问 12306。
+
+用法：
+    python benchmarks/bench_order_flow.py [--browser edge|chrome] [--headless] [--rounds 5]
+
+开源协议：MIT License
+"""
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.webdriver.support.ui import Select, WebDriverWait
+
+from bench_snapshot import make_driver
+from booking_core import select_seat_fast
+from order_flow import OrderFlow
+
+FIXTURE = ROOT / 'benchmarks' / 'fixtures' / 'order_confirm.html'
+
+SCENARIOS = [
+    ('成人票+选座', 'adult', ''),
+    ('成人票/无选座', 'adult', 'seat=0'),
+    ('学生票+选座', 'student', 'student=1'),
+    ('成人票2人+选座', 'adult', 'passengers=2'),
+]
+
+
+def legacy_flow(driver, params):
+    """原 run_booking_with_driver 中的下单步骤（固定 sleep / 超时）"""
+    def quiet(fn):
+        try:
+            fn()
+        except Exception:
+            pass
+
+    quiet(lambda: WebDriverWait(driver, 5).until(EC.element_to_be_clickable((By.ID, 'normalPassenger_0'))).click())
+    quiet(lambda: WebDriverWait(driver, 1).until(EC.element_to_be_clickable((By.ID, 'dialog_xsertcj_ok'))).click())
+    if params['ticket_type'] == 'adult':
+        quiet(lambda: Select(WebDriverWait(driver, 1).until(
+            EC.presence_of_element_located((By.ID, 'ticketType_1')))).select_by_value('1'))
+    quiet(lambda: WebDriverWait(driver, 5).until(EC.element_to_be_clickable((By.ID, 'submitOrder_id'))).click())
+    time.sleep(0.4)
+    if params['ticket_type'] == 'student':
+        quiet(lambda: WebDriverWait(driver, 6).until(
+            EC.element_to_be_clickable((By.ID, 'qd_closeDefaultWarningWindowDialog_id'))).click())
+    select_seat_fast(driver, preferred_type=params.get('seat_position_preference', 'first'))
+    time.sleep(0.8)
+    quiet(lambda: WebDriverWait(driver, 8).until(EC.element_to_be_clickable((By.ID, 'qr_submit_id'))).click())
+    return driver.title == 'DONE'
+
+
+def state_machine_flow(driver, params):
+    flow = OrderFlow(driver, params, seat_selector=select_seat_fast)
+    ok = flow.run() and driver.title == 'DONE'
+    state_machine_flow.last_report = flow.report()
+    return ok
+
+
+def run_case(driver, url, fn, params, rounds):
+    times, oks = [], 0
+    for _ in range(rounds):
+        driver.get(url)
+        t0 = time.perf_counter()
+        oks += bool(fn(driver, params))
+        times.append((time.perf_counter() - t0) * 1000)
+    return oks, times
+
+
+def main():
+    parser = argparse.ArgumentParser(description='下单流程：固定 sleep vs 状态机')
+    parser.add_argument('--browser', choices=['edge', 'chrome'], default='edge')
+    parser.add_argument('--headless', action='store_true')
+    parser.add_argument('--rounds', type=int, default=5)
+    args = parser.parse_args()
+
+    driver = make_driver(args.browser, args.headless)
+    try:
+        print(f"{'场景':<16}{'方式':<10}{'完成':>6}{'p50 ms':>10}{'max ms':>10}")
+        for name, ticket_type, query in SCENARIOS:
+            url = FIXTURE.as_uri() + (f'?{query}' if query else '')
+            params = {'ticket_type': ticket_type, 'seat_position_preference': 'window',
+                      'passenger_count': 2 if 'passengers=2' in query else 1}
+            for label, fn in (('固定sleep', legacy_flow), ('状态机', state_machine_flow)):
+                oks, times = run_case(driver, url, fn, params, args.rounds)
+                print(f'{name:<16}{label:<10}{oks:>3}/{args.rounds:<2}{statistics.median(times):>10.0f}{max(times):>10.0f}')
+            print(f'  {state_machine_flow.last_report}')
+    finally:
+        driver.quit()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,145 @@
+"""
+鲸介12306 抢票助手 - 精简模式页面加载基准测试
+
+本地启动一个资源较重的模拟页面（图片、字体、样式、慢速统计脚本），
+分别用默认设置和精简模式（eager 加载 + DevTools URL 屏蔽）打开，
+统计每次导航 driver.get 耗时、DOMContentLoaded 时间以及服务端实际发送的字节数和请求数。
+
+用法：
+    python benchmarks/bench_page_load.py [--browser edge|chrome] [--headless] [--rounds 5]
+
+开源协议：MIT License
+"""
+import argparse
+import statistics
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from selenium import webdriver
+
+from browser_session import apply_lean_mode, block_patterns
+
+IMAGES = 24
+IMAGE_BYTES = 30 * 1024
+FONT_BYTES = 80 * 1024
+RESOURCE_DELAY = 0.03  # 每个静态资源的服务端延迟（秒）
+ANALYTICS_DELAY = 0.4  # 统计脚本的服务端延迟（秒）
+
+_PAGE = """<!DOCTYPE html>
+<html lang="zh-CN"><head><meta charset="utf-8"><title>模拟重页面</title>
+<link rel="stylesheet" href="/static/site.css">
+<script src="/hm.baidu.com/hm.js"></script>
+</head><body>
+<table><tbody id="queryLeftTable"><tr><td>G1234</td><td>07:00</td></tr></tbody></table>
+{images}
+</body></html>
+"""
+
+_CSS = """@font-face {{ font-family: f1; src: url(/static/f1.woff2); }}
+@font-face {{ font-family: f2; src: url(/static/f2.ttf); }}
+body {{ font-family: f1, f2, sans-serif; }}
+{pad}
+"""
+
+
+class CountingHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    wbufsize = -1
+    stats = {'requests': 0, 'bytes': 0}
+    lock = threading.Lock()
+
+    def do_GET(self):
+        path = self.path.split('?', 1)[0]
+        if path == '/page':
+            images = '\n'.join(f'<img src="/static/img{i}.png" width="64" height="64">' for i in range(IMAGES))
+            body, ctype, delay = _PAGE.format(images=images).encode('utf-8'), 'text/html; charset=utf-8', 0.0
+        elif path == '/static/site.css':
+            body, ctype, delay = _CSS.format(pad='/*' + 'x' * 20000 + '*/').encode(), 'text/css', RESOURCE_DELAY
+        elif path.endswith('.png'):
+            body, ctype, delay = b'\x89PNG' + b'\0' * IMAGE_BYTES, 'image/png', RESOURCE_DELAY
+        elif path.endswith(('.woff2', '.ttf')):
+            body, ctype, delay = b'\0' * FONT_BYTES, 'font/woff2', RESOURCE_DELAY
+        elif path.endswith('hm.js'):
+            body, ctype, delay = b'var _hmt = [];' + b' ' * 4096, 'application/javascript', ANALYTICS_DELAY
+        else:
+            body, ctype, delay = b'not found', 'text/plain', 0.0
+        time.sleep(delay)
+        self.send_response(200 if body != b'not found' else 404)
+        self.send_header('Content-Type', ctype)
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Cache-Control', 'no-store')
+        self.end_headers()
+        self.wfile.write(body)
+        with self.lock:
+            self.stats['requests'] += 1
+            self.stats['bytes'] += len(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def make_driver(browser, headless, lean):
+    options = webdriver.ChromeOptions() if browser == 'chrome' else webdriver.EdgeOptions()
+    if headless:
+        options.add_argument('--headless=new')
+    if lean:
+        options.page_load_strategy = 'eager'
+    driver = webdriver.Chrome(options=options) if browser == 'chrome' else webdriver.Edge(options=options)
+    if lean:
+        apply_lean_mode(driver, block_patterns())
+    return driver
+
+
+def measure(driver, url, rounds, settle=1.0):
+    """每轮：清零计数 → driver.get → 等待残余请求完成，返回 (get 耗时, DCL 耗时, 字节, 请求数) 列表"""
+    out = []
+    for _ in range(rounds):
+        with CountingHandler.lock:
+            CountingHandler.stats.update(requests=0, bytes=0)
+        t0 = time.perf_counter()
+        driver.get(url)
+        get_ms = (time.perf_counter() - t0) * 1000
+        dcl_ms = driver.execute_script(
+            "var n = performance.getEntriesByType('navigation')[0];"
+            "return n ? n.domContentLoadedEventEnd - n.startTime : null;")
+        time.sleep(settle)
+        with CountingHandler.lock:
+            out.append((get_ms, dcl_ms or 0.0, CountingHandler.stats['bytes'], CountingHandler.stats['requests']))
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser(description='默认加载 vs 精简模式 页面加载基准测试')
+    parser.add_argument('--browser', choices=['edge', 'chrome'], default='edge')
+    parser.add_argument('--headless', action='store_true')
+    parser.add_argument('--rounds', type=int, default=5)
+    args = parser.parse_args()
+
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), CountingHandler)
+    httpd.daemon_threads = True
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    url = f'http://127.0.0.1:{httpd.server_address[1]}/page'
+    try:
+        print(f"{'方式':<10}{'get p50 ms':>12}{'DCL p50 ms':>12}{'字节/次':>12}{'请求/次':>10}")
+        for label, lean in (('默认', False), ('精简模式', True)):
+            driver = make_driver(args.browser, args.headless, lean)
+            try:
+                driver.get(url)  # 预热
+                rows = measure(driver, url, args.rounds)
+            finally:
+                driver.quit()
+            get_ms, dcl_ms, nbytes, nreq = (statistics.median(col) for col in zip(*rows))
+            print(f'{label:<10}{get_ms:>12.0f}{dcl_ms:>12.0f}{nbytes:>12.0f}{nreq:>10.0f}')
+    finally:
+        httpd.shutdown()
+        httpd.server_close()
+
+
+if __name__ == '__main__':
+    main()
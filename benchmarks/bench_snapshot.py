@@ -0,0 +1,132 @@
+"""
+鲸介12306 抢票助手 - 快照模式基准测试
+
+对比逐行 WebDriver 解析与单次 execute_script 快照两种轮询方式，
+统计每轮 WebDriver 往返次数和耗时。使用本地静态夹具页面，不访问 12306。
+
+用法：
+    python benchmarks/bench_snapshot.py [--browser edge|chrome] [--headless] [--rounds 20]
+
+开源协议：MIT License
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from selenium import webdriver
+from selenium.webdriver.common.by import By
+
+from booking_core import (
+    _find_rows, _find_row_by_train_number, extract_depart_time_from_row, time_in_range,
+    parse_hhmm_to_minutes, snapshot_rows,
+)
+from train_table import TrainTable, TimeRangeStrategy, TrainNumberStrategy
+
+FIXTURE = ROOT / 'benchmarks' / 'fixtures' / 'query_left_table.html'
+
+
+class RoundTripCounter:
+    """包装 driver.execute，统计 WebDriver 命令往返次数"""
+    def __init__(self, driver):
+        self.count = 0
+        self._execute = driver.execute
+
+        def counting_execute(*args, **kwargs):
+            self.count += 1
+            return self._execute(*args, **kwargs)
+
+        driver.execute = counting_execute
+
+
+def legacy_time_range_poll(driver, start_hhmm, end_hhmm):
+    """原逐行解析方式（与 book_by_time_range snapshot=False 相同，不点击）"""
+    candidates = []
+    for r in _find_rows(driver):
+        dep = extract_depart_time_from_row(r)
+        if dep and time_in_range(dep, start_hhmm, end_hhmm):
+            if r.find_elements(By.XPATH, ".//a[contains(text(),'预订')]"):
+                candidates.append((dep, r))
+    candidates.sort(key=lambda x: parse_hhmm_to_minutes(x[0]))
+    return candidates[0][0] if candidates else None
+
+
+def snapshot_time_range_poll(driver, strategy):
+    hit = strategy.pick(TrainTable.from_snapshot(snapshot_rows(driver)))
+    return hit.depart if hit else None
+
+
+def legacy_train_number_poll(driver, target):
+    return _find_row_by_train_number(driver, target) is not None
+
+
+def snapshot_train_number_poll(driver, strategy):
+    return strategy.pick(TrainTable.from_snapshot(snapshot_rows(driver))) is not None
+
+
+def measure(counter, rounds, fn, *args):
+    """执行 rounds 轮，返回 (结果, 每轮往返次数, 每轮耗时列表ms)"""
+    latencies = []
+    before = counter.count
+    result = None
+    for _ in range(rounds):
+        t0 = time.perf_counter()
+        result = fn(*args)
+        latencies.append((time.perf_counter() - t0) * 1000)
+    trips = (counter.count - before) / rounds
+    return result, trips, latencies
+
+
+def make_driver(browser, headless):
+    if browser == 'chrome':
+        options = webdriver.ChromeOptions()
+        if headless:
+            options.add_argument('--headless=new')
+        return webdriver.Chrome(options=options)
+    options = webdriver.EdgeOptions()
+    if headless:
+        options.add_argument('--headless=new')
+    return webdriver.Edge(options=options)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='快照模式 vs 逐行解析 基准测试')
+    parser.add_argument('--browser', choices=['edge', 'chrome'], default='edge')
+    parser.add_argument('--headless', action='store_true')
+    parser.add_argument('--rounds', type=int, default=20)
+    parser.add_argument('--start', default='07:00')
+    parser.add_argument('--end', default='09:00')
+    parser.add_argument('--train', default='', help='指定车次（默认取夹具中最后一个可预订车次）')
+    args = parser.parse_args()
+
+    driver = make_driver(args.browser, args.headless)
+    try:
+        driver.get(FIXTURE.as_uri())
+        counter = RoundTripCounter(driver)
+        target = args.train.strip().upper()
+        if not target:
+            bookable = [r['train'] for r in snapshot_rows(driver) if r['book']]
+            target = bookable[-1] if bookable else 'G1'
+
+        cases = [
+            ('时间范围/逐行', legacy_time_range_poll, (driver, args.start, args.end)),
+            ('时间范围/快照', snapshot_time_range_poll, (driver, TimeRangeStrategy(args.start, args.end))),
+            (f'指定车次/逐行 [{target}]', legacy_train_number_poll, (driver, target)),
+            (f'指定车次/快照 [{target}]', snapshot_train_number_poll, (driver, TrainNumberStrategy(target))),
+        ]
+        print(f'夹具: {os.path.relpath(FIXTURE, ROOT)}，共 {len(snapshot_rows(driver))} 行，每项 {args.rounds} 轮')
+        print(f"{'场景':<24}{'结果':<10}{'往返/轮':>10}{'p50 ms':>10}{'max ms':>10}")
+        for name, fn, fn_args in cases:
+            result, trips, lat = measure(counter, args.rounds, fn, *fn_args)
+            print(f'{name:<24}{str(result):<10}{trips:>10.1f}{statistics.median(lat):>10.2f}{max(lat):>10.2f}')
+    finally:
+        driver.quit()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,122 @@
+"""
+鲸介12306 抢票助手 - 开售前预热基准测试
+
+本地 FakeSiteServer 为每个新连接附加建连延迟（模拟 TCP + TLS 握手），并关闭空闲超时的长连接，
+比较开售时刻首次查询的耗时：
+    冷启动        新建连接池后直接查询
+    预热          查询前先 ping 建立连接
+    预热后空闲    预热后空闲超过服务端超时，连接已被关闭
+    预热 + 保活   空闲期间按间隔保活，连接一直可用
+默认只测接口直连查询（不需要浏览器）；加 --browser 时再用真实浏览器测点击查询到结果表重绘的耗时。
+
+用法：
+    python benchmarks/bench_warmup.py [--rounds 10] [--handshake-ms 60] [--browser edge|chrome] [--headless]
+
+开源协议：MIT License
+"""
+import argparse
+import contextlib
+import io
+import statistics
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from fake_site import FakeSite, FakeSiteServer
+from ticket_query import TicketQueryEngine
+from warmup import page_ping
+
+
+def _first_query_ms(engine, site):
+    t0 = time.perf_counter()
+    engine.query('2026-02-05', site.from_code, site.to_code)
+    return (time.perf_counter() - t0) * 1000
+
+
+def bench_engine(server, site, args):
+    """各方式下接口直连首次查询耗时（ms）列表"""
+    idle = args.idle_timeout + 0.2
+    keepalive = args.idle_timeout / 2
+    results = {}
+    for label in ('冷启动', '预热', '预热后空闲', '预热 + 保活'):
+        samples = []
+        for _ in range(args.rounds):
+            engine = TicketQueryEngine(base_url=server.base_url)
+            try:
+                if label != '冷启动':
+                    engine.ping()
+                if label == '预热后空闲':
+                    time.sleep(idle)
+                elif label == '预热 + 保活':
+                    deadline = time.perf_counter() + idle
+                    while time.perf_counter() < deadline:
+                        time.sleep(keepalive)
+                        engine.ping()
+                samples.append(_first_query_ms(engine, site))
+            finally:
+                engine.close()
+        results[label] = samples
+    return results
+
+
+def _click_query_ms(driver):
+    from booking_core import install_table_observer, wait_for_table_update
+    gen, button = install_table_observer(driver)
+    t0 = time.perf_counter()
+    button.click()
+    wait_for_table_update(driver, gen, 5)
+    return (time.perf_counter() - t0) * 1000
+
+
+def bench_browser(server, args):
+    """真实浏览器中：页面空闲超过服务端超时后，点击查询到结果表重绘的耗时（ms）"""
+    from bench_page_load import make_driver
+    driver = make_driver(args.browser, args.headless, False)
+    results = {'冷启动': [], '预热': []}
+    try:
+        driver.get(server.base_url + '/otn/leftTicket/init')
+        for _ in range(args.rounds):
+            for label in results:
+                time.sleep(args.idle_timeout + 0.2)
+                if label == '预热':
+                    page_ping(driver)
+                results[label].append(_click_query_ms(driver))
+    finally:
+        driver.quit()
+    return results
+
+
+def _report(title, results):
+    print(title)
+    print(f"{'方式':<12}{'p50 ms':>10}{'p90 ms':>10}{'max ms':>10}")
+    for label, samples in results.items():
+        s = sorted(samples)
+        p90 = s[min(len(s) - 1, int(len(s) * 0.9))]
+        print(f'{label:<12}{statistics.median(s):>10.1f}{p90:>10.1f}{s[-1]:>10.1f}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='开售前预热：首次查询耗时对比')
+    parser.add_argument('--rounds', type=int, default=10)
+    parser.add_argument('--handshake-ms', type=float, default=60.0, help='每个新连接的建连延迟')
+    parser.add_argument('--idle-timeout', type=float, default=0.5, help='服务端关闭空闲连接的超时（秒）')
+    parser.add_argument('--browser', choices=['edge', 'chrome'])
+    parser.add_argument('--headless', action='store_true')
+    args = parser.parse_args()
+
+    site = FakeSite(rows=60, open_ratio=0.0)
+    with FakeSiteServer(site, handshake=args.handshake_ms / 1000, idle_timeout=args.idle_timeout) as server:
+        print(f'建连延迟 {args.handshake_ms:.0f}ms，空闲超时 {args.idle_timeout:.1f}s，每种方式 {args.rounds} 轮')
+        _report('\n接口直连首次查询', bench_engine(server, site, args))
+        if args.browser:
+            with contextlib.redirect_stdout(io.StringIO()):
+                results = bench_browser(server, args)
+            _report('\n浏览器首次点击查询', results)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
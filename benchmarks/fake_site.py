@@ -0,0 +1,249 @@
+"""
+鲸介12306 抢票助手 - 本地模拟 12306 站点
+
+FakeSite 是余票随时间变化的车次模型；FakeSiteServer 把它以 HTTP 提供给真实浏览器和接口直连模式：
+    GET  /otn/leftTicket/init          购票页（含 queryLeftTable，点击查询后异步重绘表格）
+    GET  /otn/leftTicket/fragment      当前结果表 tbody 片段
+    GET  /otn/leftTicket/query*        余票接口（| 分隔记录）
+    GET  /otn/confirmPassenger/initDc  订单页（fixtures/order_confirm.html）
+    HEAD /otn/                         仅返回 Date 头，供时钟同步使用（clock_skew 可让服务器时钟偏离本机）
+    POST /otn/login/conf               登录状态（始终已登录），供开售前预热校验会话
+
+开源协议：MIT License
+"""
+import json
+import random
+import threading
+import time
+from email.utils import formatdate
+from html import escape
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+from ticket_query import SEAT_FIELD_INDEX
+
+FIXTURES = Path(__file__).resolve().parent / 'fixtures'
+SEAT_COLUMNS = 12
+SECOND_CLASS = 3  # 二等座所在列
+
+
+class FakeTrain:
+    __slots__ = ('train', 'depart', 'arrive', 'duration', 'opens_at', 'seats_open', 'seats_closed')
+
+    def __init__(self, train, depart, arrive, duration, opens_at, seats_open, seats_closed):
+        self.train = train
+        self.depart = depart
+        self.arrive = arrive
+        self.duration = duration
+        self.opens_at = opens_at
+        self.seats_open = seats_open
+        self.seats_closed = seats_closed
+
+
+class FakeSite:
+    """余票随时间变化的车次模型
+
+    open_ratio 比例的车次会在 [open_at, open_at + open_spread] 秒内（相对 start() 时刻）开放预订，
+    其余车次始终不可预订。
+    """
+
+    def __init__(self, rows=60, open_ratio=0.4, open_at=0.0, open_spread=2.0, seed=12306,
+                 from_code='IZQ', to_code='IOQ', clock=time.perf_counter):
+        rng = random.Random(seed)
+        self.from_code, self.to_code = from_code, to_code
+        self.clock = clock
+        self.trains = []
+        used = set()
+        for i in range(rows):
+            tn = f'{rng.choice("GGGDDC")}{rng.randint(100, 9999)}'
+            while tn in used:
+                tn = f'{rng.choice("GGGDDC")}{rng.randint(100, 9999)}'
+            used.add(tn)
+            dep = 6 * 60 + i * (17 * 60 // max(rows, 1))
+            dur = rng.randint(25, 180)
+            arr = dep + dur
+            opens_at = open_at + rng.uniform(0, open_spread) if rng.random() < open_ratio else None
+            closed = [rng.choice(['无', '--', '候补']) for _ in range(SEAT_COLUMNS)]
+            opened = list(closed)
+            opened[SECOND_CLASS] = rng.choice(['有', str(rng.randint(1, 20))])
+            self.trains.append(FakeTrain(
+                tn, f'{dep // 60 % 24:02d}:{dep % 60:02d}', f'{arr // 60 % 24:02d}:{arr % 60:02d}',
+                f'{dur // 60:02d}:{dur % 60:02d}', opens_at, opened, closed,
+            ))
+        self.t0 = clock()
+
+    def start(self):
+        """重置时间起点（余票开放时刻相对于此）"""
+        self.t0 = self.clock()
+
+    def elapsed(self):
+        return self.clock() - self.t0
+
+    def is_open(self, train, at=None):
+        at = self.elapsed() if at is None else at
+        return train.opens_at is not None and at >= train.opens_at
+
+    def first_open(self, predicate=None):
+        """最早开放且满足 predicate 的车次（用于计算理论最早命中时刻）"""
+        cands = [t for t in self.trains if t.opens_at is not None and (predicate is None or predicate(t))]
+        return min(cands, key=lambda t: t.opens_at) if cands else None
+
+    def rows(self, at=None):
+        """当前时刻的结果表：[(FakeTrain, 是否可预订, 席别列文本)]"""
+        at = self.elapsed() if at is None else at
+        out = []
+        for t in self.trains:
+            ok = self.is_open(t, at)
+            out.append((t, ok, t.seats_open if ok else t.seats_closed))
+        return out
+
+    def tbody_html(self, at=None):
+        parts = []
+        for i, (t, ok, seats) in enumerate(self.rows(at)):
+            seat_tds = ''.join(f'<td align="center">{escape(s)}</td>' for s in seats)
+            btn = '<a href="javascript:" class="btn72" onclick="book(this)">预订</a>' if ok else '预订'
+            parts.append(
+                f'<tr id="ticket_{i}"><td colspan="4"><div class="t-list">'
+                f'<div class="train"><div><a href="javascript:" class="number">{t.train}</a></div></div>'
+                f'<div class="cdz"><strong class="start-t">广州南</strong><strong class="end-s">深圳北</strong></div>'
+                f'<div class="cds"><strong class="start-t">{t.depart}</strong><strong class="color999">{t.arrive}</strong></div>'
+                f'<div class="ls"><strong>{t.duration}</strong></div></div></td>'
+                f'{seat_tds}<td align="center" class="no-br">{btn}</td></tr>'
+                f'<tr datatran="{t.train}" style="display: none;"><td colspan="17"></td></tr>'
+            )
+        return '\n'.join(parts)
+
+    def query_records(self, at=None):
+        out = []
+        for t, ok, seats in self.rows(at):
+            f = [''] * 36
+            f[0] = f'SECRET{t.train}' if ok else ''
+            f[1] = '预订'
+            f[2] = f'0{t.train}00'
+            f[3] = t.train
+            f[4] = f[6] = self.from_code
+            f[5] = f[7] = self.to_code
+            f[8], f[9], f[10] = t.depart, t.arrive, t.duration
+            f[11] = 'Y' if ok else 'N'
+            for col, idx in enumerate(SEAT_FIELD_INDEX):
+                if idx is not None and seats[col] != '--':
+                    f[idx] = seats[col]
+            out.append('|'.join(f))
+        return out
+
+
+_INIT_PAGE = """<!DOCTYPE html>
+<html lang="zh-CN"><head><meta charset="utf-8"><title>模拟 12306 购票页</title></head>
+<body>
+<input id="fromStationText" value="广州南"><input type="hidden" id="fromStation" value="{from_code}">
+<input id="toStationText" value="深圳北"><input type="hidden" id="toStation" value="{to_code}">
+<input id="train_date" value="2026-02-05">
+<a id="query_ticket" href="javascript:">查询</a>
+<table><tbody id="queryLeftTable">{tbody}</tbody></table>
+<script>
+  document.getElementById('query_ticket').addEventListener('click', function () {{
+    fetch('/otn/leftTicket/fragment').then(function (r) {{ return r.text(); }}).then(function (html) {{
+      document.getElementById('queryLeftTable').innerHTML = html;
+    }});
+  }});
+  function book(a) {{ location.href = '/otn/confirmPassenger/initDc'; }}
+</script>
+</body></html>
+"""
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    wbufsize = -1  # 头和正文合并成一次写出，避免 Nagle + 延迟确认带来的 40ms 停顿
+    site = None
+    delay = 0.0
+    handshake = 0.0
+    clock_skew = 0.0
+
+    def setup(self):
+        super().setup()
+        if self.handshake:
+            # 每个新连接模拟一次 TCP + TLS 握手的往返
+            time.sleep(self.handshake)
+
+    def _send(self, status, body, ctype):
+        if self.delay:
+            time.sleep(self.delay)
+        data = body.encode('utf-8') if isinstance(body, str) else body
+        self.send_response_only(status)
+        self.send_header('Date', formatdate(time.time() + self.clock_skew, usegmt=True))
+        self.send_header('Content-Type', ctype)
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        if self.command != 'HEAD':
+            self.wfile.write(data)
+
+    def do_HEAD(self):
+        self._send(200, b'', 'text/plain')
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        if length:
+            self.rfile.read(length)
+        if self.path.split('?', 1)[0] == '/otn/login/conf':
+            body = json.dumps({'httpstatus': 200, 'status': True, 'data': {'is_login': 'Y'}})
+            self._send(200, body, 'application/json;charset=UTF-8')
+        else:
+            self._send(404, 'not found', 'text/plain')
+
+    def do_GET(self):
+        path = self.path.split('?', 1)[0]
+        site = self.site
+        if path == '/otn/leftTicket/init':
+            html = _INIT_PAGE.format(from_code=site.from_code, to_code=site.to_code, tbody=site.tbody_html())
+            self._send(200, html, 'text/html; charset=utf-8')
+        elif path == '/otn/leftTicket/fragment':
+            self._send(200, site.tbody_html(), 'text/html; charset=utf-8')
+        elif path.startswith('/otn/leftTicket/query'):
+            body = json.dumps({'httpstatus': 200, 'status': True,
+                               'data': {'result': site.query_records(), 'flag': '1', 'map': {}}},
+                              ensure_ascii=False)
+            self._send(200, body, 'application/json;charset=UTF-8')
+        elif path == '/otn/confirmPassenger/initDc':
+            self._send(200, (FIXTURES / 'order_confirm.html').read_bytes(), 'text/html; charset=utf-8')
+        else:
+            self._send(404, 'not found', 'text/plain')
+
+    def log_message(self, *args):
+        pass
+
+
+class FakeSiteServer:
+    """在本地端口提供 FakeSite；delay 为每个请求附加的服务端延迟（秒）
+
+    handshake 为每个新连接附加的建连延迟（秒），idle_timeout 秒无请求的长连接由服务端关闭，
+    两者一起模拟真实站点上冷连接的代价。clock_skew 为服务器时钟相对本机的偏差（秒），体现在 Date 响应头上。
+    """
+
+    def __init__(self, site, host='127.0.0.1', port=0, delay=0.0, handshake=0.0, idle_timeout=None, clock_skew=0.0):
+        handler = type('Handler', (_Handler,), {'site': site, 'delay': delay, 'handshake': handshake,
+                                                'timeout': idle_timeout, 'clock_skew': clock_skew})
+        self.site = site
+        self.httpd = ThreadingHTTPServer((host, port), handler)
+        self.httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.httpd.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
@@ -0,0 +1,293 @@
+"""
+鲸介12306 抢票助手 - 内存版模拟 WebDriver
+
+实现 booking_core / order_flow 用到的 WebDriver 子集（find_element(s)、execute_script、
+execute_async_script、click、text 等），页面内容来自 FakeSite。
+每个命令按 rtt 秒模拟一次 WebDriver HTTP 往返并计数，不需要浏览器，可在 CI 中运行。
+
+开源协议：MIT License
+"""
+import re
+import time
+from types import SimpleNamespace
+
+from selenium.common.exceptions import NoSuchElementException
+from selenium.webdriver.common.by import By
+
+import booking_core
+import order_flow
+import seat_map
+
+_TRAIN_XPATH_RE = re.compile(r"normalize-space\(text\(\)\)='([^']*)'")
+
+
+class FakeElement:
+    """模拟元素；kind 决定其行为"""
+
+    def __init__(self, driver, kind, text='', row=None):
+        self._driver = driver
+        self.kind = kind
+        self._text = text
+        self.row = row
+
+    @property
+    def text(self):
+        self._driver._trip()
+        return self._text
+
+    def is_displayed(self):
+        self._driver._trip()
+        return True
+
+    def is_enabled(self):
+        self._driver._trip()
+        return True
+
+    def click(self):
+        self._driver._trip()
+        self._driver._on_click(self)
+
+    def find_elements(self, by, value):
+        self._driver._trip()
+        return self._driver._row_find_elements(self, by, value)
+
+    def find_element(self, by, value):
+        found = self.find_elements(by, value)
+        if not found:
+            raise NoSuchElementException(value)
+        return found[0]
+
+
+class FakeWebDriver:
+    """基于 FakeSite 的模拟浏览器
+
+    render_delay 为点击查询到表格重绘的延迟（模拟 XHR）；passenger_delay / confirm_delay 为订单页
+    乘车人列表加载、提交订单后确认框出现的延迟。seat_type 为订单页席别，决定选座面板的座位字母，
+    每位乘车人一排；taken 为已被占用（不可选）的座位 id。travel_date 为购票页当前的出发日期，
+    booking_core._apply_query_to_page 会修改它，点击预订时记入 booked_date。
+    """
+
+    def __init__(self, site, rtt=0.002, render_delay=0.03, passenger_delay=0.15, confirm_delay=0.3,
+                 seat_type='二等座', taken=(), travel_date='2026-02-05'):
+        self.site = site
+        self.rtt = rtt
+        self.render_delay = render_delay
+        self.passenger_delay = passenger_delay
+        self.confirm_delay = confirm_delay
+        self.timeouts = SimpleNamespace(script=30.0, page_load=300.0, implicit_wait=0.0)
+        self.commands = 0
+        self.refreshes = 0
+        self.first_click_at = None
+        self.order_done_at = None
+        self.booked_train = None
+        self.travel_date = travel_date
+        self.booked_date = None
+        self.page = 'query'
+        self.gen = 0
+        self._rendered = site.rows()
+        self._pending_render = None
+        self._order_t0 = None
+        self._passenger_checked = False
+        self._confirm_at = None
+        self._query_btn = FakeElement(self, 'query')
+        self._fp_key = None
+        self._fp_cache = {}
+        self.seat_type = seat_type
+        self.taken = set(taken)
+        self.passengers = 0
+        self.selected_seats = []
+
+    # ---- 基础设施 ----
+
+    def _trip(self):
+        self.commands += 1
+        if self.rtt:
+            time.sleep(self.rtt)
+
+    def _sync(self, now=None):
+        now = time.perf_counter() if now is None else now
+        if self._pending_render is not None and now >= self._pending_render:
+            self._rendered = self.site.rows(self._pending_render - self.site.t0)
+            self._pending_render = None
+            self.gen += 1
+
+    def _row_elements(self):
+        self._sync()
+        return [FakeElement(self, 'row', self._row_text(r), row=r) for r in self._rendered]
+
+    @staticmethod
+    def _row_text(row):
+        t, ok, seats = row
+        return '\n'.join([t.train, '广州南', '深圳北', t.depart, t.arrive, t.duration, *seats, '预订'])
+
+    # ---- WebDriver API ----
+
+    def set_script_timeout(self, seconds):
+        self._trip()
+        self.timeouts.script = seconds
+
+    def refresh(self):
+        self._trip()
+        self.refreshes += 1
+        self.page = 'query'
+        self._rendered = self.site.rows()
+        self._pending_render = None
+
+    def find_element(self, by, value):
+        found = self.find_elements(by, value)
+        if not found:
+            raise NoSuchElementException(f'{by}={value}')
+        return found[0]
+
+    def find_elements(self, by, value):
+        self._trip()
+        if self.page == 'query':
+            if by == By.ID and value == 'queryLeftTable':
+                return [FakeElement(self, 'table')]
+            if by == By.ID and value == 'query_ticket':
+                return [self._query_btn]
+            if by == By.XPATH and "queryLeftTable']/tr[" in value:
+                return self._row_elements()
+            if by == By.XPATH and 'normalize-space(text())' in value:
+                m = _TRAIN_XPATH_RE.search(value)
+                target = m.group(1) if m else ''
+                return [e for e in self._row_elements() if e.row[0].train == target]
+            return []
+        now = time.perf_counter()
+        if by == By.CLASS_NAME and value == 'seat-sel-bd' and self._confirm_ready(now):
+            return [FakeElement(self, 'seat_panel')]
+        return []
+
+    def _row_find_elements(self, el, by, xpath):
+        if el.kind != 'row':
+            return []
+        t, ok, seats = el.row
+        if by == By.TAG_NAME and xpath == 'td':
+            return ([FakeElement(self, 'text', t.train)] + [FakeElement(self, 'text', s) for s in seats]
+                    + [FakeElement(self, 'text', '预订' if ok else '')])
+        if "'预订'" in xpath:
+            return [FakeElement(self, 'book', '预订', row=el.row)] if ok else []
+        if xpath.startswith('.//td[1]'):
+            return [FakeElement(self, 'text', t.train)]
+        # 与真实页面一致：出发时间不在 td[2] / .cdz 等节点下，调用方会回退到整行文本
+        return []
+
+    def _snapshot(self, key):
+        """与 _SNAPSHOT_JS 相同：带缓存键时指纹未变的行只返回 train / fp / book"""
+        prev = (self._fp_cache if key == self._fp_key else {}) if key else None
+        nxt, out = {}, []
+        for t, ok, seats in self._rendered:
+            fp = '|'.join([t.train, *seats, '1' if ok else '0'])
+            nxt[t.train] = fp
+            book = FakeElement(self, 'book', '预订', row=(t, ok, seats)) if ok else None
+            if prev is not None and prev.get(t.train) == fp:
+                out.append({'train': t.train, 'fp': fp, 'book': book})
+            else:
+                out.append({'train': t.train, 'depart': t.depart, 'arrive': t.arrive, 'seats': list(seats),
+                            'fp': fp, 'book': book})
+        if key:
+            self._fp_key, self._fp_cache = key, nxt
+        return out
+
+    def execute_script(self, script, *args):
+        self._trip()
+        self._sync()
+        if script == booking_core._SNAPSHOT_JS:
+            if self.page != 'query':
+                return None
+            return self._snapshot(args[0] if args else None)
+        if script == booking_core._OBSERVER_JS:
+            return [self.gen, self._query_btn] if self.page == 'query' else [None, None]
+        if script == order_flow._SELECT_ADULT_JS:
+            return self.page == 'order'
+        if script == order_flow._SELECT_MORE_PASSENGERS_JS:
+            self.passengers = max(self.passengers, args[0])
+            return self.passengers
+        if script == seat_map._SEAT_PANEL_JS:
+            return self._seat_panel()
+        if script == seat_map._CLICK_SEATS_JS:
+            self.selected_seats += [i for i in args[0] if i not in self.selected_seats and i not in self.taken]
+            return [i for i in args[0] if i in self.selected_seats]
+        if script.startswith('arguments[0].click()'):
+            self._on_click(args[0])
+            return None
+        if "set('train_date'" in script:
+            if args[0]:
+                self.travel_date = args[0]
+            return None
+        if 'fromStation' in script and script.lstrip().startswith('var f'):
+            return [self.site.from_code, self.site.to_code]
+        return None
+
+    def execute_async_script(self, script, *args):
+        self._trip()
+        if script == booking_core._WAIT_GENERATION_JS:
+            last, timeout_ms = args
+            deadline = time.perf_counter() + timeout_ms / 1000
+            self._sync()
+            if self.gen <= last and self._pending_render is not None:
+                time.sleep(max(0.0, min(self._pending_render, deadline) - time.perf_counter()))
+                self._sync()
+            return self.gen if self.gen > last else -1
+        if script == order_flow._WAIT_ANY_JS:
+            selectors, timeout_ms = args
+            deadline = time.perf_counter() + timeout_ms / 1000
+            while True:
+                now = time.perf_counter()
+                for sel in selectors:
+                    if self._selector_ready(sel, now):
+                        return [sel, FakeElement(self, sel)]
+                wake = min([t for t in (self._ready_time(s) for s in selectors) if t is not None and t > now]
+                           or [deadline])
+                if now >= deadline:
+                    return None
+                time.sleep(max(0.0, min(wake, deadline) - now))
+        return None
+
+    def _seat_panel(self):
+        if not self._confirm_ready(time.perf_counter()):
+            return None
+        letters = [c for c in seat_map.SEAT_LAYOUTS[self.seat_type] if c != '|']
+        seats = [[f'{r}{c}', f'{r}{c}' in self.selected_seats, f'{r}{c}' in self.taken]
+                 for r in range(1, max(1, self.passengers) + 1) for c in letters]
+        return [seats, self.seat_type, max(1, self.passengers)]
+
+    # ---- 页面行为 ----
+
+    def _ready_time(self, sel):
+        if self.page != 'order':
+            return None
+        if sel in (order_flow.PASSENGER, order_flow.SUBMIT):
+            return self._order_t0 + self.passenger_delay
+        if sel in (order_flow.SEAT_PANEL, order_flow.CONFIRM):
+            return self._confirm_at
+        return None
+
+    def _selector_ready(self, sel, now):
+        t = self._ready_time(sel)
+        if sel in (order_flow.SEAT_PANEL, order_flow.CONFIRM) and self.order_done_at is not None:
+            return False
+        return t is not None and now >= t
+
+    def _confirm_ready(self, now):
+        return self.page == 'order' and self._confirm_at is not None and now >= self._confirm_at
+
+    def _on_click(self, el):
+        now = time.perf_counter()
+        kind = el.kind
+        if kind == 'query' and self.page == 'query':
+            self._pending_render = now + self.render_delay
+        elif kind == 'book' and self.page == 'query':
+            if self.first_click_at is None:
+                self.first_click_at = now
+            self.booked_train = el.row[0].train
+            self.booked_date = self.travel_date
+            self.page = 'order'
+            self._order_t0 = now
+        elif kind == order_flow.PASSENGER:
+            self._passenger_checked = True
+            self.passengers = max(self.passengers, 1)
+        elif kind == order_flow.SUBMIT and self._passenger_checked:
+            self._confirm_at = now + self.confirm_delay
+        elif kind == order_flow.CONFIRM and self._confirm_ready(now):
+            self.order_done_at = now
@@ -0,0 +1,147 @@
+"""
+鲸介12306 抢票助手 - 离线基准测试套件
+
+不依赖浏览器和 12306：DOM 策略跑在内存版 FakeWebDriver 上，接口直连模式请求本地 FakeSiteServer。
+对两种抢票策略（时间范围 / 指定车次）× 两种解析方式（快照 / 逐行）报告：
+    轮询速率        余票始终不开放时每秒完成的查询轮数、每轮 WebDriver 往返次数
+    首次点击耗时    从余票开放到点击预订的时间
+    下单总耗时      从余票开放到最终确认的时间（含 OrderFlow 下单流程）
+另外报告接口直连查询速率、车站字典的加载耗时与单次站名解析耗时。
+
+用法：
+    python benchmarks/run_benchmarks.py [--rounds 5] [--rtt-ms 2] [--json results.json]
+
+开源协议：MIT License
+"""
+import argparse
+import contextlib
+import io
+import json
+import statistics
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from booking_core import book_by_time_range, book_by_train_number, select_seat_fast
+from fake_site import FakeSite, FakeSiteServer
+from fake_webdriver import FakeWebDriver
+from order_flow import OrderFlow
+from refresh_scheduler import FixedIntervalScheduler
+from ticket_query import TicketQueryEngine
+from station_index import load_index
+
+STRATEGIES = ('time_range', 'train_number')
+MODES = ('snapshot', 'legacy')
+
+
+def _run_strategy(driver, strategy, target, snapshot, attempts, interval):
+    scheduler = FixedIntervalScheduler(interval)
+    with contextlib.redirect_stdout(io.StringIO()):
+        if strategy == 'time_range':
+            return book_by_time_range(driver, '00:00', '23:59', max_attempts=attempts,
+                                      snapshot=snapshot, scheduler=scheduler)
+        return book_by_train_number(driver, target, max_attempts=attempts,
+                                    snapshot=snapshot, scheduler=scheduler)
+
+
+def bench_poll_rate(strategy, mode, args):
+    """余票始终不开放，测每秒轮询次数与每轮往返次数"""
+    site = FakeSite(rows=args.rows, open_ratio=0.0)
+    driver = FakeWebDriver(site, rtt=args.rtt_ms / 1000, render_delay=args.render_ms / 1000)
+    target = site.trains[len(site.trains) // 2].train
+    t0 = time.perf_counter()
+    _run_strategy(driver, strategy, target, mode == 'snapshot', args.polls, (0, 0))
+    elapsed = time.perf_counter() - t0
+    return {'polls_per_s': args.polls / elapsed, 'trips_per_poll': driver.commands / args.polls}
+
+
+def bench_latency(strategy, mode, args):
+    """余票在 open_at 秒后开放，测开放→点击、开放→最终确认的耗时（ms）"""
+    first_click, order_done = [], []
+    for seed in range(args.rounds):
+        site = FakeSite(rows=args.rows, open_ratio=0.3, open_at=args.open_at, open_spread=0.0, seed=seed)
+        driver = FakeWebDriver(site, rtt=args.rtt_ms / 1000, render_delay=args.render_ms / 1000)
+        target = site.first_open().train
+        opened = site.t0 + args.open_at
+        interval = (args.interval_ms / 1000, args.interval_ms / 1000)
+        _run_strategy(driver, strategy, target, mode == 'snapshot', 200, interval)
+        if driver.first_click_at is None:
+            continue
+        first_click.append((driver.first_click_at - opened) * 1000)
+        flow = OrderFlow(driver, {'ticket_type': 'adult', 'seat_position_preference': 'first'},
+                         seat_selector=select_seat_fast)
+        with contextlib.redirect_stdout(io.StringIO()):
+            flow.run()
+        if driver.order_done_at is not None:
+            order_done.append((driver.order_done_at - opened) * 1000)
+    med = lambda xs: statistics.median(xs) if xs else float('nan')
+    return {'first_click_ms': med(first_click), 'order_done_ms': med(order_done),
+            'completed': f'{len(order_done)}/{args.rounds}'}
+
+
+def bench_json_engine(args):
+    """接口直连模式：对本地模拟站点的查询速率"""
+    site = FakeSite(rows=args.rows, open_ratio=0.0)
+    with FakeSiteServer(site) as server:
+        engine = TicketQueryEngine(base_url=server.base_url)
+        engine.query('2026-02-05', site.from_code, site.to_code)
+        t0 = time.perf_counter()
+        for _ in range(args.polls):
+            engine.query('2026-02-05', site.from_code, site.to_code)
+        elapsed = time.perf_counter() - t0
+        engine.close()
+    return {'polls_per_s': args.polls / elapsed}
+
+
+def bench_station_index(args):
+    """车站字典：加载耗时与单次站名解析耗时（µs）"""
+    index = load_index()
+    names = [st.name for st in index.stations] or ['']
+    n = 0
+    t0 = time.perf_counter()
+    while n < 100000:
+        for name in names:
+            index.resolve(name)
+        n += len(names)
+    return {'stations': len(index), 'load_ms': index.load_ms, 'resolve_us': (time.perf_counter() - t0) / n * 1e6}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='离线基准测试（模拟站点 + 模拟 WebDriver）')
+    parser.add_argument('--rows', type=int, default=60, help='结果表车次数')
+    parser.add_argument('--polls', type=int, default=30, help='轮询速率测试的轮数')
+    parser.add_argument('--rounds', type=int, default=5, help='延迟测试重复次数')
+    parser.add_argument('--rtt-ms', type=float, default=2.0, help='每个 WebDriver 命令的模拟往返耗时')
+    parser.add_argument('--render-ms', type=float, default=30.0, help='点击查询到表格重绘的模拟延迟')
+    parser.add_argument('--interval-ms', type=float, default=250.0, help='延迟测试的刷新间隔')
+    parser.add_argument('--open-at', type=float, default=0.5, help='余票开放时刻（秒）')
+    parser.add_argument('--json', help='把结果写入 JSON 文件（供 CI 比较）')
+    args = parser.parse_args()
+
+    results = {'params': vars(args), 'dom': {}, 'json_engine': None, 'stations': None}
+    print(f'模拟 WebDriver 往返 {args.rtt_ms}ms，表格 {args.rows} 行，重绘延迟 {args.render_ms}ms')
+    print(f"{'策略':<14}{'方式':<10}{'轮询/秒':>10}{'往返/轮':>10}{'首次点击ms':>12}{'下单完成ms':>12}{'完成':>8}")
+    for strategy in STRATEGIES:
+        for mode in MODES:
+            rate = bench_poll_rate(strategy, mode, args)
+            lat = bench_latency(strategy, mode, args)
+            results['dom'][f'{strategy}/{mode}'] = {**rate, **lat}
+            print(f"{strategy:<14}{mode:<10}{rate['polls_per_s']:>10.1f}{rate['trips_per_poll']:>10.1f}"
+                  f"{lat['first_click_ms']:>12.0f}{lat['order_done_ms']:>12.0f}{lat['completed']:>8}")
+    results['json_engine'] = bench_json_engine(args)
+    print(f"接口直连查询：{results['json_engine']['polls_per_s']:.1f} 次/秒（本地模拟站点）")
+    results['stations'] = bench_station_index(args)
+    st = results['stations']
+    print(f"车站字典：{st['stations']} 个车站，加载 {st['load_ms']:.1f}ms，解析 {st['resolve_us']:.2f}µs/次")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f'结果已写入 {args.json}')
+
+
+if __name__ == '__main__':
+    main()
@@ -6,17 +6,33 @@
 项目：Auto12306 智能抢票系统
 开源协议：MIT License
 """
+import contextlib
 import re
 import time
-import random
+from collections import namedtuple
 from datetime import datetime
 
-from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.edge.options import Options
-from selenium.webdriver.support.ui import Select
+
+from train_table import (TrainTable, TrainRow, RowDiffer, TimeRangeStrategy, TrainNumberStrategy, PriorityStrategy,
+                         compile_strategy)
+from ticket_query import TicketQueryEngine, DEFAULT_BASE_URL, station_codes_from_page
+from fanout_poller import FanoutPoller, WatchQuery
+from refresh_scheduler import FixedIntervalScheduler, make_scheduler
+from server_clock import ServerClock, DEFAULT_SYNC_URL, sync_server_clock, wait_for_sale
+from order_flow import OrderFlow
+from tracing import NULL_TRACER, make_tracer
+from metrics import METRICS
+from availability_recorder import NULL_RECORDER, make_recorder
+from cancellation import NEVER_CANCELLED, SLICE, Cancelled
+from station_index import default_index
+from seat_map import select_seats
+from warmup import DEFAULT_KEEPALIVE_INTERVAL, DEFAULT_WARMUP_SECONDS, Warmup
+from driver_supervisor import DriverLost, RecoveryFailed, check_health, session_lost
+from browser_session import (DEFAULT_PROFILE_DIR, DEFAULT_COOKIE_FILE, HOME_URL, apply_lean_mode, launch_browser,
+                             lean_settings, restore_cookies, save_cookies, session_is_logged_in)
 
 
 def parse_hhmm_to_minutes(hhmm):
@@ -91,11 +107,12 @@ def click_book_in_row(row, driver):
         time.sleep(0.2)
         try:
             btn.click()
-            return True
         except Exception:
             driver.execute_script('arguments[0].click();', btn)
-            return True
+        METRICS.inc('click_attempts_total', result='ok')
+        return True
     except Exception as e:
+        METRICS.inc('click_attempts_total', result='failed')
         print(f'点击预订失败: {e}')
         return False
 
@@ -129,109 +146,683 @@ def _find_row_by_train_number(driver, target):
     return None
 
 
-def book_by_time_range(driver, start_hhmm, end_hhmm, max_attempts=30, refresh_interval=(3,6)):
-    """按时间范围抢票"""
-    for attempt in range(1, max_attempts+1):
+def _row_seat(row, seat_classes):
+    """逐行模式下读取行内各席别列，返回第一个有余票的所需席别（未限定席别时为 ''），都无票返回 None"""
+    if not seat_classes:
+        return ''
+    texts = tuple(td.text.strip() for td in row.find_elements(By.TAG_NAME, 'td')[1:-1])
+    return TrainRow('', None, None, texts).first_available(seat_classes)
+
+
+# 一次 execute_script 取回整张查询结果表：车次、出发/到达时刻、各席别列文本、行指纹以及预订按钮。
+# 传入缓存键 arguments[0] 时，页面内按键保存上一轮各车次的指纹，指纹未变的行只返回 train / fp / book，
+# 跳过出发/到达时刻的提取；缓存键变化（调用方缓存已重建）时页面缓存一并清空。
+_SNAPSHOT_JS = r"""
+var table = document.getElementById('queryLeftTable');
+if (!table) { return null; }
+var key = arguments[0] || null, prev = null, next = {};
+if (key) { prev = window.__rowFpKey === key ? window.__rowFp : {}; }
+var timeRe = /(?:^|\s)([01]\d|2[0-3]):([0-5]\d)(?=\s|$)/g;
+var hhmmRe = /^([01]\d|2[0-3]):[0-5]\d$/;
+var trainRe = /\b([GDKCTZXYFS]\d{1,5})\b/;
+var out = [];
+var rows = table.children;
+for (var i = 0; i < rows.length; i++) {
+    var r = rows[i];
+    if (r.tagName !== 'TR' || r.classList.contains('ticket-hd') || r.style.display === 'none') { continue; }
+    var cells = r.cells;
+    if (!cells.length) { continue; }
+    var head = cells[0];
+    var num = head.querySelector('a.number') || head.querySelector('a');
+    var train = ((num && num.textContent) || '').trim().toUpperCase();
+    if (!trainRe.test(train)) {
+        var tm = trainRe.exec((head.textContent || '').toUpperCase());
+        train = tm ? tm[1] : '';
+    }
+    var seats = [];
+    for (var j = 1; j < cells.length - 1; j++) { seats.push((cells[j].textContent || '').trim()); }
+    var btn = null;
+    var links = r.getElementsByTagName('a');
+    for (var k = 0; k < links.length; k++) {
+        if ((links[k].textContent || '').indexOf('预订') >= 0) { btn = links[k]; break; }
+    }
+    var fp = train + '|' + seats.join('|') + '|' + (btn ? 1 : 0);
+    next[train] = fp;
+    if (prev && prev[train] === fp) { out.push({train: train, fp: fp, book: btn}); continue; }
+    var cds = head.querySelector('.cds') || head;
+    var times = [];
+    var parts = cds.querySelectorAll('strong, span, em, div');
+    for (var p = 0; p < parts.length && times.length < 2; p++) {
+        var pt = (parts[p].textContent || '').trim();
+        if (hhmmRe.test(pt)) { times.push(pt); }
+    }
+    if (!times.length) {
+        var txt = (r.innerText || r.textContent || '').replace(/\s+/g, ' ');
+        var m;
+        while ((m = timeRe.exec(txt)) !== null && times.length < 2) { times.push(m[1] + ':' + m[2]); }
+        timeRe.lastIndex = 0;
+    }
+    out.push({train: train, depart: times[0] || null, arrive: times[1] || null, seats: seats, fp: fp, book: btn});
+}
+if (key) { window.__rowFpKey = key; window.__rowFp = next; }
+return out;
+"""
+
+
+def snapshot_rows(driver, cache_key=None):
+    """单次往返获取查询结果表所有可见行的快照
+
+    返回 dict 列表：train / depart / arrive / seats / fp（行指纹） / book（预订按钮元素或 None），
+    表格不存在时返回 None。传入 cache_key（train_table.RowDiffer.key）时，指纹与上一轮相同的行
+    只含 train / fp / book。
+    """
+    return driver.execute_script(_SNAPSHOT_JS, cache_key)
+
+
+def _emit_diff(diff, tracer):
+    """打印并记录本轮新出现余票的车次，时刻为读取结果表的时刻"""
+    if not diff.appeared:
+        return
+    for a in diff.appeared:
+        tracer.record('ticket_appeared', 0, train=a.train, seats=list(a.seats), at=round(diff.at, 3))
+    stamp = datetime.fromtimestamp(diff.at).strftime('%H:%M:%S.%f')[:-3]
+    shown = '；'.join(f"{a.train}（{a.depart}）{'、'.join(a.seats)}" for a in diff.appeared[:5])
+    more = f' 等 {len(diff.appeared)} 趟' if len(diff.appeared) > 5 else ''
+    print(f'🎫 {stamp} 余票出现：{shown}{more}')
+
+
+def _poll_snapshot(rows, differ, strategy, tracer, force=False, recorder=NULL_RECORDER):
+    """用一轮结果增量更新车次表并交给 recorder 记录；只有与策略相关的行变化（或 force）时才重新选择
+
+    返回 (TrainTable, 命中行或 None)。
+    """
+    t0 = time.perf_counter()
+    table, diff = differ.update(rows)
+    recorder.record(table, diff.at)
+    _emit_diff(diff, tracer)
+    hit = strategy.pick(table) if force or any(strategy.relevant(r) for r in diff.changed) else None
+    METRICS.observe('parse_seconds', time.perf_counter() - t0)
+    return table, hit
+
+
+def _count_poll(ok):
+    """一轮轮询结束：ok 表示拿到了非空车次表"""
+    METRICS.inc('polls_total')
+    if ok:
+        METRICS.inc('poll_success_total')
+        METRICS.stamp('last_success')
+
+
+def click_snapshot_button(button, driver):
+    """点击快照中返回的预订按钮"""
+    try:
+        driver.execute_script("arguments[0].scrollIntoView({block: 'center', inline: 'center'});", button)
+        try:
+            button.click()
+        except Exception:
+            driver.execute_script('arguments[0].click();', button)
+        METRICS.inc('click_attempts_total', result='ok')
+        return True
+    except Exception as e:
+        METRICS.inc('click_attempts_total', result='failed')
+        print(f'点击预订失败: {e}')
+        return False
+
+
+# 在 #queryLeftTable 上挂 MutationObserver，每次表格重新渲染完成后递增代数；
+# 同一批 DOM 变更用 setTimeout(0) 合并，避免在渲染一半时就判定为新结果。
+# 返回 [当前代数（表格不存在时为 null）, 查询按钮]，安装与取按钮在同一次往返内完成。
+_OBSERVER_JS = r"""
+var table = document.getElementById('queryLeftTable');
+var w = window;
+if (typeof w.__qltGen !== 'number') { w.__qltGen = 0; w.__qltWaiters = []; }
+if (table && w.__qltTarget !== table) {
+    if (w.__qltObserver) { w.__qltObserver.disconnect(); }
+    var pending = false;
+    w.__qltObserver = new MutationObserver(function () {
+        if (pending) { return; }
+        pending = true;
+        setTimeout(function () {
+            pending = false;
+            w.__qltGen += 1;
+            var waiters = w.__qltWaiters;
+            w.__qltWaiters = [];
+            for (var i = 0; i < waiters.length; i++) { waiters[i](w.__qltGen); }
+        }, 0);
+    });
+    w.__qltObserver.observe(table, {childList: true});
+    w.__qltTarget = table;
+}
+return [table ? w.__qltGen : null, document.getElementById('query_ticket')];
+"""
+
+# 异步等待代数超过 arguments[0]，超时（毫秒）返回 -1
+_WAIT_GENERATION_JS = r"""
+var last = arguments[0], timeoutMs = arguments[1], done = arguments[arguments.length - 1];
+var w = window;
+if (typeof w.__qltGen !== 'number') { done(-1); return; }
+if (w.__qltGen > last) { done(w.__qltGen); return; }
+var finished = false;
+var timer = setTimeout(function () { if (!finished) { finished = true; done(-1); } }, timeoutMs);
+w.__qltWaiters.push(function (gen) {
+    if (!finished) { finished = true; clearTimeout(timer); done(gen); }
+});
+"""
+
+
+def _until(driver, condition, timeout, cancel=NEVER_CANCELLED):
+    """可取消的 WebDriverWait(driver, timeout).until(condition)，每次轮询前检查取消"""
+    if cancel is NEVER_CANCELLED:
+        return WebDriverWait(driver, timeout).until(condition)
+    def check(d):
+        cancel.check()
+        return condition(d)
+    return WebDriverWait(driver, timeout, poll_frequency=0.05).until(check)
+
+
+def install_table_observer(driver):
+    """安装（或复用）结果表变更监听，返回 (当前代数, 查询按钮元素或 None)
+
+    页面上还没有结果表时代数为 None，此时无法区分新旧结果，调用方应改为等待表格出现。
+    """
+    gen, button = driver.execute_script(_OBSERVER_JS)
+    return gen, button
+
+
+def wait_for_table_update(driver, last_gen, timeout=5.0, cancel=NEVER_CANCELLED):
+    """等待结果表重新渲染，返回新代数；超时返回 None
+
+    可取消时按 SLICE 分段等待，每段之间检查取消。
+    """
+    step = timeout if cancel is NEVER_CANCELLED else SLICE
+    if driver.timeouts.script < step + 1:
+        driver.set_script_timeout(step + 1)
+    deadline = time.perf_counter() + timeout
+    while True:
+        cancel.check()
+        remaining = deadline - time.perf_counter()
+        if remaining <= 0:
+            return None
+        gen = driver.execute_async_script(_WAIT_GENERATION_JS, last_gen, int(min(step, remaining) * 1000))
+        if gen is not None and gen > last_gen:
+            return gen
+
+
+def _driver_error(e, attempt=1):
+    """按异常类型记录一次 WebDriver 错误；浏览器会话已失效时抛出 DriverLost（带上当前轮次，恢复后从这一轮继续），
+    否则交给调用方照常处理"""
+    if isinstance(e, DriverLost):
+        raise e
+    METRICS.inc('webdriver_errors_total', type=type(e).__name__)
+    if session_lost(e):
+        raise DriverLost(e, attempt) from e
+
+
+def _refresh_query(driver, timeout=5.0, cancel=NEVER_CANCELLED):
+    """点击查询按钮并等待结果表重新渲染，失败时整页刷新"""
+    try:
+        gen, refresh_btn = install_table_observer(driver)
+        if refresh_btn is None:
+            refresh_btn = _until(driver, EC.element_to_be_clickable((By.ID, 'query_ticket')), 5, cancel)
+        refresh_btn.click()
+    except Exception as e:
+        _driver_error(e)
+        print(f'点击查询按钮刷新失败: {e}，尝试整页刷新')
+        METRICS.inc('refresh_fallbacks_total')
+        driver.refresh()
+        return False
+    if gen is not None and wait_for_table_update(driver, gen, timeout, cancel) is None:
+        print(f'查询结果 {timeout:.0f}s 内未刷新')
+        return False
+    return True
+
+
+_CANCELLED_MSG = '已停止轮询：其他窗口已开始预订或已手动停止'
+
+# 轮询函数的返回值：message 为结果说明；成功点击预订时 row 为命中的行（快照/接口模式为 TrainRow，逐行模式为
+# WebElement），seat 为该行实际有票、订单页应选择的席别（未限定席别时为 ''），未预订时两者均为 None
+PollResult = namedtuple('PollResult', 'message row seat')
+
+
+def _missed(message):
+    return PollResult(message, None, None)
+
+
+def book_by_time_range(driver, start_hhmm, end_hhmm, max_attempts=30, refresh_interval=(3,6), snapshot=True,
+                       scheduler=None, tracer=NULL_TRACER, cancel=NEVER_CANCELLED, gate=None, seats=(),
+                       recorder=NULL_RECORDER, start_attempt=1, strategy=None):
+    """按时间范围抢票
+
+    seats 为按优先顺序的席别（如 '二等座/一等座'），只预订其中某一席别有余票的车次，为空时不限席别。
+    strategy 为已编译的 TimeRangeStrategy 时直接使用，忽略 start_hhmm / end_hhmm / seats。
+    snapshot=True 时每轮只用一次 execute_script 读取整张表，选中后再访问 WebDriver 点击。
+    scheduler 决定每轮之后的等待时间，缺省为 refresh_interval 内的固定随机间隔。
+    cancel 为取消令牌，每次 WebDriver 调用之间检查，等待可被立即打断；
+    gate 为多窗口并行时的预订闸门（worker_pool.GateHandle），点击预订前须先取得预订权；
+    recorder 为 availability_recorder 的记录器，快照模式下每轮车次表都交给它记录；
+    start_attempt 为起始轮次，浏览器恢复后从中断的那一轮继续。浏览器会话失效时抛出 DriverLost。
+    """
+    if strategy is None:
+        strategy = TimeRangeStrategy(start_hhmm, end_hhmm, seats)
+    scheduler = scheduler or FixedIntervalScheduler(refresh_interval)
+    differ = RowDiffer()
+    retry = False
+    for attempt in range(start_attempt, max_attempts+1):
+        if cancel.cancelled:
+            return _missed(_CANCELLED_MSG)
+        ok = False
+        force, retry = retry, False
         try:
-            WebDriverWait(driver, 5).until(EC.presence_of_element_located((By.ID, 'queryLeftTable')))
-            rows = _find_rows(driver)
-            found_times = []
-            candidates = []
-            for r in rows:
-                dep = extract_depart_time_from_row(r)
-                if dep:
-                    found_times.append(dep)
-                if dep and time_in_range(dep, start_hhmm, end_hhmm):
-                    if r.find_elements(By.XPATH, ".//a[contains(text(),'预订')]"):
-                        candidates.append((dep, r))
+            with tracer.span('parse', attempt=attempt):
+                _until(driver, EC.presence_of_element_located((By.ID, 'queryLeftTable')), 5, cancel)
+                if snapshot:
+                    table, hit = _poll_snapshot(snapshot_rows(driver, differ.key), differ, strategy, tracer, force, recorder)
+                    rows = table.rows
+                    found_times = table.depart_times()
+                    candidates = [(hit.depart, hit, strategy.seat_for(hit))] if hit is not None else []
+                else:
+                    rows = _find_rows(driver)
+                    found_times = []
+                    candidates = []
+                    for r in rows:
+                        dep = extract_depart_time_from_row(r)
+                        if not dep:
+                            continue
+                        found_times.append(dep)
+                        dep_min = parse_hhmm_to_minutes(dep)
+                        if strategy.start_min <= dep_min <= strategy.end_min:
+                            if r.find_elements(By.XPATH, ".//a[contains(text(),'预订')]"):
+                                seat = _row_seat(r, strategy.seat_classes)
+                                if seat is not None:
+                                    candidates.append((dep_min, dep, r, seat))
+                    candidates = [(dep, r, seat) for _, dep, r, seat in sorted(candidates, key=lambda x: x[0])]
+            ok = bool(rows)
             if candidates:
-                candidates.sort(key=lambda x: parse_hhmm_to_minutes(x[0]))
-                dep, row = candidates[0]
-                print(f'发现时间匹配的车次: {dep}，尝试预订...')
-                if click_book_in_row(row, driver):
-                    return f'成功尝试预订出发时间 {dep} 的车次'
+                dep, target, seat = candidates[0]
+                if gate is not None and not gate.claim():
+                    return _missed(_CANCELLED_MSG)
+                print(f'发现时间匹配的车次: {f"{dep} {seat}".rstrip()}，尝试预订...')
+                with tracer.span('click', attempt=attempt):
+                    clicked = click_snapshot_button(target.book, driver) if snapshot else click_book_in_row(target, driver)
+                if clicked:
+                    return PollResult(f'成功尝试预订出发时间 {dep} 的车次', target, seat)
+                retry = True
             else:
                 if attempt == 1 or attempt % 5 == 0:
                     preview = ','.join(sorted(set(found_times))[:6]) if found_times else '无'
-                    print(f'本次共扫描 {len(rows)} 行，解析到出发时刻: {preview}；未命中范围 {start_hhmm}-{end_hhmm}')
+                    print(f'本次共扫描 {len(rows)} 行，解析到出发时刻: {preview}；未命中范围 {strategy.start}-{strategy.end}')
         except Exception as e:
+            _driver_error(e, attempt)
             print(f'第{attempt}次尝试失败: {e}')
+        scheduler.record(ok)
+        _count_poll(ok)
         
         if attempt < max_attempts:
-            try:
-                refresh_btn = WebDriverWait(driver, 5).until(EC.element_to_be_clickable((By.ID, 'query_ticket')))
-                refresh_btn.click()
-            except Exception as e:
-                print(f'点击查询按钮刷新失败: {e}，尝试整页刷新')
-                driver.refresh()
-            wait_time = random.uniform(*refresh_interval)
+            wait_time = scheduler.next_delay()
             print(f'无匹配结果，等待{wait_time:.2f}s后重试...')
-            time.sleep(wait_time)
-    return '没抢到，可惜~'
+            if cancel.wait(wait_time):
+                return _missed(_CANCELLED_MSG)
+            with tracer.span('query', attempt=attempt+1):
+                try:
+                    _refresh_query(driver, cancel=cancel)
+                except DriverLost as e:
+                    e.attempt = attempt + 1
+                    raise
+    return _missed('没抢到，可惜~')
 
 
-def book_by_train_number(driver, target_train_number, max_attempts=30, refresh_interval=(2,4)):
-    """按指定车次抢票"""
-    target = (target_train_number or '').strip().upper()
-    if not target:
-        return '未设置目标车次'
-    for attempt in range(1, max_attempts+1):
+def book_by_train_number(driver, target_train_number, max_attempts=30, refresh_interval=(2,4), snapshot=True,
+                         scheduler=None, tracer=NULL_TRACER, cancel=NEVER_CANCELLED, gate=None, seats=(),
+                         recorder=NULL_RECORDER, start_attempt=1, strategy=None):
+    """按指定车次抢票，可用 / 或逗号分隔多个车次，按先后顺序优先
+
+    seats 为按优先顺序的席别，只预订其中某一席别有余票的车次，为空时不限席别。
+    strategy 为已编译的 TrainNumberStrategy 时直接使用，忽略 target_train_number / seats。
+    snapshot=True 时每轮只用一次 execute_script 读取整张表，选中后再访问 WebDriver 点击。
+    scheduler 决定每轮之后的等待时间，缺省为 refresh_interval 内的固定随机间隔。
+    cancel 为取消令牌，每次 WebDriver 调用之间检查，等待可被立即打断；
+    gate 为多窗口并行时的预订闸门（worker_pool.GateHandle），点击预订前须先取得预订权；
+    recorder 为 availability_recorder 的记录器，快照模式下每轮车次表都交给它记录；
+    start_attempt 为起始轮次，浏览器恢复后从中断的那一轮继续。浏览器会话失效时抛出 DriverLost。
+    """
+    if strategy is None:
         try:
-            WebDriverWait(driver, 5).until(EC.presence_of_element_located((By.ID, 'queryLeftTable')))
-            row = _find_row_by_train_number(driver, target)
-            if row is not None:
-                print(f'发现目标车次 {target}，尝试预订...')
-                if click_book_in_row(row, driver):
-                    return f'成功尝试预订指定车次 {target}'
+            strategy = TrainNumberStrategy(target_train_number or '', seats)
+        except ValueError as e:
+            return _missed(str(e))
+    target = '/'.join(strategy.targets)
+    scheduler = scheduler or FixedIntervalScheduler(refresh_interval)
+    differ = RowDiffer()
+    retry = False
+    for attempt in range(start_attempt, max_attempts+1):
+        if cancel.cancelled:
+            return _missed(_CANCELLED_MSG)
+        ok = False
+        force, retry = retry, False
+        try:
+            with tracer.span('parse', attempt=attempt):
+                _until(driver, EC.presence_of_element_located((By.ID, 'queryLeftTable')), 5, cancel)
+                if snapshot:
+                    table, hit = _poll_snapshot(snapshot_rows(driver, differ.key), differ, strategy, tracer, force, recorder)
+                    ok = len(table) > 0
+                else:
+                    hit = None
+                    for tn in strategy.targets:
+                        row = _find_row_by_train_number(driver, tn)
+                        ok = ok or row is not None
+                        seat = _row_seat(row, strategy.seat_classes) if row is not None else None
+                        if seat is not None:
+                            hit = (tn, row, seat)
+                            break
+                    # 目标车次都不在表中时再看整张表：空表（页面繁忙 / 被限流）算失败，触发退避
+                    ok = ok or bool(_find_rows(driver))
+            if hit is not None:
+                row, seat = (hit, strategy.seat_for(hit)) if snapshot else hit[1:]
+                tn = f'{hit.train if snapshot else hit[0]} {seat}'.rstrip()
+                if gate is not None and not gate.claim():
+                    return _missed(_CANCELLED_MSG)
+                print(f'发现目标车次 {tn}，尝试预订...')
+                with tracer.span('click', attempt=attempt):
+                    clicked = click_snapshot_button(hit.book, driver) if snapshot else click_book_in_row(row, driver)
+                if clicked:
+                    return PollResult(f'成功尝试预订指定车次 {tn}', row, seat)
+                retry = True
         except Exception as e:
+            _driver_error(e, attempt)
             print(f'第{attempt}次尝试失败: {e}')
+        scheduler.record(ok)
+        _count_poll(ok)
         
         if attempt < max_attempts:
-            try:
-                refresh_btn = WebDriverWait(driver, 5).until(EC.element_to_be_clickable((By.ID, 'query_ticket')))
-                refresh_btn.click()
-            except Exception as e:
-                print(f'点击查询按钮刷新失败: {e}，尝试整页刷新')
-                driver.refresh()
-            wait_time = random.uniform(*refresh_interval)
+            wait_time = scheduler.next_delay()
             print(f'未出现目标车次 {target}，等待{wait_time:.2f}s后重试...')
-            time.sleep(wait_time)
-    return f'未抢到指定车次 {target}，可惜~'
+            if cancel.wait(wait_time):
+                return _missed(_CANCELLED_MSG)
+            with tracer.span('query', attempt=attempt+1):
+                try:
+                    _refresh_query(driver, cancel=cancel)
+                except DriverLost as e:
+                    e.attempt = attempt + 1
+                    raise
+    return _missed(f'未抢到指定车次 {target}，可惜~')
 
 
-def select_seat_fast(driver, preferred_type="first"):
-    """快速选座"""
-    print(f"快速选择座位，偏好: {preferred_type}")
+def book_with_strategy(driver, strategy, max_attempts=30, refresh_interval=(2,4), scheduler=None, tracer=NULL_TRACER,
+                       cancel=NEVER_CANCELLED, gate=None, recorder=NULL_RECORDER, start_attempt=1):
+    """按任意已编译策略（如 train_table.PriorityStrategy 多目标优先级列表）抢票，每轮一次快照"""
+    scheduler = scheduler or FixedIntervalScheduler(refresh_interval)
+    differ = RowDiffer()
+    retry = False
+    for attempt in range(start_attempt, max_attempts+1):
+        if cancel.cancelled:
+            return _missed(_CANCELLED_MSG)
+        ok = False
+        force, retry = retry, False
+        try:
+            with tracer.span('parse', attempt=attempt):
+                _until(driver, EC.presence_of_element_located((By.ID, 'queryLeftTable')), 5, cancel)
+                table, hit = _poll_snapshot(snapshot_rows(driver, differ.key), differ, strategy, tracer, force, recorder)
+                ok = len(table) > 0
+            if hit is not None:
+                seat = strategy.seat_for(hit)
+                label = f'{hit.train}（{hit.depart}）{seat}'
+                if gate is not None and not gate.claim():
+                    return _missed(_CANCELLED_MSG)
+                print(f'命中目标 {label}，尝试预订...')
+                with tracer.span('click', attempt=attempt):
+                    clicked = click_snapshot_button(hit.book, driver)
+                if clicked:
+                    return PollResult(f'成功尝试预订 {label}', hit, seat)
+                retry = True
+        except Exception as e:
+            _driver_error(e, attempt)
+            print(f'第{attempt}次尝试失败: {e}')
+        scheduler.record(ok)
+        _count_poll(ok)
+        
+        if attempt < max_attempts:
+            wait_time = scheduler.next_delay()
+            print(f'未命中任何目标，等待{wait_time:.2f}s后重试...')
+            if cancel.wait(wait_time):
+                return _missed(_CANCELLED_MSG)
+            with tracer.span('query', attempt=attempt+1):
+                try:
+                    _refresh_query(driver, cancel=cancel)
+                except DriverLost as e:
+                    e.attempt = attempt + 1
+                    raise
+    return _missed('未命中任何目标，可惜~')
+
+
+def _book_train_in_browser(driver, train, cancel=NEVER_CANCELLED):
+    """刷新页面查询结果并点击指定车次的预订按钮"""
+    _refresh_query(driver, cancel=cancel)
+    _until(driver, EC.presence_of_element_located((By.ID, 'queryLeftTable')), 5, cancel)
+    hit = TrainNumberStrategy((train,)).pick(TrainTable.from_snapshot(snapshot_rows(driver)))
+    if hit is not None:
+        return click_snapshot_button(hit.book, driver)
+    print(f'页面中未找到可预订的 {train}')
+    return False
+
+
+def book_with_query_engine(driver, engine, strategy, travel_date, from_code, to_code, purpose='ADULT',
+                           max_attempts=30, refresh_interval=(2,4), scheduler=None, tracer=NULL_TRACER,
+                           cancel=NEVER_CANCELLED, gate=None, recorder=NULL_RECORDER, start_attempt=1):
+    """接口直连模式抢票：轮询余票接口，命中后才回到浏览器点击预订"""
+    scheduler = scheduler or FixedIntervalScheduler(refresh_interval)
+    differ = RowDiffer()
+    retry = False
+    for attempt in range(start_attempt, max_attempts+1):
+        if cancel.cancelled:
+            return _missed(_CANCELLED_MSG)
+        ok = False
+        force, retry = retry, False
+        try:
+            with tracer.span('query', attempt=attempt, mode='json'):
+                rows = engine.query(travel_date, from_code, to_code, purpose)
+            with tracer.span('parse', attempt=attempt):
+                table, hit = _poll_snapshot(rows, differ, strategy, tracer, force, recorder)
+            ok = len(table) > 0
+            if hit is not None:
+                if gate is not None and not gate.claim():
+                    return _missed(_CANCELLED_MSG)
+                print(f'接口发现可预订车次 {hit.train} {hit.depart}，切回浏览器预订...')
+                with tracer.span('click', attempt=attempt):
+                    try:
+                        clicked = _book_train_in_browser(driver, hit.train, cancel)
+                    except Exception as e:
+                        # 接口查询的网络错误不代表浏览器失效，只检查回到浏览器这一步
+                        _driver_error(e, attempt)
+                        raise
+                if clicked:
+                    return PollResult(f'成功尝试预订车次 {hit.train}（出发 {hit.depart}）', hit, strategy.seat_for(hit))
+                retry = True
+            elif attempt == 1 or attempt % 5 == 0:
+                print(f'接口返回 {len(table)} 个车次，未命中{strategy.describe()}')
+        except DriverLost:
+            raise
+        except Exception as e:
+            METRICS.inc('query_errors_total', type=type(e).__name__)
+            print(f'第{attempt}次接口查询失败: {e}')
+        scheduler.record(ok)
+        _count_poll(ok)
+        
+        if attempt < max_attempts:
+            wait_time = scheduler.next_delay()
+            print(f'无匹配结果，等待{wait_time:.2f}s后重试...')
+            if cancel.wait(wait_time):
+                return _missed(_CANCELLED_MSG)
+    return _missed('没抢到，可惜~')
+
+
+def _apply_query_to_page(driver, travel_date, from_code, to_code):
+    """把购票页的查询条件切换为指定日期和站点电报码"""
+    driver.execute_script(
+        "var set = function (id, v) { var e = document.getElementById(id); if (e && v) { e.value = v; } };"
+        "set('train_date', arguments[0]); set('fromStation', arguments[1]); set('toStation', arguments[2]);",
+        travel_date, from_code, to_code,
+    )
+
+
+_STATION_LABELS = {'from': '出发地', 'to': '目的地'}
+
+# 直接写入站名与隐藏的电报码字段，页面未就绪时返回 false
+_SET_STATION_JS = """
+var t = document.getElementById(arguments[0] + 'StationText'), c = document.getElementById(arguments[0] + 'Station');
+if (!t || !c) { return false; }
+t.value = arguments[1]; c.value = arguments[2];
+return true;
+"""
+
+
+def _fill_station(driver, field, text, station, cancel):
+    """填写出发（field='from'）或到达（'to'）站
+
+    station 为本地车站字典的解析结果，直接写入电报码；为 None 时回退到输入后点击下拉联想第一项。
+    """
+    label = _STATION_LABELS[field]
+    if station is not None and driver.execute_script(_SET_STATION_JS, field, station.name, station.code):
+        print(f'✓ 已设置{label}: {station.name}（{station.code}）')
+        return
+    station_input = _until(driver, EC.element_to_be_clickable((By.ID, f'{field}StationText')), 8, cancel)
+    station_input.click()
+    station_input.clear()
+    station_input.send_keys(text)
+    print(f'✓ 已输入{label}: {text}')
+    first_option = _until(driver, EC.element_to_be_clickable((By.CSS_SELECTOR, '#citem_0 > span:nth-child(1)')), 6, cancel)
+    first_option.click()
+
+
+def fanout_queries(params, from_code, to_code, purpose='ADULT'):
+    """接口直连并发监控的查询，返回 (购票页当前显示的主查询, 本窗口监控的查询列表)
+
+    主查询之外按 watch_queries 追加，缺省字段沿用主查询；并行时按 worker_slice 切分，
+    因此窗口 i≥1 的列表可能不含主查询，命中后是否要切换页面须与返回的主查询比较。
+    """
+    page_query = WatchQuery(params['travel_date'], from_code, to_code, purpose)
+    queries = [page_query]
+    for q in params.get('watch_queries') or ():
+        queries.append(WatchQuery(q.get('travel_date') or params['travel_date'],
+                                  q.get('from_code') or from_code, q.get('to_code') or to_code, purpose))
+    if params.get('worker_slice'):
+        i, n = params['worker_slice']
+        queries = queries[i::n] or queries[:1]
+    return page_query, queries
+
+
+def book_with_fanout(driver, engine, strategy, queries, per_host_limit=2, request_budget=600, interval=(1.0, 2.0),
+                     scheduler=None, tracer=NULL_TRACER, cancel=NEVER_CANCELLED, gate=None, recorder=NULL_RECORDER,
+                     page_query=None):
+    """并发监控多组日期/站点，第一个命中的查询切回浏览器预订
+
+    page_query 为购票页当前显示的查询（缺省为 queries 的第一组）：命中其他查询时先把页面切换到该查询再预订。
+    scheduler 在各组查询间共用；每组查询各自增量比较车次表，recorder 只记录 page_query，
+    不同日期/站点的车次表不混进同一条记录。
+    """
+    differs = {}
+
+    def on_poll(query, rows):
+        _count_poll(bool(rows))
+        if not rows:
+            return None
+        differ = differs.get(query)
+        if differ is None:
+            differ = differs[query] = RowDiffer()
+        with tracer.span('parse', mode='fanout'):
+            _, hit = _poll_snapshot(rows, differ, strategy, tracer,
+                                    recorder=recorder if query == page_query else NULL_RECORDER)
+        return hit
+
+    poller = FanoutPoller(engine, queries, strategy, per_host_limit=per_host_limit, request_budget=request_budget,
+                          interval=interval, cancel=cancel, scheduler=scheduler, tracer=tracer, on_poll=on_poll)
+    page_query = WatchQuery(*page_query) if page_query is not None else poller.queries[0]
+    print(f'并发监控 {len(poller.queries)} 组查询，请求预算 {request_budget}')
+    hit = poller.watch()
+    if cancel.cancelled or (hit is not None and gate is not None and not gate.claim()):
+        return _missed(_CANCELLED_MSG)
+    if hit is None and poller.crashed:
+        return _missed(f'{poller.crashed} 组查询的监控异常退出（共请求 {poller.requests} 次，失败 {poller.errors} 次），没抢到')
+    if hit is None:
+        return _missed(f'请求预算耗尽（共 {poller.requests} 次，失败 {poller.errors} 次），没抢到，可惜~')
+    q = hit.query
+    print(f'第 {hit.requests} 次请求命中: {q.travel_date} {q.from_code}→{q.to_code} {hit.row.train} {hit.row.depart}')
+    with tracer.span('click', attempt=hit.requests):
+        try:
+            if q != page_query:
+                _apply_query_to_page(driver, q.travel_date, q.from_code, q.to_code)
+            clicked = _book_train_in_browser(driver, hit.row.train, cancel)
+        except Exception as e:
+            _driver_error(e)
+            raise
+    if clicked:
+        return PollResult(f'成功尝试预订 {q.travel_date} 车次 {hit.row.train}（出发 {hit.row.depart}）',
+                          hit.row, strategy.seat_for(hit.row))
+    return _missed(f'预订 {hit.row.train} 失败')
+
+
+def select_seat_fast(driver, preferred_type="first", passengers=None):
+    """按选座偏好（first / window / aisle）为每位乘车人选座
+
+    一次脚本读出整个选座面板，按席别布局判断靠窗/过道后再一次脚本点击，见 seat_map。
+    passengers 为乘车人数，缺省取订单页已勾选的人数。
+    """
+    label = {'first': '第一个可用座位', 'window': '靠窗', 'aisle': '靠过道'}.get(preferred_type, preferred_type)
     try:
-        WebDriverWait(driver, 10).until(
-            EC.presence_of_element_located((By.CLASS_NAME, 'seat-sel-bd'))
-        )
+        chosen, layout = select_seats(driver, preferred_type, passengers)
+        if chosen is None:
+            # 未经 OrderFlow 等待面板就绪时再等它出现
+            WebDriverWait(driver, 10).until(EC.presence_of_element_located((By.CLASS_NAME, 'seat-sel-bd')))
+            chosen, layout = select_seats(driver, preferred_type, passengers)
     except Exception as e:
-        print(f'座位选择对话框加载失败: {e}')
+        print(f'选座失败: {e}')
+        return False
+    if not chosen:
+        print('选座面板中没有可选的座位，将由系统分配')
         return False
+    print(f"✓ 已选座 {'、'.join(chosen)}（{layout}，偏好：{label}）")
+    return True
+
+
+def _save_session(driver, cookie_file):
+    if not cookie_file:
+        return
     try:
-        seats = driver.find_elements(By.XPATH, "//div[@class='seat-sel-bd']//a[contains(@href, 'javascript:')]")
-        if not seats:
-            return False
-        seats[0].click()
-        print('已快速选择一个座位')
-        return True
+        print(f'✓ 已保存登录会话（{save_cookies(driver, cookie_file)} 个 Cookie）')
     except Exception as e:
-        print(f'快速选座失败: {e}')
-        return False
+        print(f'⚠ 保存登录会话失败：{e}')
 
 
-def setup_browser_and_login():
-    """设置浏览器并完成登录（供预登录使用）"""
-    edge_options = Options()
-    edge_options.add_experimental_option('detach', True)
-    edge_options.add_argument('--disable-blink-features=AutomationControlled')
-    edge_options.add_argument('user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/140.0.0.0 Safari/537.36 Edg/140.0.3485.54')
-    edge_options.add_experimental_option('excludeSwitches', ['enable-logging'])
-    
-    driver = webdriver.Edge(options=edge_options)
+def setup_browser_and_login(profile_dir=DEFAULT_PROFILE_DIR, cookie_file=DEFAULT_COOKIE_FILE, debugger_address=None,
+                            lean=False, headless=False, blocked=None):
+    """设置浏览器并完成登录（供预登录使用）
+
+    先恢复持久化用户目录和 Cookie 存档中的上次会话并校验，失效时才走扫码登录；
+    debugger_address 非空时接管已运行的浏览器。profile_dir / cookie_file 为空表示不持久化。
+    lean / headless / blocked 见 browser_session.lean_settings。
+    """
+    t0 = time.perf_counter()
+    driver = launch_browser(profile_dir, debugger_address, lean, headless, blocked)
     
     try:
+        restored = 0
+        if not debugger_address:
+            try:
+                restored = restore_cookies(driver, cookie_file)
+            except Exception as e:
+                print(f'⚠ 恢复登录会话失败：{e}')
+        if session_is_logged_in(driver):
+            driver.get(HOME_URL)
+            print(f'✓ 已复用上次的登录会话，无需扫码（{time.perf_counter() - t0:.1f}s）')
+            _save_session(driver, cookie_file)
+            return driver
+        if restored:
+            print('上次的登录会话已失效，需要重新扫码')
+        if headless and not debugger_address:
+            # 无界面时看不到二维码，换成有界面的浏览器扫码
+            print('无界面模式下需要扫码，改为打开浏览器窗口')
+            driver.quit()
+            driver = launch_browser(profile_dir, None, lean, False, blocked)
+        
         driver.get('https://www.12306.cn')
         driver.maximize_window()
         print('✓ 已打开12306官网')
@@ -300,6 +891,7 @@ def setup_browser_and_login():
             return None
         
         print('✓ 登录成功！')
+        _save_session(driver, cookie_file)
         return driver
     
     except Exception as e:
@@ -311,66 +903,52 @@ def setup_browser_and_login():
         return None
 
 
-def run_booking_with_driver(driver, params):
-    """使用已登录的浏览器实例执行抢票（供GUI调用）"""
-    if not driver:
-        print('❌ 浏览器实例无效')
-        return
-    
-    print('=' * 60)
-    print('🚄 鲸介12306 抢票助手 - 开始抢票')
-    print('=' * 60)
-    print(f"出发站: {params['from_station']} → 到达站: {params['to_station']}")
-    print(f"日期: {params['travel_date']} | 票型: {params['ticket_type']}")
-    if params.get('target_train_number'):
-        print(f"策略: 指定车次 [{params['target_train_number']}]")
-    else:
-        tr = params['depart_time_range']
-        print(f"策略: 时间范围 [{tr['start']} - {tr['end']}]")
-    print('=' * 60)
-    
-    try:
-        # 进入购票页面
+def prepare_query_page(driver, params, cancel=NEVER_CANCELLED, tracer=NULL_TRACER):
+    """进入购票页并填好出发/到达站、日期和票种，成功返回 True
+
+    已在购票页时直接复用；开售前预热发现页面过期时也调用它重新填写。
+    """
+    # 进入购票页面
+    with tracer.span('navigation'):
         try:
-            ticket_link = WebDriverWait(driver, 8).until(EC.element_to_be_clickable((By.ID, 'link_for_ticket')))
-            ticket_link.click()
-            time.sleep(0.2)
-            if len(driver.window_handles) > 1:
+            if '/otn/leftTicket/init' in driver.current_url:
+                # 上一次抢票（或被停止的抢票）留在购票页，直接复用
+                pass
+            else:
+                try:
+                    ticket_link = _until(driver, EC.element_to_be_clickable((By.ID, 'link_for_ticket')), 3, cancel)
+                except Exception:
+                    driver.get(HOME_URL)
+                    ticket_link = _until(driver, EC.element_to_be_clickable((By.ID, 'link_for_ticket')), 8, cancel)
+                ticket_link.click()
+                cancel.sleep(0.2)
+            if len(driver.window_handles) > 1 and driver.current_window_handle != driver.window_handles[-1]:
                 driver.switch_to.window(driver.window_handles[-1])
+                if params.get('lean_mode'):
+                    # 资源屏蔽按标签页生效，新标签页需重新设置
+                    apply_lean_mode(driver, lean_settings(params)['blocked'])
             print('✓ 已进入购票页面')
         except Exception as e:
+            _driver_error(e)
             print(f'进入购票页面失败：{e}')
-            return
-        
-        # 填写出发站
-        try:
-            from_station_input = WebDriverWait(driver, 8).until(EC.element_to_be_clickable((By.ID, 'fromStationText')))
-            from_station_input.click()
-            from_station_input.clear()
-            from_station_input.send_keys(params['from_station'])
-            print(f"✓ 已输入出发地: {params['from_station']}")
-            first_option = WebDriverWait(driver, 6).until(EC.element_to_be_clickable((By.CSS_SELECTOR, '#citem_0 > span:nth-child(1)')))
-            first_option.click()
-        except Exception as e:
-            print(f'操作出发地输入框失败：{e}')
-            return
-        
-        # 填写到达站
-        try:
-            to_station_input = WebDriverWait(driver, 8).until(EC.element_to_be_clickable((By.ID, 'toStationText')))
-            to_station_input.click()
-            to_station_input.clear()
-            to_station_input.send_keys(params['to_station'])
-            print(f"✓ 已输入目的地: {params['to_station']}")
-            first_option = WebDriverWait(driver, 6).until(EC.element_to_be_clickable((By.CSS_SELECTOR, '#citem_0 > span:nth-child(1)')))
-            first_option.click()
-        except Exception as e:
-            print(f'操作目的地输入框失败：{e}')
-            return
-        
-        # 填写出发日期
+            return False
+    
+    # 填写出发站、到达站（本地车站字典能唯一解析时直接写入电报码）
+    stations = default_index(params.get('station_load_budget_ms'))
+    for field in ('from', 'to'):
+        text = params[f'{field}_station']
+        with tracer.span('station_fill', field=field):
+            try:
+                _fill_station(driver, field, text, stations.resolve(text), cancel)
+            except Exception as e:
+                _driver_error(e)
+                print(f'操作{_STATION_LABELS[field]}输入框失败：{e}')
+                return False
+    
+    # 填写出发日期
+    with tracer.span('form_fill', field='date'):
         try:
-            date_input = WebDriverWait(driver, 10).until(EC.element_to_be_clickable((By.ID, 'train_date')))
+            date_input = _until(driver, EC.element_to_be_clickable((By.ID, 'train_date')), 10, cancel)
             date_input.click()
             date_input.clear()
             date_input.send_keys(params['travel_date'])
@@ -380,111 +958,268 @@ def run_booking_with_driver(driver, params):
             except Exception:
                 pass
         except Exception as e:
+            _driver_error(e)
             print(f'时间输入框操作失败：{e}')
-            return
-        
-        # 选择票型
+            return False
+    
+    # 选择票型
+    with tracer.span('form_fill', field='ticket_type'):
         try:
             if params['ticket_type'] == 'student':
-                WebDriverWait(driver, 8).until(EC.element_to_be_clickable((By.ID, 'sf2'))).click()
+                _until(driver, EC.element_to_be_clickable((By.ID, 'sf2')), 8, cancel).click()
                 print('✓ 已选择学生票')
             else:
-                WebDriverWait(driver, 8).until(EC.element_to_be_clickable((By.ID, 'sf1'))).click()
+                _until(driver, EC.element_to_be_clickable((By.ID, 'sf1')), 8, cancel).click()
                 print('✓ 已选择成人票')
         except Exception as e:
+            _driver_error(e)
             print(f'票种选择失败：{e}')
-            return
-        
-        # 等待开售时间
-        try:
-            bst = (params.get('booking_start_time') or '').strip()
-            if bst:
-                start_datetime = datetime.strptime(bst, '%Y-%m-%d %H:%M:%S')
-                now = datetime.now()
-                if now < start_datetime:
-                    wait_seconds = (start_datetime - now).total_seconds()
-                    print(f'等待开售时间，还需 {wait_seconds:.1f} 秒...')
-                    if wait_seconds > 10:
-                        time.sleep(max(0, wait_seconds - 10))
-                    while datetime.now() < start_datetime:
-                        time.sleep(0.05)
-            print('🚀 到达抢票时间，开始抢票！')
-        except Exception as e:
-            print(f'时间处理出错: {e}')
-            return
-        
-        # 第一次查询
-        try:
-            query_button = WebDriverWait(driver, 8).until(EC.element_to_be_clickable((By.ID, 'query_ticket')))
-            query_button.click()
-            print('✓ 已提交查询，正在等待结果...')
-            time.sleep(0.2)
-        except Exception as e:
-            print(f'查询失败：{e}')
-            return
-        
-        # 执行抢票策略
-        ttn = (params.get('target_train_number') or '').strip().upper()
-        if ttn:
-            print(f'策略：指定车次 [{ttn}]')
-            result_msg = book_by_train_number(driver, ttn, max_attempts=30, refresh_interval=(2,4))
-        else:
-            tr = params['depart_time_range']
-            print(f"策略：时间范围 [{tr['start']} - {tr['end']}]")
-            result_msg = book_by_time_range(driver, tr['start'], tr['end'], max_attempts=30, refresh_interval=(2,4))
-        print(result_msg)
-        
-        # 选择乘车人
-        try:
-            passenger_checkbox = WebDriverWait(driver, 5).until(EC.element_to_be_clickable((By.ID, 'normalPassenger_0')))
-            passenger_checkbox.click()
-            print('✓ 已成功选择乘车人')
-        except Exception as e:
-            print(f'选择乘车人失败：{e}')
-        
-        try:
-            WebDriverWait(driver, 1).until(EC.element_to_be_clickable((By.ID, 'dialog_xsertcj_ok'))).click()
-        except Exception as e:
-            print(f'点击确认按钮失败：{e}')
-        
-        # 订单页票种选择
-        try:
-            if params['ticket_type'] == 'adult':
-                ticket_type_select = WebDriverWait(driver, 1).until(EC.presence_of_element_located((By.ID, 'ticketType_1')))
-                Select(ticket_type_select).select_by_value('1')
-                print('✓ 订单页已选择票种：成人票')
-        except Exception as e:
-            print(f'订单页选择票种失败：{e}')
-        
-        # 提交订单
-        try:
-            WebDriverWait(driver, 5).until(EC.element_to_be_clickable((By.ID, 'submitOrder_id'))).click()
-            print('✓ 已成功点击提交订单按钮')
-        except Exception as e:
-            print(f'点击提交订单按钮失败：{e}')
-        time.sleep(0.4)
-        
-        # 学生票提示
-        if params['ticket_type'] == 'student':
+            return False
+    return True
+
+
+def _warm_up(driver, params, warm_at, sale_at, engine=None, cancel=NEVER_CANCELLED, tracer=NULL_TRACER):
+    """在本地时刻 warm_at 预热（会话、DNS、连接、查询页），保活到 sale_at，返回 (结果表代数, 查询按钮)
+
+    查询页过期时重新填写，连续两次都失败时不做预热查询与保活，返回 None。
+    """
+    remaining = warm_at - time.time()
+    if remaining > 0:
+        cancel.sleep(remaining)
+    with tracer.span('warmup'):
+        stations = default_index(params.get('station_load_budget_ms'))
+        expect = {'date': params['travel_date']}
+        for field in ('from', 'to'):
+            station = stations.resolve(params[f'{field}_station'])
+            expect[field] = station.code if station else ''
+        warm = Warmup(driver, expect, engine=engine, cancel=cancel)
+        report = warm.run()
+        print(f'🔥 开售前预热：{report.describe()}')
+        if report.session_ok is False:
+            print('⚠ 登录已失效，请尽快在浏览器中重新登录，否则开售后无法下单')
+        if not report.page_ready and not (prepare_query_page(driver, params, cancel, tracer)
+                                          or prepare_query_page(driver, params, cancel, tracer)):
+            print('⚠ 预热时购票页未能重新填写，无法开始抢票')
+            return None
+        gen, button = install_table_observer(driver)
+        if params.get('warmup_query', True):
+            # 开售前先查询一次：走通查询脚本与接口，结果表就位后开售时只需比对代数
             try:
-                WebDriverWait(driver, 6).until(EC.element_to_be_clickable((By.ID, 'qd_closeDefaultWarningWindowDialog_id'))).click()
+                if button is None:
+                    button = _until(driver, EC.element_to_be_clickable((By.ID, 'query_ticket')), 8, cancel)
+                button.click()
+                if gen is None or wait_for_table_update(driver, gen, 5, cancel) is None:
+                    _until(driver, EC.presence_of_element_located((By.CSS_SELECTOR, '#queryLeftTable > tr')), 5, cancel)
             except Exception as e:
-                print(f'点击确认按钮失败：{e}')
-        
-        # 选座
-        select_seat_fast(driver, preferred_type=params.get('seat_position_preference','first'))
-        time.sleep(0.8)
+                print(f'预热查询失败：{e}')
+            gen, button = install_table_observer(driver)
+        if button is None:
+            button = _until(driver, EC.element_to_be_clickable((By.ID, 'query_ticket')), 8, cancel)
+    warm.keep_alive_until(sale_at, float(params.get('warmup_keepalive') or DEFAULT_KEEPALIVE_INTERVAL))
+    return gen, button
+
+
+def run_booking_with_driver(driver, params, cancel=NEVER_CANCELLED, gate=None, phase=0.0, clock=None, supervisor=None):
+    """使用已登录的浏览器实例执行抢票（供 GUI 和 booking_daemon 调用），完成最终确认时返回 True
+
+    cancel 取消后在 100ms 内停止（含等待开售与下单流程），浏览器可直接用于下一次抢票。
+    clock 为调用方已同步的 ServerClock（守护进程多个任务共享），传入时不再单独同步服务器时钟。
+    多窗口并行时由 worker_pool 传入预订闸门 gate，并在首次查询后等待 phase 秒错开刷新相位；
+    params['worker_slice'] = (序号, 总数) 时只监控分到本窗口的那部分 watch_queries。
+    supervisor 为 driver_supervisor.DriverSupervisor：浏览器崩溃或卡死时恢复浏览器，回到购票页从中断的那一轮继续；
+    未传入时会话失效即结束本次抢票。
+    """
+    if not driver:
+        print('❌ 浏览器实例无效')
+        return
+    
+    print('=' * 60)
+    print('🚄 鲸介12306 抢票助手 - 开始抢票')
+    print('=' * 60)
+    print(f"出发站: {params['from_station']} → 到达站: {params['to_station']}")
+    print(f"日期: {params['travel_date']} | 票型: {params['ticket_type']}")
+    if params.get('target_train_number'):
+        print(f"策略: 指定车次 [{params['target_train_number']}]")
+    else:
+        tr = params['depart_time_range']
+        print(f"策略: 时间范围 [{tr['start']} - {tr['end']}]")
+    print('=' * 60)
+    
+    tag = f'w{gate.worker}' if gate is not None else None
+    tracer = make_tracer(params, tag=tag)
+    recorder = make_recorder(params, tag=tag)
+    recorder.note('route', f"{params['from_station']}-{params['to_station']}")
+    recorder.note('date', params['travel_date'])
+    if params.get('booking_start_time'):
+        recorder.note('sale_start', params['booking_start_time'].strip())
+    engine = None
+    shared_clock = clock is not None
+    clock = clock or ServerClock()
+    scheduler = None
+    resume = 1
+    staggered = phase <= 0
+    try:
+        if supervisor is not None:
+            driver = supervisor.ensure(tracer)
+        while True:
+            try:
+                if not prepare_query_page(driver, params, cancel, tracer):
+                    return
+                
+                # 等待开售时间（按服务器时钟，开售前 sale_lead_ms 毫秒触发首次查询）；恢复后再次进入时已过开售时间，不再等待
+                with tracer.span('sale_wait'):
+                    try:
+                        first_gen, query_button = install_table_observer(driver)
+                        if query_button is None:
+                            query_button = _until(driver, EC.element_to_be_clickable((By.ID, 'query_ticket')), 8, cancel)
+                        bst = (params.get('booking_start_time') or '').strip()
+                        if bst:
+                            start_ts = datetime.strptime(bst, '%Y-%m-%d %H:%M:%S').timestamp()
+                            lead = float(params.get('sale_lead_ms', 0)) / 1000
+                            wait_seconds = start_ts - time.time()
+                            if wait_seconds > 0:
+                                print(f'等待开售时间，还需 {wait_seconds:.1f} 秒...')
+                                if not shared_clock and params.get('sync_server_clock', True) and wait_seconds > 15:
+                                    # 开售前 60 秒再同步，避免长时间等待后偏差漂移
+                                    if wait_seconds > 60:
+                                        cancel.sleep(wait_seconds - 60)
+                                    clock = sync_server_clock(params.get('clock_sync_url') or DEFAULT_SYNC_URL,
+                                                              sleep=cancel.sleep)
+                                    print(clock.describe())
+                                warm = float(params.get('warmup_seconds', DEFAULT_WARMUP_SECONDS) or 0)
+                                if warm > 0:
+                                    if engine is None and params.get('query_mode') == 'json':
+                                        engine = TicketQueryEngine.from_driver(
+                                            driver, base_url=params.get('query_base_url') or DEFAULT_BASE_URL)
+                                    warmed = _warm_up(
+                                        driver, params, clock.to_local(start_ts - warm), clock.to_local(start_ts - lead),
+                                        engine, cancel, tracer)
+                                    if warmed is None:
+                                        return
+                                    first_gen, query_button = warmed
+                                late = wait_for_sale(clock, start_ts, lead, sleep=cancel.sleep)
+                                print(f'触发误差 {late * 1000:.1f}ms')
+                        print('🚀 到达抢票时间，开始抢票！')
+                    except Exception as e:
+                        _driver_error(e, resume)
+                        print(f'时间处理出错: {e}')
+                        return
+                
+                # 第一次查询
+                with tracer.span('query', attempt=0):
+                    try:
+                        try:
+                            query_button.click()
+                        except Exception as e:
+                            _driver_error(e, resume)
+                            query_button = _until(driver, EC.element_to_be_clickable((By.ID, 'query_ticket')), 8, cancel)
+                            query_button.click()
+                        print('✓ 已提交查询，正在等待结果...')
+                        if first_gen is None or wait_for_table_update(driver, first_gen, 8, cancel) is None:
+                            _until(driver, EC.presence_of_element_located((By.CSS_SELECTOR, '#queryLeftTable > tr')), 8, cancel)
+                    except Exception as e:
+                        _driver_error(e, resume)
+                        print(f'查询失败：{e}')
+                        return
+                
+                if not staggered:
+                    # 每个窗口只错开一次：首轮轮询前浏览器恢复（resume 仍为 1）后不再重复等待
+                    staggered = True
+                    print(f'错开刷新相位 {phase:.2f}s')
+                    cancel.sleep(phase)
+                
+                # 执行抢票策略
+                try:
+                    strategy = compile_strategy(params)
+                except ValueError as e:
+                    print(f'抢票条件有误：{e}')
+                    return
+                if scheduler is None:
+                    # 恢复后沿用同一个调度器，刷新节奏从中断处继续
+                    scheduler = make_scheduler(params, refresh_interval=(2,4), clock_offset=clock.offset)
+                max_attempts = int(params.get('max_attempts') or (30 if params.get('refresh_mode') == 'fixed' else 200))
+                with supervisor.watching() if supervisor is not None else contextlib.nullcontext():
+                    if params.get('query_mode') == 'json':
+                        print(f'策略：{strategy.describe()}（接口直连查询）')
+                        from_code, to_code = station_codes_from_page(driver)
+                        if engine is None:
+                            engine = TicketQueryEngine.from_driver(driver, base_url=params.get('query_base_url') or DEFAULT_BASE_URL)
+                        purpose = '0X00' if params['ticket_type'] == 'student' else 'ADULT'
+                        if params.get('watch_queries'):
+                            page_query, queries = fanout_queries(params, from_code, to_code, purpose)
+                            result = book_with_fanout(driver, engine, strategy, queries,
+                                                      request_budget=int(params.get('request_budget', 600)),
+                                                      scheduler=scheduler, tracer=tracer, cancel=cancel, gate=gate,
+                                                      recorder=recorder, page_query=page_query)
+                        else:
+                            result = book_with_query_engine(driver, engine, strategy, params['travel_date'],
+                                                            from_code, to_code, purpose,
+                                                            max_attempts=max_attempts, scheduler=scheduler,
+                                                            tracer=tracer, cancel=cancel, gate=gate,
+                                                            recorder=recorder, start_attempt=resume)
+                    elif isinstance(strategy, PriorityStrategy):
+                        print(f'策略：{strategy.describe()}')
+                        result = book_with_strategy(driver, strategy, max_attempts=max_attempts, scheduler=scheduler,
+                                                    tracer=tracer, cancel=cancel, gate=gate, recorder=recorder,
+                                                    start_attempt=resume)
+                    elif isinstance(strategy, TrainNumberStrategy):
+                        # 直接使用上面编译好的策略，不再按原始参数重新编译
+                        print(f'策略：{strategy.describe()}')
+                        result = book_by_train_number(driver, None, max_attempts=max_attempts, scheduler=scheduler,
+                                                      snapshot=params.get('snapshot_mode', True), tracer=tracer,
+                                                      cancel=cancel, gate=gate, recorder=recorder,
+                                                      start_attempt=resume, strategy=strategy)
+                    else:
+                        print(f'策略：{strategy.describe()}')
+                        result = book_by_time_range(driver, None, None, max_attempts=max_attempts,
+                                                    scheduler=scheduler, snapshot=params.get('snapshot_mode', True),
+                                                    tracer=tracer, cancel=cancel, gate=gate, recorder=recorder,
+                                                    start_attempt=resume, strategy=strategy)
+                break
+            except DriverLost as e:
+                if supervisor is None:
+                    print(f'❌ {e}，无法继续抢票')
+                    return
+                driver = supervisor.recover(e.cause, tracer)
+                resume = e.attempt
+                print(f'↻ 回到购票页，从第 {resume} 轮继续')
+        print(result.message)
+        if result.row is None:
+            # 没抢到（预算耗尽 / 已停止 / 条件有误），订单页不存在，不进入下单流程
+            return
+        cancel.check()
+        if gate is not None and not gate.owns:
+            # 并行模式下只有取得预订权的窗口继续下单，保证不会重复提交订单
+            return
         
-        # 最终确认
-        try:
-            WebDriverWait(driver, 8).until(EC.element_to_be_clickable((By.ID, 'qr_submit_id'))).click()
-            print('✓ 已提交最终确认')
+        # 下单：乘车人 → 提示框 → 提交订单 → 选座 → 最终确认
+        flow = OrderFlow(driver, params, seat_selector=select_seat_fast, cancel=cancel,
+                         seat_types=[result.seat] if result.seat else ())
+        completed = flow.run()
+        for t in flow.timings:
+            tracer.record(t.step, t.ms, status=t.status)
+        print(flow.report())
+        if completed:
             print('=' * 60)
             print('🎉 抢票流程完成！请在浏览器中完成支付')
             print('=' * 60)
-        except Exception as e:
-            print(f'点击确认按钮失败：{e}')
+        elif supervisor is not None and check_health(driver, supervisor.health_timeout) is None:
+            # 下单中途浏览器失效：订单可能已经提交，不自动重新抢票，只恢复浏览器供用户确认
+            supervisor.recover('下单过程中浏览器失效', tracer)
+            print('⚠ 下单过程中浏览器失效，订单可能已提交，请先在 12306「未完成订单」中确认再决定是否重新抢票')
+        return completed
     
+    except Cancelled:
+        print('⏹ 已停止抢票，浏览器保持当前页面，可直接再次开始')
+    except RecoveryFailed as e:
+        print(f'❌ 浏览器恢复失败：{e}')
     except Exception as e:
         print(f'抢票过程出现异常: {e}')
         raise
+    finally:
+        if supervisor is not None and supervisor.recoveries:
+            print(f'♻ {supervisor.describe()}')
+        if engine is not None:
+            engine.close()
+        recorder.close()
+        tracer.close()
@@ -0,0 +1,448 @@
+"""
+鲸介12306 抢票助手 - 无界面批量抢票守护进程
+
+从任务目录读取多个任务（每个 *.json 一个，格式与 config.json 相同），按各自的 booking_start_time 调度：
+维护一个有上限、保持登录的预热浏览器池，只在任务开售前 lead 秒才为其分配浏览器，多个任务并发执行。
+全部任务共用一次同步的服务器时钟；任务状态写入机器可读的 JSON 状态文件，
+各任务的输出写入日志目录下的 <任务名>.log。
+
+用法：
+    python booking_daemon.py jobs/ [--browsers 3] [--lead 15] [--status daemon_status.json] [--watch] [--metrics-port 9306]
+
+开源协议：MIT License
+"""
+import argparse
+import json
+import os
+import signal
+import sys
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+from booking_core import run_booking_with_driver, setup_browser_and_login
+from browser_session import DEFAULT_COOKIE_FILE, DEFAULT_PROFILE_DIR, lean_settings, save_cookies, session_is_logged_in
+from cancellation import CancelToken
+from log_sink import RotatingLogFile, ThreadRoutedOutput
+from metrics import start_metrics_server
+from server_clock import DEFAULT_SYNC_URL, ServerClock, sync_server_clock
+from train_table import compile_strategy
+from worker_pool import clone_logged_in_driver
+
+DEFAULT_STATUS_FILE = 'daemon_status.json'
+# 开售前多少秒为任务分配浏览器（打开购票页、填写条件所需时间）
+DEFAULT_LEAD = 15.0
+# 空闲浏览器保活检查、服务器时钟重新同步的间隔（秒）
+KEEPALIVE_INTERVAL = 300.0
+CLOCK_RESYNC_INTERVAL = 600.0
+# 任务状态：等待调度 → 等待浏览器 → 运行中 → 已下单 / 未抢到 / 已取消 / 出错；配置有误为 invalid
+PENDING_STATES = ('scheduled', 'waiting_browser')
+
+
+def validate_job(params):
+    """检查任务配置，返回错误信息，无误时返回 None"""
+    for key, label in (('from_station', '出发站'), ('to_station', '到达站'), ('travel_date', '出发日期')):
+        if not (params.get(key) or '').strip():
+            return f'缺少{label}（{key}）'
+    try:
+        datetime.strptime(params['travel_date'], '%Y-%m-%d')
+        if params.get('booking_start_time'):
+            datetime.strptime(params['booking_start_time'], '%Y-%m-%d %H:%M:%S')
+        compile_strategy(params)
+    except (KeyError, ValueError) as e:
+        return f'配置有误：{e}'
+    return None
+
+
+class Job:
+    """一个抢票任务"""
+
+    def __init__(self, job_id, path, params=None, error=None):
+        self.id = job_id
+        self.path = path
+        self.params = params or {}
+        self.state = 'invalid' if error else 'scheduled'
+        self.error = error
+        bst = (self.params.get('booking_start_time') or '').strip()
+        self.start_ts = datetime.strptime(bst, '%Y-%m-%d %H:%M:%S').timestamp() if bst and not error else 0.0
+        self.browser = None
+        self.started_at = None
+        self.finished_at = None
+        self.token = None
+
+    @classmethod
+    def load(cls, path):
+        path = Path(path)
+        try:
+            with open(path, encoding='utf-8') as f:
+                params = json.load(f)
+        except (OSError, ValueError) as e:
+            return cls(path.stem, path, error=f'读取失败：{e}')
+        params.setdefault('ticket_type', 'adult')
+        params.setdefault('depart_time_range', {'start': '00:00', 'end': '23:59'})
+        return cls(path.stem, path, params, validate_job(params))
+
+    def status(self):
+        return {
+            'id': self.id,
+            'file': str(self.path),
+            'state': self.state,
+            'booking_start_time': self.params.get('booking_start_time') or None,
+            'browser': self.browser,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+            'error': self.error,
+        }
+
+
+def _quit_quietly(driver):
+    try:
+        driver.quit()
+    except Exception:
+        pass
+
+
+class BrowserPool:
+    """有上限的已登录浏览器池：第一个浏览器恢复会话或扫码登录，其余复制其 Cookie"""
+
+    def __init__(self, size, settings):
+        self.size = max(1, int(size))
+        self.settings = settings
+        self._lock = threading.Lock()
+        self._idle = []
+        self._drivers = []
+
+    def start(self):
+        s = self.settings
+        first = setup_browser_and_login(
+            profile_dir=s.get('browser_profile_dir', DEFAULT_PROFILE_DIR),
+            cookie_file=s.get('session_cookie_file', DEFAULT_COOKIE_FILE),
+            **lean_settings(s),
+        )
+        if first is None:
+            raise RuntimeError('登录失败，无法启动浏览器池')
+        self._drivers = [first]
+        for i in range(1, self.size):
+            try:
+                self._drivers.append(clone_logged_in_driver(first, s))
+            except Exception as e:
+                print(f'打开第 {i + 1} 个浏览器失败: {e}，浏览器池缩小为 {len(self._drivers)} 个')
+                break
+        self._idle = list(self._drivers)
+        print(f'✓ 浏览器池已就绪：{len(self._drivers)} 个已登录浏览器')
+
+    def browser_id(self, driver):
+        return self._drivers.index(driver) if driver in self._drivers else None
+
+    @property
+    def idle_count(self):
+        return len(self._idle)
+
+    @property
+    def total(self):
+        return len(self._drivers)
+
+    def try_acquire(self):
+        """取一个空闲浏览器，没有时返回 None（不阻塞）"""
+        with self._lock:
+            return self._idle.pop(0) if self._idle else None
+
+    def release(self, driver, healthy=True):
+        """归还浏览器；不可用时关闭并尽量用新的已登录浏览器替换"""
+        if healthy:
+            try:
+                driver.current_url
+            except Exception:
+                healthy = False
+        if not healthy:
+            driver = self._replace(driver)
+            if driver is None:
+                return
+        with self._lock:
+            self._idle.append(driver)
+
+    def _replace(self, dead):
+        _quit_quietly(dead)
+        with self._lock:
+            if dead not in self._drivers:
+                # 其他线程已替换或移除了它
+                return None
+            i = self._drivers.index(dead)
+            donors = [d for d in self._drivers if d is not dead]
+        for donor in donors:
+            try:
+                fresh = clone_logged_in_driver(donor, self.settings)
+            except Exception as e:
+                print(f'替换浏览器{i}失败: {e}')
+                continue
+            with self._lock:
+                replaced = dead in self._drivers
+                if replaced:
+                    self._drivers[self._drivers.index(dead)] = fresh
+            if not replaced:
+                # 打开新浏览器期间其他线程已处理了失效的浏览器，多出来的这个关掉
+                _quit_quietly(fresh)
+                return None
+            print(f'✓ 已替换失效的浏览器{i}')
+            return fresh
+        with self._lock:
+            if dead in self._drivers:
+                self._drivers.remove(dead)
+        print(f'⚠ 浏览器{i}已失效且无法替换，浏览器池剩余 {len(self._drivers)} 个')
+        return None
+
+    def retire(self, driver):
+        """把浏览器移出浏览器池但不关闭（留着待支付的订单页），并尽量用新的已登录浏览器补位"""
+        with self._lock:
+            if driver not in self._drivers:
+                return
+            i = self._drivers.index(driver)
+        print(f'浏览器{i}保留给已预订的订单，请在其中完成支付')
+        try:
+            fresh = clone_logged_in_driver(driver, self.settings)
+        except Exception as e:
+            with self._lock:
+                if driver in self._drivers:
+                    self._drivers.remove(driver)
+            print(f'⚠ 补充浏览器失败: {e}，浏览器池剩余 {len(self._drivers)} 个')
+            return
+        with self._lock:
+            pooled = driver in self._drivers
+            if pooled:
+                self._drivers[self._drivers.index(driver)] = fresh
+                self._idle.append(fresh)
+        if not pooled:
+            _quit_quietly(fresh)
+            return
+        print(f'✓ 已打开新的浏览器{i}补位')
+
+    def keep_warm(self):
+        """逐个检查空闲浏览器的登录状态，并刷新 Cookie 存档
+
+        每次只借出一个浏览器，其余仍可被任务分配，检查较慢时也不会让任务等待。
+        """
+        cookie_file = self.settings.get('session_cookie_file', DEFAULT_COOKIE_FILE)
+        for i in range(self.idle_count):
+            driver = self.try_acquire()
+            if driver is None:
+                break
+            healthy = True
+            try:
+                if not session_is_logged_in(driver):
+                    print('⚠ 浏览器池登录已失效，请重新启动守护进程扫码登录')
+                elif i == 0 and cookie_file:
+                    save_cookies(driver, cookie_file)
+            except Exception as e:
+                print(f'浏览器保活检查失败: {e}')
+                healthy = False
+            self.release(driver, healthy)
+
+    def close(self):
+        with self._lock:
+            drivers, self._drivers, self._idle = self._drivers, [], []
+        for d in drivers:
+            _quit_quietly(d)
+
+
+class BookingDaemon:
+    """按开售时间调度任务目录中的任务，在浏览器池上并发执行"""
+
+    def __init__(self, job_dir, pool, status_path=DEFAULT_STATUS_FILE, log_dir=None, lead=DEFAULT_LEAD,
+                 watch=False, rescan_interval=10.0, clock_sync_url=DEFAULT_SYNC_URL):
+        self.job_dir = Path(job_dir)
+        self.pool = pool
+        self.status_path = Path(status_path)
+        self.log_dir = Path(log_dir) if log_dir else self.status_path.parent / 'job_logs'
+        self.lead = float(lead)
+        self.watch = watch
+        self.rescan_interval = rescan_interval
+        self.clock_sync_url = clock_sync_url
+        self.clock = ServerClock()
+        self.jobs = {}
+        self.cancel_token = CancelToken()
+        self._threads = []
+        self._status_lock = threading.Lock()
+        self._output = None
+
+    # ---- 任务与状态 ----
+
+    def scan(self):
+        """加载任务目录中新出现的任务文件，返回新任务数"""
+        added = 0
+        for path in sorted(self.job_dir.glob('*.json')):
+            if path.stem in self.jobs:
+                continue
+            job = Job.load(path)
+            self.jobs[job.id] = job
+            added += 1
+            if job.state == 'invalid':
+                print(f'[{job.id}] 跳过：{job.error}')
+            else:
+                when = job.params.get('booking_start_time') or '立即'
+                print(f"[{job.id}] 已加载：{job.params['from_station']}→{job.params['to_station']} "
+                      f"{job.params['travel_date']}，开售 {when}")
+        if added:
+            self.write_status()
+        return added
+
+    def write_status(self):
+        """原子地写入状态文件（先写临时文件再替换）"""
+        with self._status_lock:
+            data = {
+                'updated_at': datetime.now().isoformat(timespec='seconds'),
+                'pid': os.getpid(),
+                'browsers': {'total': self.pool.total, 'idle': self.pool.idle_count},
+                'clock_offset_ms': round(self.clock.offset * 1000, 1),
+                'jobs': [j.status() for j in sorted(self.jobs.values(), key=lambda j: (j.start_ts, j.id))],
+            }
+            tmp = self.status_path.with_name(self.status_path.name + '.tmp')
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False, indent=2)
+            os.replace(tmp, self.status_path)
+
+    def _set_state(self, job, state, **fields):
+        job.state = state
+        for k, v in fields.items():
+            setattr(job, k, v)
+        self.write_status()
+
+    # ---- 执行 ----
+
+    def _run_job(self, job, driver):
+        log = RotatingLogFile(self.log_dir / f'{job.id}.log')
+        self._output.route(log)
+        healthy = True
+        try:
+            completed = run_booking_with_driver(driver, job.params, cancel=job.token, clock=self.clock)
+            state = 'booked' if completed else ('cancelled' if job.token.cancelled else 'finished')
+        except Exception as e:
+            state, healthy = 'failed', False
+            job.error = str(e)
+        finally:
+            self._output.unroute()
+            log.close()
+        if state == 'booked':
+            # 订单已提交待支付，浏览器不再分配给其他任务
+            self.pool.retire(driver)
+        else:
+            self.pool.release(driver, healthy)
+        self._set_state(job, state, finished_at=datetime.now().isoformat(timespec='seconds'))
+        print(f'[{job.id}] 结束：{state}')
+
+    def _dispatch(self, now):
+        """为已到分配时刻的任务分配空闲浏览器并启动，返回下一个任务的分配时刻"""
+        pending = sorted((j for j in self.jobs.values() if j.state in PENDING_STATES), key=lambda j: (j.start_ts, j.id))
+        for job in pending:
+            assign_at = self.clock.to_local(job.start_ts) - self.lead
+            if assign_at > now:
+                return assign_at
+            driver = self.pool.try_acquire()
+            if driver is None:
+                if job.state != 'waiting_browser':
+                    print(f'[{job.id}] 等待空闲浏览器')
+                    self._set_state(job, 'waiting_browser')
+                continue
+            job.token = self.cancel_token.child()
+            self._set_state(job, 'running', browser=self.pool.browser_id(driver),
+                            started_at=datetime.now().isoformat(timespec='seconds'))
+            print(f'[{job.id}] 分配浏览器{job.browser}，开始执行')
+            t = threading.Thread(target=self._run_job, args=(job, driver), name=f'job-{job.id}', daemon=True)
+            self._threads.append(t)
+            t.start()
+        return None
+
+    def _running(self):
+        self._threads = [t for t in self._threads if t.is_alive()]
+        return bool(self._threads)
+
+    def _maintain(self):
+        """后台：定期重新同步服务器时钟、检查空闲浏览器登录状态"""
+        synced_at = time.monotonic()
+        warmed_at = time.monotonic()
+        while not self.cancel_token.wait(5.0):
+            if time.monotonic() - synced_at > CLOCK_RESYNC_INTERVAL:
+                self.clock = sync_server_clock(self.clock_sync_url)
+                synced_at = time.monotonic()
+            if time.monotonic() - warmed_at > KEEPALIVE_INTERVAL:
+                self.pool.keep_warm()
+                warmed_at = time.monotonic()
+                self.write_status()
+
+    def run(self):
+        """运行直到全部任务结束（watch 模式下一直运行），或 stop() 被调用"""
+        self._output = ThreadRoutedOutput(sys.stdout)
+        sys.stdout = self._output
+        self.log_dir.mkdir(parents=True, exist_ok=True)
+        try:
+            self.clock = sync_server_clock(self.clock_sync_url)
+            print(self.clock.describe())
+            self.scan()
+            threading.Thread(target=self._maintain, name='daemon-maintain', daemon=True).start()
+            scanned_at = time.monotonic()
+            while not self.cancel_token.cancelled:
+                next_at = self._dispatch(time.time())
+                if not self.watch and next_at is None and not self._running() and \
+                        not any(j.state in PENDING_STATES for j in self.jobs.values()):
+                    break
+                if self.watch and time.monotonic() - scanned_at > self.rescan_interval:
+                    self.scan()
+                    scanned_at = time.monotonic()
+                delay = 0.5 if next_at is None else min(0.5, max(0.0, next_at - time.time()))
+                self.cancel_token.wait(delay)
+        finally:
+            self.cancel_token.cancel()
+            for t in self._threads:
+                t.join()
+            for job in self.jobs.values():
+                if job.state in PENDING_STATES:
+                    job.state = 'cancelled'
+            self.write_status()
+            sys.stdout = self._output.fallback
+        print('守护进程已退出')
+
+    def stop(self):
+        """取消全部任务（运行中的任务在 100ms 内停止）并退出"""
+        self.cancel_token.cancel()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='无界面批量抢票守护进程')
+    parser.add_argument('job_dir', help='任务目录（每个 *.json 一个任务，格式同 config.json）')
+    parser.add_argument('--browsers', type=int, default=2, help='浏览器池大小（同时运行的任务数上限）')
+    parser.add_argument('--lead', type=float, default=DEFAULT_LEAD, help='开售前多少秒分配浏览器')
+    parser.add_argument('--status', default=DEFAULT_STATUS_FILE, help='状态文件路径')
+    parser.add_argument('--log-dir', help='任务日志目录（默认状态文件旁的 job_logs/）')
+    parser.add_argument('--watch', action='store_true', help='持续运行并定期加载任务目录中的新任务')
+    parser.add_argument('--profile-dir', default=DEFAULT_PROFILE_DIR, help='浏览器用户目录')
+    parser.add_argument('--cookie-file', default=DEFAULT_COOKIE_FILE, help='登录会话存档')
+    parser.add_argument('--headless', action='store_true', help='无界面浏览器（需已保存有效会话）')
+    parser.add_argument('--lean', action='store_true', help='精简加载模式')
+    parser.add_argument('--clock-sync-url', default=DEFAULT_SYNC_URL)
+    parser.add_argument('--metrics-port', type=int, help='在 127.0.0.1 上提供运行指标 /metrics 的端口')
+    args = parser.parse_args(argv)
+
+    if not Path(args.job_dir).is_dir():
+        print(f'任务目录不存在: {args.job_dir}')
+        return 1
+    start_metrics_server({'metrics_port': args.metrics_port})
+    pool = BrowserPool(args.browsers, {
+        'browser_profile_dir': args.profile_dir,
+        'session_cookie_file': args.cookie_file,
+        'headless': args.headless,
+        'lean_mode': args.lean,
+    })
+    daemon = BookingDaemon(args.job_dir, pool, status_path=args.status, log_dir=args.log_dir, lead=args.lead,
+                           watch=args.watch, clock_sync_url=args.clock_sync_url)
+    try:
+        pool.start()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(sig, lambda *_: daemon.stop())
+        daemon.run()
+    finally:
+        pool.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
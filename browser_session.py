@@ -0,0 +1,177 @@
+"""
+鲸介12306 抢票助手 - 浏览器会话复用
+
+持久化浏览器用户目录 + Cookie 存档，启动时先恢复上次的登录会话，
+用一次轻量的登录状态接口请求校验，只有会话失效时才需要重新扫码；
+也可以通过调试地址接管一个已经打开并登录的 Edge（msedge --remote-debugging-port=9222）。
+
+精简模式（lean）：eager 页面加载策略（DOMContentLoaded 即返回），并通过 DevTools
+Network.setBlockedURLs 屏蔽图片、字体、统计/广告脚本等，可选无界面运行。
+
+开源协议：MIT License
+"""
+import json
+import os
+import time
+
+import urllib3
+from selenium import webdriver
+from selenium.webdriver.edge.options import Options
+
+DEFAULT_PROFILE_DIR = 'browser_profile'
+DEFAULT_COOKIE_FILE = 'session_cookies.json'
+HOME_URL = 'https://www.12306.cn/index/'
+LOGIN_CHECK_URL = 'https://kyfw.12306.cn/otn/login/conf'
+
+_COOKIE_FIELDS = ('name', 'value', 'domain', 'path', 'secure', 'httpOnly', 'expires', 'sameSite')
+
+# setBlockedURLs 只支持 URL 通配，资源类型按扩展名映射
+RESOURCE_TYPE_PATTERNS = {
+    'image': ('*.png*', '*.jpg*', '*.jpeg*', '*.gif*', '*.webp*', '*.bmp*', '*.ico*'),
+    'font': ('*.woff*', '*.ttf*', '*.otf*', '*.eot*'),
+    'media': ('*.mp4*', '*.webm*', '*.mp3*', '*.ogg*'),
+    'stylesheet': ('*.css*',),
+}
+DEFAULT_BLOCK_TYPES = ('image', 'font', 'media')
+# 统计 / 广告脚本
+DEFAULT_BLOCK_URLS = ('*hm.baidu.com*', '*cnzz.com*', '*google-analytics.com*', '*googletagmanager.com*',
+                      '*doubleclick.net*', '*ad.12306.cn*')
+
+
+def block_patterns(types=DEFAULT_BLOCK_TYPES, urls=DEFAULT_BLOCK_URLS):
+    """把资源类型和额外的 URL 通配合并为屏蔽列表"""
+    patterns = []
+    for t in types:
+        patterns.extend(RESOURCE_TYPE_PATTERNS.get(t, ()))
+    patterns.extend(urls)
+    return list(dict.fromkeys(patterns))
+
+
+def lean_settings(params):
+    """从抢票参数读取精简模式设置，返回 launch_browser 的关键字参数"""
+    return {
+        'lean': bool(params.get('lean_mode', False)),
+        'headless': bool(params.get('headless', False)),
+        'blocked': block_patterns(params.get('lean_block_types', DEFAULT_BLOCK_TYPES),
+                                  DEFAULT_BLOCK_URLS + tuple(params.get('lean_block_urls', ()))),
+    }
+
+
+def apply_lean_mode(driver, blocked=None):
+    """在当前标签页启用 URL 屏蔽；新开的标签页需要再调用一次"""
+    blocked = block_patterns() if blocked is None else blocked
+    driver.execute_cdp_cmd('Network.enable', {})
+    driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': blocked})
+    return len(blocked)
+
+
+def edge_options(profile_dir=None, lean=False, headless=False):
+    """抢票浏览器的 Edge 启动参数；profile_dir 为持久化用户目录"""
+    options = Options()
+    options.add_experimental_option('detach', True)
+    options.add_argument('--disable-blink-features=AutomationControlled')
+    options.add_argument('user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/140.0.0.0 Safari/537.36 Edg/140.0.3485.54')
+    options.add_experimental_option('excludeSwitches', ['enable-logging'])
+    if profile_dir:
+        options.add_argument(f'--user-data-dir={os.path.abspath(profile_dir)}')
+    if lean:
+        options.page_load_strategy = 'eager'
+    if headless:
+        options.add_argument('--headless=new')
+        options.add_argument('--window-size=1920,1080')
+    return options
+
+
+def launch_browser(profile_dir=DEFAULT_PROFILE_DIR, debugger_address=None, lean=False, headless=False, blocked=None):
+    """打开 Edge：有调试地址时接管已运行的浏览器，否则使用持久化用户目录启动"""
+    if debugger_address:
+        options = Options()
+        options.debugger_address = debugger_address
+        if lean:
+            options.page_load_strategy = 'eager'
+        driver = webdriver.Edge(options=options)
+        print(f'✓ 已接管调试地址 {debugger_address} 上的浏览器')
+    else:
+        try:
+            driver = webdriver.Edge(options=edge_options(profile_dir, lean, headless))
+        except Exception as e:
+            if not profile_dir:
+                raise
+            # 上次 detach 的浏览器仍占用用户目录等情况
+            print(f'⚠ 使用用户目录 {profile_dir} 启动失败（{e}），改用临时目录')
+            driver = webdriver.Edge(options=edge_options(None, lean, headless))
+    if lean:
+        try:
+            print(f'✓ 精简模式：eager 加载，屏蔽规则 {apply_lean_mode(driver, blocked)} 条')
+        except Exception as e:
+            print(f'⚠ 启用资源屏蔽失败：{e}')
+    return driver
+
+
+def all_cookies(driver):
+    """读取浏览器中全部域名的 Cookie（含会话 Cookie）"""
+    try:
+        return driver.execute_cdp_cmd('Network.getAllCookies', {})['cookies']
+    except Exception:
+        return driver.get_cookies()
+
+
+def save_cookies(driver, path=DEFAULT_COOKIE_FILE):
+    """保存 Cookie 存档（仅当前用户可读），返回保存数量"""
+    cookies = [{k: c[k] for k in _COOKIE_FIELDS if k in c} for c in all_cookies(driver)]
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        json.dump({'saved_at': time.time(), 'cookies': cookies}, f, ensure_ascii=False)
+    return len(cookies)
+
+
+def restore_cookies(driver, path=DEFAULT_COOKIE_FILE):
+    """把 Cookie 存档写回浏览器（无需先打开对应域名），返回恢复数量"""
+    if not path or not os.path.exists(path):
+        return 0
+    with open(path, encoding='utf-8') as f:
+        cookies = json.load(f).get('cookies') or []
+    now = time.time()
+    cookies = [c for c in cookies if not c.get('expires') or c['expires'] < 0 or c['expires'] > now]
+    if cookies:
+        driver.execute_cdp_cmd('Network.setCookies', {'cookies': cookies})
+    return len(cookies)
+
+
+def session_is_logged_in(driver, url=LOGIN_CHECK_URL, timeout=3.0):
+    """用浏览器 Cookie 请求登录配置接口，data.is_login 为 Y 表示会话有效"""
+    cookies = [c for c in all_cookies(driver) if c.get('domain', '').lstrip('.').endswith('12306.cn')]
+    headers = {
+        'Cookie': '; '.join(f"{c['name']}={c['value']}" for c in cookies),
+        'X-Requested-With': 'XMLHttpRequest',
+        'User-Agent': driver.execute_script('return navigator.userAgent;'),
+    }
+    try:
+        resp = urllib3.PoolManager(retries=False).request('POST', url, headers=headers, timeout=timeout)
+        data = json.loads(resp.data.decode('utf-8')).get('data') or {}
+    except Exception as e:
+        print(f'登录状态校验失败: {e}')
+        return False
+    return data.get('is_login') == 'Y'
+
+
+def copy_session(source, target):
+    """把 source 浏览器的全部 Cookie（含 kyfw 子域）复制到 target，返回复制数量"""
+    try:
+        cookies = source.execute_cdp_cmd('Network.getAllCookies', {})['cookies']
+        target.execute_cdp_cmd('Network.setCookies', {'cookies': [{k: c[k] for k in _COOKIE_FIELDS if k in c}
+                                                                  for c in cookies]})
+        return len(cookies)
+    except Exception:
+        pass
+    # 非 Chromium 内核：只能复制当前域名下的 Cookie
+    cookies = source.get_cookies()
+    target.get(source.current_url)
+    copied = 0
+    for c in cookies:
+        try:
+            target.add_cookie(c)
+            copied += 1
+        except Exception:
+            pass
+    return copied
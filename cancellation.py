@@ -0,0 +1,76 @@
+"""
+鲸介12306 抢票助手 - 协作式取消
+
+GUI 点击停止时取消 CancelToken，抢票线程在每次 WebDriver 调用之间检查；
+所有等待都换成可被取消立即唤醒的等待，页面内的长异步等待按 SLICE 切片，
+停止在 100ms 内生效，浏览器保持可用，可直接开始下一次抢票。
+
+开源协议：MIT License
+"""
+import threading
+
+# 页面内异步等待的切片长度（秒），决定最坏情况下的停止延迟
+SLICE = 0.08
+
+
+class Cancelled(BaseException):
+    """抢票已被取消
+
+    继承 BaseException（同 asyncio.CancelledError），不会被各步骤的 except Exception 吞掉。
+    """
+
+
+class CancelToken:
+    """可取消令牌；child() 派生的子令牌随父令牌一起取消，也可单独取消"""
+
+    def __init__(self, parent=None):
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._children = []
+        if parent is not None:
+            parent._adopt(self)
+
+    def _adopt(self, child):
+        with self._lock:
+            self._children.append(child)
+            cancelled = self._event.is_set()
+        if cancelled:
+            child.cancel()
+
+    def child(self):
+        return CancelToken(self)
+
+    def cancel(self):
+        with self._lock:
+            self._event.set()
+            children = list(self._children)
+        for c in children:
+            c.cancel()
+
+    @property
+    def cancelled(self):
+        return self._event.is_set()
+
+    def check(self):
+        """已取消时抛出 Cancelled"""
+        if self._event.is_set():
+            raise Cancelled()
+
+    def wait(self, seconds):
+        """等待 seconds 秒，取消时立即返回 True"""
+        return self._event.wait(seconds)
+
+    def sleep(self, seconds):
+        """可被取消的 time.sleep，取消时抛出 Cancelled"""
+        if self._event.wait(seconds):
+            raise Cancelled()
+
+
+class _NeverCancelled(CancelToken):
+    """未传入令牌时的默认值，永远不会被取消"""
+
+    def cancel(self):
+        pass
+
+
+NEVER_CANCELLED = _NeverCancelled()
@@ -0,0 +1,304 @@
+"""
+鲸介12306 抢票助手 - 浏览器守护与自动恢复
+
+Edge 崩溃、驱动进程退出或某条 WebDriver 命令卡死时，抢票线程原本只能打印异常后退出，
+GUI 仍持有失效的浏览器实例，只能重启程序重新扫码。DriverSupervisor 负责：
+    1. 判定会话失效：异常类型或消息属于会话丢失，或健康检查（一次 execute_script）超时未返回；
+    2. 看门狗：轮询期间每隔 watch_interval 秒做一次健康检查，卡死时结束驱动进程，
+       让阻塞中的 WebDriver 调用立即抛错，而不是等 HTTP 客户端 120 秒超时；
+    3. 恢复：先用新的驱动接管原浏览器（调试地址），浏览器已退出时按原用户目录重新启动
+       并写回 Cookie 存档，再校验登录状态；
+    4. 记录每次恢复的方式和耗时，调用方回到购票页后从中断的那一轮继续轮询。
+
+开源协议：MIT License
+"""
+import contextlib
+import threading
+import time
+
+import urllib3
+from selenium.common.exceptions import InvalidSessionIdException, NoSuchWindowException, WebDriverException
+
+from browser_session import (DEFAULT_COOKIE_FILE, DEFAULT_PROFILE_DIR, launch_browser, lean_settings,
+                             restore_cookies, save_cookies, session_is_logged_in)
+from metrics import METRICS
+from tracing import NULL_TRACER
+
+DEFAULT_HEALTH_TIMEOUT = 45.0
+DEFAULT_WATCH_INTERVAL = 15.0
+DEFAULT_MAX_RECOVERIES = 3
+# 抢票开始前的健康检查：此时没有其他命令在执行，正常浏览器几毫秒内即可返回
+IDLE_HEALTH_TIMEOUT = 5.0
+# 丢弃旧实例时等待 quit() 的上限（秒），卡死的驱动不再等待
+QUIT_TIMEOUT = 2.0
+
+# chromedriver / msedgedriver 在会话不可用时的错误消息片段
+_LOST_MARKERS = ('invalid session id', 'no such session', 'no such window', 'target window already closed',
+                 'not reachable', 'disconnected', 'session deleted', 'tab crashed', 'target crashed',
+                 'page crash', 'receiving message from renderer')
+
+
+def brief(exc):
+    """异常的一行摘要（去掉 Selenium 附带的文档链接和堆栈）"""
+    if isinstance(exc, str):
+        return exc
+    msg = (getattr(exc, 'msg', None) or str(exc) or type(exc).__name__).strip()
+    return msg.splitlines()[0].split('; For documentation')[0][:120]
+
+
+class DriverLost(Exception):
+    """浏览器会话已失效；attempt 为中断时的轮询轮次，恢复后从这一轮继续"""
+
+    def __init__(self, cause, attempt=1):
+        super().__init__(f'浏览器会话已失效：{brief(cause)}')
+        self.cause = cause
+        self.attempt = attempt
+
+
+class RecoveryFailed(Exception):
+    """浏览器无法恢复，或恢复后登录会话已失效，需要重新扫码登录"""
+
+
+def session_lost(exc):
+    """异常是否表示浏览器会话已不可用（而不是元素过期、等待超时等页面层面的失败）"""
+    if isinstance(exc, DriverLost):
+        return True
+    if isinstance(exc, (InvalidSessionIdException, NoSuchWindowException)):
+        return True
+    # 驱动进程退出后命令连接被拒绝 / 中途断开
+    if isinstance(exc, (urllib3.exceptions.HTTPError, ConnectionError)):
+        return True
+    if isinstance(exc, WebDriverException):
+        msg = (exc.msg or '').lower()
+        return any(m in msg for m in _LOST_MARKERS)
+    return False
+
+
+def check_health(driver, timeout=DEFAULT_HEALTH_TIMEOUT):
+    """在独立线程中执行一次最轻的脚本，返回耗时 ms；会话失效或 timeout 秒内未返回时返回 None
+
+    页面弹出提示框等仍有响应的错误不算失效。
+    """
+    result = []
+
+    def probe():
+        t0 = time.perf_counter()
+        try:
+            driver.execute_script('return 1')
+        except Exception as e:
+            if session_lost(e):
+                result.append(None)
+                return
+        result.append((time.perf_counter() - t0) * 1000)
+
+    th = threading.Thread(target=probe, name='driver-health', daemon=True)
+    th.start()
+    th.join(timeout)
+    return result[0] if result else None
+
+
+def debugger_address_of(driver):
+    """驱动启动的浏览器的调试地址（如 localhost:9222），用于驱动进程退出后重新接管"""
+    caps = getattr(driver, 'capabilities', None) or {}
+    for key in ('ms:edgeOptions', 'goog:chromeOptions'):
+        address = (caps.get(key) or {}).get('debuggerAddress')
+        if address:
+            return address
+    return None
+
+
+def _kill_service(driver):
+    """结束驱动进程，阻塞在该会话上的命令随即因连接断开抛错"""
+    proc = getattr(getattr(driver, 'service', None), 'process', None)
+    if proc is None:
+        return False
+    try:
+        proc.kill()
+        return True
+    except Exception:
+        return False
+
+
+def _discard(driver):
+    """尽力关闭旧实例；quit() 卡住时不等待，直接结束驱动进程"""
+    def quit_():
+        try:
+            driver.quit()
+        except Exception:
+            pass
+
+    th = threading.Thread(target=quit_, name='driver-quit', daemon=True)
+    th.start()
+    th.join(QUIT_TIMEOUT)
+    if th.is_alive():
+        _kill_service(driver)
+
+
+class Recovery:
+    __slots__ = ('reason', 'how', 'ms', 'logged_in')
+
+    def __init__(self, reason, how, ms, logged_in):
+        self.reason = reason
+        self.how = how
+        self.ms = ms
+        self.logged_in = logged_in
+
+    def describe(self):
+        state = '登录有效' if self.logged_in else '登录已失效'
+        return f'{self.how}，耗时 {self.ms / 1000:.1f}s，{state}（原因：{self.reason}）'
+
+
+class DriverSupervisor:
+    """守护一个已登录的浏览器实例；driver 属性始终是当前可用的实例
+
+    profile_dir / cookie_file / debugger_address / lean / headless / blocked 与 setup_browser_and_login 相同，
+    用于重新启动或接管浏览器；on_recover(driver) 在每次恢复成功后调用（GUI 借此替换自己持有的实例）。
+    launcher 缺省为 browser_session.launch_browser。
+    """
+
+    def __init__(self, driver, profile_dir=DEFAULT_PROFILE_DIR, cookie_file=DEFAULT_COOKIE_FILE,
+                 debugger_address=None, lean=False, headless=False, blocked=None,
+                 health_timeout=DEFAULT_HEALTH_TIMEOUT, watch_interval=DEFAULT_WATCH_INTERVAL,
+                 max_recoveries=DEFAULT_MAX_RECOVERIES, on_recover=None, launcher=launch_browser):
+        self.driver = driver
+        self.profile_dir = profile_dir
+        self.cookie_file = cookie_file
+        self.debugger_address = debugger_address
+        self.lean = lean
+        self.headless = headless
+        self.blocked = blocked
+        self.health_timeout = float(health_timeout)
+        self.watch_interval = float(watch_interval)
+        self.max_recoveries = int(max_recoveries)
+        self.on_recover = on_recover
+        self.launcher = launcher
+        self.recoveries = []
+        self.failed = False
+        self.hung = False
+        self._address = debugger_address or debugger_address_of(driver)
+
+    @classmethod
+    def from_params(cls, driver, params, on_recover=None):
+        """按抢票参数（含 GUI 的 extra_params）创建"""
+        return cls(driver,
+                   profile_dir=params.get('browser_profile_dir', DEFAULT_PROFILE_DIR),
+                   cookie_file=params.get('session_cookie_file', DEFAULT_COOKIE_FILE),
+                   debugger_address=params.get('debugger_address') or None,
+                   health_timeout=params.get('driver_health_timeout', DEFAULT_HEALTH_TIMEOUT),
+                   watch_interval=params.get('driver_watch_interval', DEFAULT_WATCH_INTERVAL),
+                   max_recoveries=params.get('max_recoveries', DEFAULT_MAX_RECOVERIES),
+                   on_recover=on_recover,
+                   **lean_settings(params))
+
+    def checkpoint(self):
+        """把当前 Cookie 写入存档，浏览器重新启动时恢复的就是最新的会话"""
+        if not self.cookie_file:
+            return 0
+        try:
+            return save_cookies(self.driver, self.cookie_file)
+        except Exception as e:
+            print(f'⚠ 保存登录会话失败：{e}')
+            return 0
+
+    def ensure(self, tracer=NULL_TRACER):
+        """开始抢票前确认浏览器可用，失效时先恢复；返回当前实例"""
+        if check_health(self.driver, min(self.health_timeout, IDLE_HEALTH_TIMEOUT)) is None:
+            return self.recover('开始前健康检查未通过', tracer)
+        self.checkpoint()
+        return self.driver
+
+    @contextlib.contextmanager
+    def watching(self):
+        """with 块内运行看门狗：健康检查在 health_timeout 秒内未返回即判定卡死并结束驱动进程"""
+        stop = threading.Event()
+        driver = self.driver
+
+        def watch():
+            while not stop.wait(self.watch_interval):
+                if check_health(driver, self.health_timeout) is not None:
+                    continue
+                if stop.is_set():
+                    return
+                print(f'⚠ 浏览器 {self.health_timeout:.0f}s 内无响应，判定为卡死，结束驱动进程')
+                self.hung = True
+                _kill_service(driver)
+                return
+
+        th = threading.Thread(target=watch, name='driver-watchdog', daemon=True)
+        th.start()
+        try:
+            yield self
+        finally:
+            stop.set()
+
+    def _attach(self):
+        """用新的驱动接管仍在运行的原浏览器，失败返回 None"""
+        try:
+            driver = self.launcher(None, self._address, self.lean, False, self.blocked)
+        except Exception as e:
+            print(f'接管原浏览器失败：{e}')
+            return None
+        if check_health(driver, IDLE_HEALTH_TIMEOUT) is None:
+            print('原浏览器无响应，改为重新启动')
+            _discard(driver)
+            return None
+        return driver
+
+    def _relaunch(self):
+        driver = self.launcher(self.profile_dir, None, self.lean, self.headless, self.blocked)
+        try:
+            restored = restore_cookies(driver, self.cookie_file)
+            print(f'✓ 已写回 {restored} 个 Cookie')
+        except Exception as e:
+            print(f'⚠ 恢复登录会话失败：{e}')
+        return driver
+
+    def recover(self, reason, tracer=NULL_TRACER):
+        """替换失效的浏览器实例并校验登录，返回新实例；无法恢复时抛出 RecoveryFailed
+
+        reason 为失效原因（异常或文字说明）。
+        """
+        reason = brief(reason)
+        if len(self.recoveries) >= self.max_recoveries:
+            self.failed = True
+            raise RecoveryFailed(f'本次抢票已恢复 {len(self.recoveries)} 次，不再重试')
+        print(f'♻ 浏览器会话失效（{reason}），正在恢复...')
+        t0 = time.perf_counter()
+        _discard(self.driver)
+        driver, how = None, ''
+        if self._address:
+            driver, how = self._attach(), '接管原浏览器'
+        if driver is None:
+            try:
+                driver, how = self._relaunch(), '重新启动浏览器'
+            except Exception as e:
+                self.failed = True
+                raise RecoveryFailed(f'重新启动浏览器失败：{e}') from e
+        try:
+            logged_in = session_is_logged_in(driver)
+        except Exception:
+            logged_in = False
+        ms = (time.perf_counter() - t0) * 1000
+        rec = Recovery(reason, how, ms, logged_in)
+        self.recoveries.append(rec)
+        METRICS.inc('driver_recoveries_total')
+        tracer.record('recovery', ms, how=how, ok=logged_in)
+        self.driver = driver
+        self._address = self.debugger_address or debugger_address_of(driver) or self._address
+        self.hung = False
+        if self.on_recover is not None:
+            self.on_recover(driver)
+        if not logged_in:
+            self.failed = True
+            print(f'❌ 浏览器已恢复但{rec.describe()}')
+            raise RecoveryFailed('登录会话已失效，需要重新扫码登录')
+        print(f'✓ 浏览器已恢复：{rec.describe()}')
+        self.checkpoint()
+        return driver
+
+    def describe(self):
+        if not self.recoveries:
+            return '浏览器运行正常，未发生恢复'
+        total = sum(r.ms for r in self.recoveries)
+        return f'共恢复 {len(self.recoveries)} 次，合计 {total / 1000:.1f}s：' + '；'.join(
+            r.describe() for r in self.recoveries)
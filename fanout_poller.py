@@ -0,0 +1,137 @@
+"""
+鲸介12306 抢票助手 - 多日期 / 多站点并发监控
+
+复用登录会话的 TicketQueryEngine，用 asyncio 同时轮询多组 (日期, 出发站, 到达站)，
+按查询实际请求的主机限制并发、按总预算限制请求数，返回第一个命中可预订车次的查询。
+同一个引擎的所有查询都发往同一主机，这时主机并发上限就是整体的并发上限。
+各组查询共用一个刷新调度器，每分钟请求上限与失败退避对全部并发请求生效。
+
+开源协议：MIT License
+"""
+import asyncio
+import random
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from metrics import METRICS
+from refresh_scheduler import FixedIntervalScheduler
+from tracing import NULL_TRACER
+from train_table import TrainTable
+
+WatchQuery = namedtuple('WatchQuery', 'travel_date from_code to_code purpose')
+WatchQuery.__new__.__defaults__ = ('ADULT',)
+
+WatchHit = namedtuple('WatchHit', 'query row requests')
+
+
+class FanoutPoller:
+    """并发监控多组查询，第一个命中即停止其余轮询
+
+    scheduler 决定每组查询两次请求之间的等待（缺省为 interval 内的固定随机间隔），并记录每次请求是否拿到车次表；
+    on_poll(query, rows) 处理一次请求的结果（请求失败时 rows 为 None），返回命中的 TrainRow 或 None，
+    缺省直接按 strategy 选择。on_poll 与 tracer 只在事件循环线程中调用。
+    """
+
+    def __init__(self, engine, queries, strategy, per_host_limit=2, request_budget=600, interval=(1.0, 2.0),
+                 cancel=None, scheduler=None, tracer=NULL_TRACER, on_poll=None):
+        self.engine = engine
+        self.queries = [q if isinstance(q, WatchQuery) else WatchQuery(*q) for q in queries]
+        self.strategy = strategy
+        self.per_host_limit = per_host_limit
+        self.request_budget = request_budget
+        self.interval = interval
+        self.scheduler = scheduler or FixedIntervalScheduler(interval)
+        self.tracer = tracer
+        self.on_poll = on_poll or self._pick
+        self.cancel = cancel  # 取消令牌：用户停止或其他窗口开始预订
+        self.requests = 0
+        self.errors = 0
+        self.crashed = 0  # 因异常提前退出的监控协程数
+        self._host_limits = {}
+
+    def _pick(self, query, rows):
+        return self.strategy.pick(TrainTable.from_snapshot(rows)) if rows else None
+
+    def host_of(self, query):
+        """query 实际请求的主机"""
+        return urlsplit(self.engine.query_url(*query)).netloc
+
+    def _host_limit(self, query):
+        host = self.host_of(query)
+        sem = self._host_limits.get(host)
+        if sem is None:
+            sem = self._host_limits[host] = asyncio.Semaphore(self.per_host_limit)
+        return sem
+
+    async def _watch_one(self, query, executor):
+        loop = asyncio.get_running_loop()
+        # 错开各查询的起始相位，避免同一时刻集中请求
+        await asyncio.sleep(random.uniform(0, self.interval[0]))
+        while self.requests < self.request_budget:
+            async with self._host_limit(query):
+                if self.requests >= self.request_budget:
+                    break
+                self.requests += 1
+                t0 = time.perf_counter()
+                try:
+                    rows = await loop.run_in_executor(executor, self.engine.query, *query)
+                except Exception as e:
+                    self.errors += 1
+                    METRICS.inc('query_errors_total', type=type(e).__name__)
+                    print(f'查询 {query.travel_date} {query.from_code}→{query.to_code} 失败: {e}')
+                    rows = None
+                self.tracer.record('query', (time.perf_counter() - t0) * 1000, attempt=self.requests, mode='fanout',
+                                   date=query.travel_date, route=f'{query.from_code}-{query.to_code}')
+            hit = self.on_poll(query, rows)
+            self.scheduler.record(bool(rows))
+            if hit is not None:
+                return WatchHit(query, hit, self.requests)
+            await asyncio.sleep(self.scheduler.next_delay())
+        return None
+
+    async def _wait_cancel(self):
+        while not self.cancel.cancelled:
+            await asyncio.sleep(0.05)
+
+    async def run(self):
+        """并发轮询，返回第一个 WatchHit；预算耗尽仍未命中或被取消返回 None"""
+        # 不等待执行中的请求结束，取消后立即返回
+        hosts = {self.host_of(q) for q in self.queries}
+        executor = ThreadPoolExecutor(max_workers=max(1, self.per_host_limit * len(hosts)))
+        watchers = {asyncio.ensure_future(self._watch_one(q, executor)): q for q in self.queries}
+        pending = set(watchers)
+        stopper = asyncio.ensure_future(self._wait_cancel()) if self.cancel is not None else None
+        if stopper is not None:
+            pending.add(stopper)
+        try:
+            while pending - {stopper}:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                if stopper in done:
+                    return None
+                for task in done:
+                    if task.cancelled():
+                        continue
+                    e = task.exception()
+                    if e is not None:
+                        # 结果处理（on_poll / 调度器）出错只会结束这一组查询，记下来而不是静默丢弃
+                        q = watchers[task]
+                        self.errors += 1
+                        self.crashed += 1
+                        METRICS.inc('query_errors_total', type=type(e).__name__)
+                        print(f'❌ 查询 {q.travel_date} {q.from_code}→{q.to_code} 的监控异常退出: {e!r}')
+                        continue
+                    if task.result() is not None:
+                        return task.result()
+            return None
+        finally:
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+            executor.shutdown(wait=False)
+
+    def watch(self):
+        """同步入口（在抢票线程中调用）"""
+        return asyncio.run(self.run())
@@ -16,15 +16,25 @@ from pathlib import Path
 
 # 导入核心抢票脚本
 from booking_core import setup_browser_and_login, run_booking_with_driver
+from browser_session import DEFAULT_PROFILE_DIR, DEFAULT_COOKIE_FILE, lean_settings
+from worker_pool import WorkerPool, clone_logged_in_driver
+from driver_supervisor import DriverSupervisor
+from metrics import METRICS, start_metrics_server, status_line
+from log_sink import QueueLogSink, RotatingLogFile
+from cancellation import CancelToken
+from station_index import default_index
+from train_table import compile_strategy
 
 CONFIG_PATH = 'config.json'
+# 配置文件中会覆盖界面所选策略的参数：界面抢票时不使用，保存配置时原样写回
+GUI_OVERRIDDEN_KEYS = ('booking_targets',)
 
 
 class TicketBookingApp:
     def __init__(self, root):
         self.root = root
         self.root.title("鲸介12306 抢票助手 v1.0")
-        self.root.geometry("700x850")
+        self.root.geometry("700x880")
         self.root.resizable(False, False)
         
         # 设置图标（如果存在）
@@ -36,10 +46,22 @@ class TicketBookingApp:
         self.booking_thread = None
         self.is_booking = False
         self.driver = None  # 保存浏览器实例
+        self.cancel_token = None  # 当前抢票的取消令牌
         self.is_logged_in = False  # 登录状态标记
+        self.extra_params = {}  # 配置文件中界面上没有的高级参数，原样保留
         
         self.setup_ui()
         self.load_config()
+        self.log_view.configure(max_lines=int(self.extra_params.get('log_max_lines', 2000)),
+                                log_file=self.extra_params.get('log_file') or None)
+        self.metrics_server = start_metrics_server(self.extra_params)
+        self._stats_prev = None
+        self.refresh_stats()
+        
+        # 有上次保存的登录会话时自动恢复，无需再点预登录
+        if self.extra_params.get('auto_restore_session', True) and \
+                os.path.exists(self.extra_params.get('session_cookie_file', DEFAULT_COOKIE_FILE)):
+            self.root.after(300, self.pre_login)
     
     def setup_ui(self):
         """构建用户界面"""
@@ -103,9 +125,11 @@ class TicketBookingApp:
         # 席别
         ttk.Label(section_frame, text="席别:").grid(row=4, column=0, sticky=tk.W, pady=5)
         self.seat_category_var = tk.StringVar(value="二等座")
+        # 可输入多个席别按优先顺序用 / 分隔，如 二等座/一等座
         seat_combo = ttk.Combobox(section_frame, textvariable=self.seat_category_var, 
-                                  values=["二等座", "一等座", "商务座", "硬座", "硬卧", "软卧"], 
-                                  width=22, state="readonly")
+                                  values=["二等座", "一等座", "商务座", "二等座/一等座", "硬座", "硬卧", "软卧",
+                                          "硬卧/硬座", "无座", "不限"], 
+                                  width=22)
         seat_combo.grid(row=4, column=1, sticky=tk.W, padx=5)
     
     def create_advanced_options_section(self, parent, start_row):
@@ -160,6 +184,14 @@ class TicketBookingApp:
         ttk.Label(booking_time_frame, text="(可留空)", foreground="gray").pack(side=tk.LEFT, padx=5)
         ttk.Label(section_frame, text="", foreground="gray").grid(row=5, column=1, sticky=tk.W, padx=5)
         ttk.Label(section_frame, text="格式: YYYY-MM-DD HH:MM:SS", foreground="gray").grid(row=5, column=1, sticky=tk.W, padx=5)
+        
+        # 并行窗口数
+        ttk.Label(section_frame, text="并行窗口:").grid(row=6, column=0, sticky=tk.W, pady=5)
+        workers_frame = ttk.Frame(section_frame)
+        workers_frame.grid(row=6, column=1, sticky=tk.W, padx=5)
+        self.worker_count_var = tk.StringVar(value="1")
+        ttk.Spinbox(workers_frame, from_=1, to=4, textvariable=self.worker_count_var, width=5, state="readonly").pack(side=tk.LEFT)
+        ttk.Label(workers_frame, text="(多个浏览器错开刷新，只会提交一个订单)", foreground="gray").pack(side=tk.LEFT, padx=5)
     
     def create_action_buttons(self, parent, start_row):
         """创建操作按钮区域"""
@@ -208,15 +240,30 @@ class TicketBookingApp:
                                                    wrap=tk.WORD, font=("Consolas", 9))
         self.log_text.pack(fill=tk.BOTH, expand=True)
         
-        # 重定向标准输出到日志窗口
-        sys.stdout = TextRedirector(self.log_text, "stdout")
+        # 重定向标准输出：工作线程只入队，由 Tk 线程定时批量写入日志窗口
+        self.log_sink = QueueLogSink()
+        self.log_view = LogView(self.root, self.log_text, self.log_sink)
+        sys.stdout = self.log_sink
     
     def create_status_bar(self, parent, start_row):
         """创建状态栏"""
         self.status_var = tk.StringVar(value="就绪")
         status_bar = ttk.Label(parent, textvariable=self.status_var, 
                               relief=tk.SUNKEN, anchor=tk.W)
-        status_bar.grid(row=start_row, column=0, columnspan=2, sticky=(tk.W, tk.E))
+        status_bar.grid(row=start_row, column=0, sticky=(tk.W, tk.E))
+        # 运行指标摘要：轮询次数/速率、错误率、距上次成功查询的时间
+        self.stats_var = tk.StringVar(value="")
+        stats_bar = ttk.Label(parent, textvariable=self.stats_var,
+                              relief=tk.SUNKEN, anchor=tk.E)
+        stats_bar.grid(row=start_row, column=1, sticky=(tk.W, tk.E))
+    
+    def refresh_stats(self):
+        """每秒刷新状态栏的运行指标摘要"""
+        snap = METRICS.snapshot()
+        if snap.total('polls_total'):
+            self.stats_var.set(status_line(snap, self._stats_prev))
+        self._stats_prev = snap
+        self.root.after(1000, self.refresh_stats)
     
     def on_strategy_change(self):
         """策略切换时的回调"""
@@ -257,7 +304,12 @@ class TicketBookingApp:
             print("🔐 预登录12306")
             print("=" * 60)
             
-            self.driver = setup_browser_and_login()
+            self.driver = setup_browser_and_login(
+                profile_dir=self.extra_params.get('browser_profile_dir', DEFAULT_PROFILE_DIR),
+                cookie_file=self.extra_params.get('session_cookie_file', DEFAULT_COOKIE_FILE),
+                debugger_address=self.extra_params.get('debugger_address') or None,
+                **lean_settings(self.extra_params),
+            )
             
             if self.driver:
                 self.is_logged_in = True
@@ -283,7 +335,8 @@ class TicketBookingApp:
             "靠过道座位": "aisle"
         }
         
-        params = {
+        params = {k: v for k, v in self.extra_params.items() if k not in GUI_OVERRIDDEN_KEYS}
+        params.update({
             'from_station': self.from_station_var.get().strip(),
             'to_station': self.to_station_var.get().strip(),
             'travel_date': self.travel_date_var.get().strip(),
@@ -291,7 +344,8 @@ class TicketBookingApp:
             'seat_category': self.seat_category_var.get(),
             'seat_position_preference': seat_position_map.get(self.seat_position_var.get(), 'first'),
             'booking_start_time': self.booking_start_time_var.get().strip(),
-        }
+            'worker_count': int(self.worker_count_var.get() or 1),
+        })
         
         if self.strategy_var.get() == "time_range":
             params['depart_time_range'] = {
@@ -332,6 +386,19 @@ class TicketBookingApp:
                 messagebox.showerror("参数错误", "开售时间格式错误，应为 YYYY-MM-DD HH:MM:SS")
                 return False
         
+        try:
+            compile_strategy(params)
+        except ValueError as e:
+            messagebox.showerror("参数错误", str(e))
+            return False
+        
+        # 车站字典无法唯一解析的站名仍可通过下拉联想填写，这里只做提示
+        stations = default_index(params.get('station_load_budget_ms'))
+        for label, name in (('出发站', params['from_station']), ('到达站', params['to_station'])):
+            if len(stations) and stations.resolve(name) is None:
+                similar = '、'.join(st.name for st in stations.lookup(name, 5))
+                print(f"车站字典中未唯一匹配{label}“{name}”，将使用下拉联想填写" + (f"（相近：{similar}）" if similar else ''))
+        
         return True
     
     def start_booking(self):
@@ -364,6 +431,7 @@ class TicketBookingApp:
         self.stop_button.config(state=tk.NORMAL)
         self.login_button.config(state=tk.DISABLED)
         self.status_var.set("抢票中...")
+        self.cancel_token = CancelToken()
         
         # 在新线程中运行抢票
         self.booking_thread = threading.Thread(target=self.run_booking, args=(params,), daemon=True)
@@ -373,7 +441,19 @@ class TicketBookingApp:
         """在后台线程中运行抢票逻辑"""
         try:
             from booking_core import run_booking_with_driver
-            run_booking_with_driver(self.driver, params)
+            if params.get('worker_count', 1) > 1:
+                self.run_parallel_booking(params)
+            else:
+                supervisor = DriverSupervisor.from_params(self.driver, params, on_recover=self.on_driver_recovered)
+                try:
+                    run_booking_with_driver(self.driver, params, cancel=self.cancel_token, supervisor=supervisor)
+                finally:
+                    self.driver = supervisor.driver
+                    if supervisor.failed:
+                        # 浏览器无法恢复或登录已失效：提示重新登录，而不是继续显示已登录
+                        self.is_logged_in = False
+                        self.root.after(0, lambda: self.login_status_label.config(text="✗ 浏览器已断开，请重新登录",
+                                                                                  foreground="red"))
         except Exception as e:
             print(f"抢票过程出错: {e}")
             messagebox.showerror("错误", f"抢票过程出错: {e}")
@@ -381,12 +461,41 @@ class TicketBookingApp:
             self.is_booking = False
             self.root.after(0, self.on_booking_finished)
     
+    def on_driver_recovered(self, driver):
+        """抢票中浏览器被自动恢复后，换用新的实例"""
+        self.driver = driver
+        self.root.after(0, lambda: self.login_status_label.config(text="✓ 已登录（浏览器已恢复）", foreground="green"))
+    
+    def run_parallel_booking(self, params):
+        """复制登录会话打开额外的浏览器，多窗口错开相位并行抢票"""
+        drivers = [self.driver]
+        for i in range(1, params['worker_count']):
+            try:
+                drivers.append(clone_logged_in_driver(self.driver, params))
+            except Exception as e:
+                print(f'打开第 {i + 1} 个浏览器失败: {e}')
+                break
+        try:
+            winner = WorkerPool(drivers, params, cancel=self.cancel_token).run()
+        finally:
+            # 关闭未预订的额外浏览器，预订成功的窗口留给用户支付
+            for i, d in enumerate(drivers[1:], start=1):
+                if i != winner:
+                    try:
+                        d.quit()
+                    except Exception:
+                        pass
+        if winner is not None:
+            print(f'窗口{winner} 已进入下单流程，请在该浏览器中完成支付')
+    
     def stop_booking(self):
         """停止抢票"""
         if messagebox.askyesno("确认", "确定要停止抢票吗？"):
             self.is_booking = False
-            self.status_var.set("已停止")
-            self.start_button.config(state=tk.NORMAL)
+            if self.cancel_token:
+                self.cancel_token.cancel()
+            # 抢票线程在 100ms 内退出后由 on_booking_finished 恢复按钮
+            self.status_var.set("正在停止...")
             self.stop_button.config(state=tk.DISABLED)
             print("\n用户手动停止抢票")
     
@@ -400,6 +509,7 @@ class TicketBookingApp:
     def save_config(self):
         """保存配置到文件"""
         params = self.get_params()
+        params.update((k, self.extra_params[k]) for k in GUI_OVERRIDDEN_KEYS if k in self.extra_params)
         try:
             with open(CONFIG_PATH, 'w', encoding='utf-8') as f:
                 json.dump(params, f, ensure_ascii=False, indent=2)
@@ -416,6 +526,7 @@ class TicketBookingApp:
         try:
             with open(CONFIG_PATH, 'r', encoding='utf-8') as f:
                 params = json.load(f)
+            self.extra_params = params
             
             # 选座偏好英文转中文映射
             seat_position_reverse_map = {
@@ -435,6 +546,7 @@ class TicketBookingApp:
             self.seat_position_var.set(seat_position_reverse_map.get(seat_pref, '第一个可用座位'))
             
             self.booking_start_time_var.set(params.get('booking_start_time', ''))
+            self.worker_count_var.set(str(params.get('worker_count', 1)))
             
             # 加载策略相关参数
             if params.get('target_train_number'):
@@ -450,22 +562,53 @@ class TicketBookingApp:
                 self.on_strategy_change()
             
             print(f"已加载配置: {os.path.abspath(CONFIG_PATH)}")
+            if params.get('booking_targets'):
+                print("⚠ 配置中的 booking_targets（多目标优先级）仅在命令行/守护进程中生效，界面抢票按所选策略进行")
         except Exception as e:
             messagebox.showerror("错误", f"加载配置失败: {e}")
 
 
-class TextRedirector:
-    """将标准输出重定向到 Text 组件"""
-    def __init__(self, widget, tag="stdout"):
+class LogView:
+    """在 Tk 线程中定时把日志队列批量写入 Text 组件，只保留最后 max_lines 行"""
+    def __init__(self, root, widget, sink, max_lines=2000, interval_ms=100):
+        self.root = root
         self.widget = widget
-        self.tag = tag
+        self.sink = sink
+        self.max_lines = max_lines
+        self.interval_ms = interval_ms
+        self.log_file = None
+        self.root.after(self.interval_ms, self.drain)
     
-    def write(self, text):
-        self.widget.insert(tk.END, text)
-        self.widget.see(tk.END)
+    def configure(self, max_lines=None, log_file=None):
+        """调整保留行数；log_file 非空时同时写入轮转日志文件"""
+        if max_lines:
+            self.max_lines = max_lines
+        if log_file and (self.log_file is None or self.log_file.path != log_file):
+            if self.log_file:
+                self.log_file.close()
+            try:
+                self.log_file = RotatingLogFile(log_file)
+            except OSError as e:
+                self.log_file = None
+                print(f"打开日志文件失败: {e}")
     
-    def flush(self):
-        pass
+    def drain(self):
+        try:
+            chunks = self.sink.drain()
+            if chunks:
+                text = ''.join(chunks)
+                if self.log_file:
+                    self.log_file.write(text)
+                # 一批超过保留行数时只插入末尾部分
+                if text.count('\n') > self.max_lines:
+                    text = '\n'.join(text.split('\n')[-self.max_lines - 1:])
+                self.widget.insert(tk.END, text)
+                lines = int(self.widget.index('end-1c').split('.')[0])
+                if lines > self.max_lines:
+                    self.widget.delete('1.0', f'{lines - self.max_lines + 1}.0')
+                self.widget.see(tk.END)
+        finally:
+            self.root.after(self.interval_ms, self.drain)
 
 
 def main():
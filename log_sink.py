@@ -0,0 +1,96 @@
+"""
+鲸介12306 抢票助手 - 日志管道
+
+抢票 / 登录线程的 print 只把文本追加到有界队列，从不阻塞也不触碰 Tk 组件；
+GUI 线程定时批量取出写入日志窗口，并可同时写入按大小轮转的日志文件。
+无界面守护进程则按线程把各任务的输出分流到各自的日志文件。
+
+开源协议：MIT License
+"""
+import logging
+import threading
+from collections import deque
+from logging.handlers import RotatingFileHandler
+
+
+class QueueLogSink:
+    """替代 sys.stdout 的非阻塞日志汇
+
+    队列满（GUI 长时间未取）时丢弃最旧的片段，内存有上限。
+    """
+    encoding = 'utf-8'
+
+    def __init__(self, max_pending=50000):
+        self._queue = deque(maxlen=max_pending)
+
+    def write(self, text):
+        if text:
+            self._queue.append(text)
+        return len(text)
+
+    def flush(self):
+        pass
+
+    def isatty(self):
+        return False
+
+    def drain(self, limit=5000):
+        """取出至多 limit 个片段（在 GUI 线程调用）"""
+        out = []
+        pop = self._queue.popleft
+        try:
+            for _ in range(limit):
+                out.append(pop())
+        except IndexError:
+            pass
+        return out
+
+
+class RotatingLogFile:
+    """按行写入带时间戳的日志文件，超过 max_bytes 时轮转，保留 backup_count 个旧文件"""
+
+    def __init__(self, path, max_bytes=5 * 1024 * 1024, backup_count=3):
+        self.path = path
+        self._handler = RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backup_count, encoding='utf-8')
+        self._handler.setFormatter(logging.Formatter('%(asctime)s %(message)s'))
+        self._partial = ''
+
+    def _emit(self, line):
+        self._handler.emit(logging.LogRecord('booking', logging.INFO, __file__, 0, line, None, None))
+
+    def write(self, text):
+        *lines, self._partial = (self._partial + text).split('\n')
+        for line in lines:
+            self._emit(line)
+
+    def close(self):
+        if self._partial:
+            self._emit(self._partial)
+            self._partial = ''
+        self._handler.close()
+
+
+class ThreadRoutedOutput:
+    """替代 sys.stdout，按线程把输出分流到 route() 登记的日志汇，未登记的线程写入 fallback"""
+    encoding = 'utf-8'
+
+    def __init__(self, fallback):
+        self.fallback = fallback
+        self._sinks = {}
+
+    def route(self, sink):
+        """当前线程之后的输出写入 sink"""
+        self._sinks[threading.get_ident()] = sink
+
+    def unroute(self):
+        self._sinks.pop(threading.get_ident(), None)
+
+    def write(self, text):
+        self._sinks.get(threading.get_ident(), self.fallback).write(text)
+        return len(text)
+
+    def flush(self):
+        self.fallback.flush()
+
+    def isatty(self):
+        return False
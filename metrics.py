@@ -0,0 +1,281 @@
+"""
+鲸介12306 抢票助手 - 运行指标
+
+长时间值守时，不用翻日志就能看到轮询速率、错误率和距上次成功查询的时间。
+booking_core 在轮询循环中累加下列计数器和直方图：
+    auto12306_polls_total                      轮询次数
+    auto12306_poll_success_total               拿到非空车次表的轮询次数
+    auto12306_parse_seconds                    车次表解析耗时（直方图）
+    auto12306_click_attempts_total{result}     点击预订（ok / failed）
+    auto12306_webdriver_errors_total{type}     WebDriver 错误，按异常类型
+    auto12306_query_errors_total{type}         接口直连查询错误，按异常类型
+    auto12306_refresh_fallbacks_total          点击查询失败、回退为 driver.refresh() 整页刷新
+    auto12306_driver_recoveries_total          浏览器自动恢复次数
+    auto12306_last_success_age_seconds         距上次成功查询的秒数
+写入走线程本地分片：每个线程只改自己的字典，不加锁，只有线程第一次写入时注册分片要加一次锁；
+读取（导出、界面刷新）时再把各分片相加。已结束线程的分片在注册新分片或读取时并入基础分片，
+分片数不随抢票次数、工作线程数增长。
+
+设置 metrics_port 后在 127.0.0.1 上提供 Prometheus 文本格式的 /metrics：
+    curl http://127.0.0.1:9306/metrics
+
+开源协议：MIT License
+"""
+import bisect
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+PREFIX = 'auto12306_'
+# 直方图桶上限（秒）
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+DEFAULT_METRICS_HOST = '127.0.0.1'
+
+# 指标名 → (类型, 说明)；未登记的指标按 untyped 导出
+METRIC_HELP = {
+    'polls_total': ('counter', '轮询次数'),
+    'poll_success_total': ('counter', '拿到非空车次表的轮询次数'),
+    'parse_seconds': ('histogram', '车次表解析耗时'),
+    'click_attempts_total': ('counter', '点击预订次数'),
+    'webdriver_errors_total': ('counter', 'WebDriver 错误次数（按异常类型）'),
+    'query_errors_total': ('counter', '接口直连查询错误次数（按异常类型）'),
+    'refresh_fallbacks_total': ('counter', '点击查询失败后回退为整页刷新的次数'),
+    'driver_recoveries_total': ('counter', '浏览器自动恢复次数'),
+    'last_success_age_seconds': ('gauge', '距上次成功查询的秒数'),
+    'uptime_seconds': ('gauge', '进程开始记录指标以来的秒数'),
+}
+
+
+class _Shard:
+    """单个线程写入的指标；键为 (指标名, 标签元组)"""
+    __slots__ = ('counters', 'hists', 'stamps')
+
+    def __init__(self):
+        self.counters = {}
+        self.hists = {}
+        self.stamps = {}
+
+    def merge(self, other):
+        """把 other 的数据加到本分片；直方图整条替换为新列表，读取方不会看到加了一半的结果"""
+        for key, v in list(other.counters.items()):
+            self.counters[key] = self.counters.get(key, 0) + v
+        for key, h in list(other.hists.items()):
+            acc = self.hists.get(key)
+            self.hists[key] = list(h) if acc is None else [a + b for a, b in zip(acc, h)]
+        for key, ts in list(other.stamps.items()):
+            if ts > self.stamps.get(key, 0):
+                self.stamps[key] = ts
+
+
+def _key(name, labels):
+    return name, tuple(sorted(labels.items())) if labels else ()
+
+
+class Snapshot:
+    """某一时刻各分片相加后的指标"""
+
+    def __init__(self, at, started, buckets, counters, hists, stamps):
+        self.at = at
+        self.started = started
+        self.buckets = buckets
+        self.counters = counters
+        self.hists = hists
+        self.stamps = stamps
+
+    def total(self, name):
+        """计数器所有标签之和"""
+        return sum(v for (n, _), v in self.counters.items() if n == name)
+
+    def by_label(self, name):
+        """{标签元组: 值}"""
+        return {labels: v for (n, labels), v in self.counters.items() if n == name}
+
+    def age(self, name):
+        """距 stamp(name) 最近一次的秒数，从未记录时为 None"""
+        ts = self.stamps.get(name)
+        return None if ts is None else max(0.0, self.at - ts)
+
+    def quantile(self, name, q):
+        """按桶估计分位数（取所在桶的上限），没有样本时为 None"""
+        h = self.hists.get((name, ()))
+        if not h or not h[-1]:
+            return None
+        counts = h[:-2]
+        rank = q * h[-1]
+        seen = 0
+        for bound, c in zip(self.buckets + (float('inf'),), counts):
+            seen += c
+            if seen >= rank:
+                return bound
+        return float('inf')
+
+
+class Metrics:
+    """进程内指标表；inc / observe / stamp 可在任意线程调用"""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.started = time.time()
+        self._local = threading.local()
+        self._base = _Shard()
+        self._shards = []  # [(写入线程, 分片)]
+        self._lock = threading.Lock()
+
+    def _shard(self):
+        try:
+            return self._local.shard
+        except AttributeError:
+            shard = _Shard()
+            with self._lock:
+                self._fold()
+                self._shards.append((threading.current_thread(), shard))
+            self._local.shard = shard
+            return shard
+
+    def _fold(self):
+        """把已结束线程的分片并入基础分片（持有 _lock 时调用）；线程结束后不会再写入，合并无需配合"""
+        live = []
+        for thread, shard in self._shards:
+            if thread.is_alive():
+                live.append((thread, shard))
+            else:
+                self._base.merge(shard)
+        self._shards = live
+
+    def inc(self, name, n=1, **labels):
+        counters = self._shard().counters
+        key = _key(name, labels)
+        counters[key] = counters.get(key, 0) + n
+
+    def observe(self, name, seconds):
+        """记录一个直方图样本；每个直方图为 [各桶计数..., +Inf 桶计数, 总和, 样本数]"""
+        hists = self._shard().hists
+        h = hists.get((name, ()))
+        if h is None:
+            h = hists[(name, ())] = [0] * (len(self.buckets) + 1) + [0.0, 0]
+        h[bisect.bisect_left(self.buckets, seconds)] += 1
+        h[-2] += seconds
+        h[-1] += 1
+
+    def stamp(self, name):
+        """记录事件发生时刻（如最近一次成功查询）"""
+        self._shard().stamps[name] = time.time()
+
+    def snapshot(self):
+        """把各分片相加；list(dict.items()) 在 GIL 下一次完成复制，读取不需要写入方配合加锁"""
+        total = _Shard()
+        with self._lock:
+            self._fold()
+            total.merge(self._base)
+            shards = [shard for _, shard in self._shards]
+        for shard in shards:
+            total.merge(shard)
+        return Snapshot(time.time(), self.started, self.buckets, total.counters, total.hists, total.stamps)
+
+    def exposition(self):
+        """Prometheus 文本格式（text/plain; version=0.0.4）"""
+        snap = self.snapshot()
+        series = {}
+        for (name, labels), v in snap.counters.items():
+            series.setdefault(name, []).append(('', labels, v))
+        for (name, _), h in snap.hists.items():
+            rows = series.setdefault(name, [])
+            cumulative = 0
+            for bound, c in zip(self.buckets + (float('inf'),), h[:-2]):
+                cumulative += c
+                le = '+Inf' if bound == float('inf') else repr(bound)
+                rows.append(('_bucket', (('le', le),), cumulative))
+            rows.append(('_sum', (), h[-2]))
+            rows.append(('_count', (), h[-1]))
+        age = snap.age('last_success')
+        if age is not None:
+            series['last_success_age_seconds'] = [('', (), round(age, 3))]
+        series['uptime_seconds'] = [('', (), round(snap.at - snap.started, 3))]
+
+        lines = []
+        for name in sorted(series):
+            kind, text = METRIC_HELP.get(name, ('untyped', name))
+            lines.append(f'# HELP {PREFIX}{name} {text}')
+            lines.append(f'# TYPE {PREFIX}{name} {kind}')
+            for suffix, labels, v in series[name]:
+                lines.append(f'{PREFIX}{name}{suffix}{_format_labels(labels)} {_format_value(v)}')
+        return '\n'.join(lines) + '\n'
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    escaped = (str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, v in labels)
+    return '{' + ','.join(f'{k}="{v}"' for (k, _), v in zip(labels, escaped)) + '}'
+
+
+def _format_value(v):
+    if isinstance(v, float):
+        return repr(round(v, 6))
+    return str(v)
+
+
+# 进程内唯一的指标表，booking_core、driver_supervisor 与 GUI 共用
+METRICS = Metrics()
+
+
+def status_line(snap, prev=None):
+    """状态栏的一行摘要；prev 为上一次的 Snapshot，用于计算这段时间内的轮询速率"""
+    polls = snap.total('polls_total')
+    errors = snap.total('webdriver_errors_total') + snap.total('query_errors_total')
+    parts = [f'轮询 {polls}']
+    if prev is not None and snap.at > prev.at:
+        parts.append(f'{(polls - prev.total("polls_total")) / (snap.at - prev.at):.1f}/s')
+    if polls:
+        parts.append(f'错误 {errors}（{errors / polls:.0%}）')
+    age = snap.age('last_success')
+    if age is not None:
+        parts.append(f'上次成功 {age:.0f}s 前')
+    p50 = snap.quantile('parse_seconds', 0.5)
+    if p50 is not None:
+        parts.append(f'解析 p50≤{p50 * 1000:g}ms')
+    fallbacks = snap.total('refresh_fallbacks_total')
+    if fallbacks:
+        parts.append(f'整页刷新 {fallbacks}')
+    return ' · '.join(parts)
+
+
+class _Handler(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        if self.path.split('?', 1)[0] not in ('/', '/metrics'):
+            self.send_error(404)
+            return
+        body = self.server.metrics.exposition().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve_metrics(port, host=DEFAULT_METRICS_HOST, metrics=METRICS):
+    """在后台线程中提供 /metrics，返回 HTTP 服务器（shutdown() 停止）"""
+    server = ThreadingHTTPServer((host, int(port)), _Handler)
+    server.daemon_threads = True
+    server.metrics = metrics
+    threading.Thread(target=server.serve_forever, name='metrics-http', daemon=True).start()
+    return server
+
+
+def start_metrics_server(params):
+    """按 metrics_port / metrics_host 启动指标端点；未配置或端口被占用时返回 None"""
+    port = params.get('metrics_port')
+    if not port:
+        return None
+    host = params.get('metrics_host') or DEFAULT_METRICS_HOST
+    try:
+        server = serve_metrics(port, host)
+    except OSError as e:
+        print(f'⚠ 运行指标端口 {host}:{port} 启动失败：{e}')
+        return None
+    print(f'✓ 运行指标：http://{host}:{server.server_address[1]}/metrics')
+    return server
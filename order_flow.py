@@ -0,0 +1,241 @@
+"""
+鲸介12306 抢票助手 - 下单流程状态机
+
+点击预订之后的乘车人、票种与席别、提示框、提交订单、选座、最终确认按状态机推进：
+每一步都在页面内等待下一步真正就绪的条件（一次异步脚本往返），
+可能出现也可能不出现的提示框与下一步的就绪条件一起等待，谁先出现处理谁，
+不再使用固定 sleep，并记录每一步耗时。
+
+开源协议：MIT License
+"""
+import time
+from collections import namedtuple
+
+from selenium.common.exceptions import WebDriverException
+
+from cancellation import NEVER_CANCELLED, SLICE
+
+StepTiming = namedtuple('StepTiming', 'step ms status')
+
+# 在页面内轮询，返回第一个可见且可用的选择器及其元素；超时返回 null
+_WAIT_ANY_JS = r"""
+var sels = arguments[0], timeoutMs = arguments[1], done = arguments[arguments.length - 1];
+var start = Date.now();
+function ready(el) {
+    if (!el || el.disabled || !el.getClientRects().length) { return false; }
+    var st = window.getComputedStyle(el);
+    return st.visibility !== 'hidden' && st.display !== 'none';
+}
+(function check() {
+    for (var i = 0; i < sels.length; i++) {
+        var el = document.querySelector(sels[i]);
+        if (ready(el)) { done([sels[i], el]); return; }
+    }
+    if (Date.now() - start >= timeoutMs) { done(null); return; }
+    setTimeout(check, 16);
+})();
+"""
+
+_SELECT_ADULT_JS = r"""
+var s = document.getElementById('ticketType_1');
+if (!s) { return false; }
+if (s.value !== '1') { s.value = '1'; s.dispatchEvent(new Event('change', {bubbles: true})); }
+return true;
+"""
+
+# 在订单页每位乘车人的席别下拉框（seatType_1、seatType_2……）中选择 arguments[0] 中第一个可选的席别，
+# 返回第一位乘车人选中的席别名或 null
+_SELECT_SEAT_TYPE_JS = r"""
+var names = arguments[0], first = null;
+for (var k = 1, s; (s = document.getElementById('seatType_' + k)); k++) {
+    var chosen = null;
+    for (var i = 0; i < names.length && chosen === null; i++) {
+        for (var j = 0; j < s.options.length; j++) {
+            if ((s.options[j].textContent || '').trim().indexOf(names[i]) === 0) {
+                if (s.selectedIndex !== j) { s.selectedIndex = j; s.dispatchEvent(new Event('change', {bubbles: true})); }
+                chosen = names[i];
+                break;
+            }
+        }
+    }
+    if (k === 1) { first = chosen; }
+}
+return first;
+"""
+
+# 勾选乘车人列表中第 2 到第 arguments[0] 位（第 1 位已由 PASSENGER 点击），返回已勾选人数
+_SELECT_MORE_PASSENGERS_JS = r"""
+var n = arguments[0];
+for (var i = 1; i < n; i++) {
+    var c = document.getElementById('normalPassenger_' + i);
+    if (c && !c.checked) { c.click(); }
+}
+return document.querySelectorAll('input[id^="normalPassenger_"]:checked').length;
+"""
+
+PASSENGER = '#normalPassenger_0'
+STUDENT_CONFIRM = '#dialog_xsertcj_ok'
+SUBMIT = '#submitOrder_id'
+STUDENT_WARNING = '#qd_closeDefaultWarningWindowDialog_id'
+SEAT_PANEL = '.seat-sel-bd'
+CONFIRM = '#qr_submit_id'
+
+
+class OrderFlowError(Exception):
+    """必需步骤未能完成"""
+
+
+class OrderFlow:
+    """点击预订之后的下单状态机
+
+    seat_selector(driver, preferred_type) 负责选座（booking_core.select_seat_fast）；
+    params['passenger_count'] 大于 1 时依次勾选常用乘车人列表中的前几位，选座时每人选一个座位；
+    seat_types 为按优先顺序的席别名，在订单页选择其中第一个可选的席别（为空时保持页面默认），
+    dialog_grace 为乘车人勾选后等待学生票确认框的最长时间，框一出现立即处理。
+    cancel 取消后不再进入下一步（尤其不会再提交订单），抛出 cancellation.Cancelled。
+    """
+
+    def __init__(self, driver, params, seat_selector=None, dialog_grace=0.3, step_timeout=8.0,
+                 cancel=NEVER_CANCELLED, seat_types=()):
+        self.driver = driver
+        self.params = params
+        self.seat_selector = seat_selector
+        self.seat_types = list(seat_types)
+        self.dialog_grace = dialog_grace
+        self.step_timeout = step_timeout
+        self.cancel = cancel
+        self.timings = []
+        self._warning_closed = False
+
+    def wait_any(self, selectors, timeout):
+        """等待任一选择器就绪，返回 (选择器, 元素)；超时返回 (None, None)
+
+        页面跳转期间脚本会被打断，此时在截止时间内重试；可取消时按 SLICE 分段等待。
+        """
+        deadline = time.perf_counter() + timeout
+        step = timeout if self.cancel is NEVER_CANCELLED else SLICE
+        while True:
+            self.cancel.check()
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                return None, None
+            wait = min(step, remaining)
+            if self.driver.timeouts.script < wait + 1:
+                self.driver.set_script_timeout(wait + 1)
+            try:
+                res = self.driver.execute_async_script(_WAIT_ANY_JS, list(selectors), int(wait * 1000))
+            except WebDriverException:
+                self.cancel.sleep(0.02)
+                continue
+            if res:
+                return res[0], res[1]
+
+    def _click(self, el):
+        try:
+            el.click()
+        except WebDriverException:
+            self.driver.execute_script('arguments[0].click();', el)
+
+    # ---- 各状态处理函数：返回下一个状态名，None 表示结束 ----
+
+    def step_passenger(self):
+        sel, el = self.wait_any([PASSENGER], self.step_timeout)
+        if el is None:
+            raise OrderFlowError('乘车人列表未出现')
+        self._click(el)
+        count = int(self.params.get('passenger_count') or 1)
+        if count > 1:
+            checked = self.driver.execute_script(_SELECT_MORE_PASSENGERS_JS, count)
+            print(f'✓ 已成功选择 {checked} 位乘车人')
+            if checked < count:
+                print(f'⚠ 常用乘车人列表中只有 {checked} 位可选，少于设置的 {count} 位')
+            return 'ticket_type'
+        print('✓ 已成功选择乘车人')
+        return 'ticket_type'
+
+    def step_ticket_type(self):
+        if self.params.get('ticket_type') == 'adult':
+            if self.driver.execute_script(_SELECT_ADULT_JS):
+                print('✓ 订单页已选择票种：成人票')
+            else:
+                return 'skipped', 'seat_type'
+        return 'seat_type'
+
+    def step_seat_type(self):
+        if not self.seat_types:
+            return 'skipped', 'student_confirm'
+        chosen = self.driver.execute_script(_SELECT_SEAT_TYPE_JS, self.seat_types)
+        if not chosen:
+            return 'skipped', 'student_confirm'
+        print(f'✓ 订单页已选择席别：{chosen}')
+        return 'student_confirm'
+
+    def step_student_confirm(self):
+        sel, el = self.wait_any([STUDENT_CONFIRM], self.dialog_grace)
+        if el is None:
+            return 'skipped', 'submit'
+        self._click(el)
+        return 'submit'
+
+    def step_submit(self):
+        sel, el = self.wait_any([SUBMIT], self.step_timeout)
+        if el is None:
+            raise OrderFlowError('提交订单按钮不可用')
+        self._click(el)
+        print('✓ 已成功点击提交订单按钮')
+        return 'confirm_dialog'
+
+    def step_confirm_dialog(self):
+        # 学生票提示框、选座面板与确认按钮谁先就绪处理谁
+        selectors = [SEAT_PANEL, CONFIRM] if self._warning_closed else [STUDENT_WARNING, SEAT_PANEL, CONFIRM]
+        sel, el = self.wait_any(selectors, self.step_timeout)
+        if el is None:
+            raise OrderFlowError('确认对话框未出现')
+        if sel == STUDENT_WARNING:
+            self._click(el)
+            self._warning_closed = True
+            return 'confirm_dialog'
+        if sel == SEAT_PANEL:
+            return 'seat'
+        return 'confirm'
+
+    def step_seat(self):
+        if self.seat_selector is None:
+            return 'skipped', 'confirm'
+        ok = self.seat_selector(self.driver, preferred_type=self.params.get('seat_position_preference', 'first'))
+        return 'confirm' if ok else ('failed', 'confirm')
+
+    def step_confirm(self):
+        sel, el = self.wait_any([CONFIRM], self.step_timeout)
+        if el is None:
+            raise OrderFlowError('最终确认按钮不可用')
+        self._click(el)
+        print('✓ 已提交最终确认')
+        return None
+
+    def run(self, state='passenger'):
+        """从 state 开始推进，返回是否完成最终确认"""
+        self.timings = []
+        self._warning_closed = False
+        while state is not None:
+            self.cancel.check()
+            handler = getattr(self, f'step_{state}')
+            t0 = time.perf_counter()
+            status = 'ok'
+            try:
+                nxt = handler()
+            except OrderFlowError as e:
+                self.timings.append(StepTiming(state, (time.perf_counter() - t0) * 1000, 'failed'))
+                print(f'下单流程在 [{state}] 中止：{e}')
+                return False
+            if isinstance(nxt, tuple):
+                status, nxt = nxt
+            self.timings.append(StepTiming(state, (time.perf_counter() - t0) * 1000, status))
+            state = nxt
+        return True
+
+    def report(self):
+        """各步骤耗时摘要"""
+        parts = [f'{t.step} {t.ms:.0f}ms' + ('' if t.status == 'ok' else f'({t.status})') for t in self.timings]
+        total = sum(t.ms for t in self.timings)
+        return f"下单耗时 {total:.0f}ms：{' → '.join(parts)}"
@@ -0,0 +1,117 @@
+"""
+鲸介12306 抢票助手 - 刷新节奏调度
+
+决定每轮查询之后等待多久：开售后先密集刷新，再逐步衰减到可持续的频率；
+页面繁忙 / 被限流时指数退避；令牌桶限制每分钟请求数。
+时钟可注入，便于用假时钟验证调度行为。
+
+开源协议：MIT License
+"""
+import random
+import time
+from collections import deque
+from datetime import datetime
+
+
+class FixedIntervalScheduler:
+    """固定随机间隔（原有行为）"""
+
+    def __init__(self, interval=(2, 4), rng=None):
+        self.interval = interval
+        self.rng = rng or random.Random()
+
+    def next_delay(self):
+        return self.rng.uniform(*self.interval)
+
+    def record(self, ok):
+        pass
+
+
+class TokenBucket:
+    """按时间预约令牌的令牌桶
+
+    capacity 只决定可以集中用掉多少令牌，不额外增加请求数：同时记录最近 per_minute 次预约的时刻，
+    任意 60 秒内发出的令牌不超过 per_minute 个（包括开始时桶里已有的 capacity 个）。
+    """
+
+    def __init__(self, per_minute, capacity, clock):
+        self.rate = per_minute / 60.0
+        self.capacity = float(capacity)
+        self.tokens = float(capacity)
+        self.clock = clock
+        self.stamp = clock()
+        self.issued = deque(maxlen=max(1, int(per_minute)))
+
+    def reserve(self, at):
+        """预约 at 时刻的一个令牌，返回实际可用的时刻（>= at）"""
+        at = max(at, self.stamp)
+        if len(self.issued) == self.issued.maxlen:
+            at = max(at, self.issued[0] + 60.0)
+        self.tokens = min(self.capacity, self.tokens + (at - self.stamp) * self.rate)
+        self.stamp = at
+        if self.tokens >= 1:
+            self.tokens -= 1
+        else:
+            wait = (1 - self.tokens) / self.rate
+            self.tokens = 0.0
+            self.stamp = at + wait
+        self.issued.append(self.stamp)
+        return self.stamp
+
+
+class AdaptiveScheduler:
+    """开售后密集刷新、随后衰减，繁忙时退避，并受每分钟请求数上限约束
+
+    sale_start 为 clock() 同一时间轴上的开售时刻（默认 time.time 的时间戳），None 表示直接按稳态频率。
+    """
+
+    def __init__(self, sale_start=None, burst=(0.3, 0.6), burst_seconds=30, steady=(2, 4),
+                 decay_seconds=120, max_per_minute=60, bucket_capacity=20,
+                 backoff_base=2.0, backoff_max=30.0, clock=time.time, rng=None):
+        self.sale_start = sale_start
+        self.burst = burst
+        self.burst_seconds = burst_seconds
+        self.steady = steady
+        self.decay_seconds = decay_seconds
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.clock = clock
+        self.rng = rng or random.Random()
+        self.bucket = TokenBucket(max_per_minute, bucket_capacity, clock)
+        self.failures = 0
+
+    def base_interval(self, now):
+        """当前阶段的刷新间隔范围"""
+        if self.sale_start is None:
+            return self.steady
+        elapsed = now - self.sale_start
+        if elapsed < self.burst_seconds:
+            return self.burst
+        k = min(1.0, (elapsed - self.burst_seconds) / self.decay_seconds) if self.decay_seconds > 0 else 1.0
+        return tuple(b + (s - b) * k for b, s in zip(self.burst, self.steady))
+
+    def record(self, ok):
+        """记录本轮结果：ok=False 表示页面繁忙 / 限流 / 查询失败"""
+        self.failures = 0 if ok else self.failures + 1
+
+    def next_delay(self):
+        now = self.clock()
+        delay = self.rng.uniform(*self.base_interval(now))
+        if self.failures:
+            delay = max(delay, min(self.backoff_max, self.steady[0] * self.backoff_base ** (self.failures - 1)))
+        return self.bucket.reserve(now + delay) - now
+
+
+def make_scheduler(params, refresh_interval=(2, 4), clock_offset=0.0):
+    """根据抢票参数构建调度器：refresh_mode 为 fixed 时使用原固定间隔
+
+    clock_offset 为服务器时钟相对本机的偏差，开售时刻据此换算到本机时间轴。
+    """
+    if params.get('refresh_mode') == 'fixed':
+        return FixedIntervalScheduler(refresh_interval)
+    sale_start = None
+    bst = (params.get('booking_start_time') or '').strip()
+    if bst:
+        sale_start = datetime.strptime(bst, '%Y-%m-%d %H:%M:%S').timestamp() - clock_offset
+    return AdaptiveScheduler(sale_start=sale_start, steady=refresh_interval,
+                             max_per_minute=int(params.get('max_requests_per_minute', 60)))
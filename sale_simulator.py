@@ -0,0 +1,511 @@
+"""
+鲸介12306 抢票助手 - 抢票策略离线模拟
+
+在虚拟时钟上重放余票时间线，比较不同抢票策略（时间范围内最早 / 指定车次 / 多目标优先级）
+和不同刷新间隔的命中率与出票耗时，不必等到下一个开售日。
+
+时间线来源：
+    synthetic（默认）  每场开售随机生成：一部分车次在开售后几秒内放票，随后按指数分布售罄，
+                       之后不时有退票回流（短暂出现余票）
+    *.bin              availability_recorder 记录的真实余票变化；每场模拟在开售时刻上加随机偏移
+每场开售按刷新间隔生成查询时刻，某次查询时策略选中的车次在下单耗时之后仍有票，记为命中。
+选择顺序与 booking_core 中各策略的 pick 一致（时间范围按出发时刻、指定车次按填写顺序、多目标按优先级）。
+
+安装了 NumPy 时成批向量化计算，几千场 × 多组参数几秒内完成；未安装时逐场用纯 Python 计算（较慢）。
+两条路径分别用 NumPy Generator 和 random.Random 生成时间线与查询时刻，分布相同但逐场的随机样本不同，
+同一 seed 下两者的命中率、耗时分位数只在统计意义上一致（场数越多越接近），不是逐场相同。
+
+    python sale_simulator.py --sales 2000 --interval 0.5 --interval 1 --interval 2-4
+    python sale_simulator.py avail.bin --strategy 07:00-12:00@二等座 --strategy G1234/G1236
+    python sale_simulator.py --config config.json       # 加入配置文件中的抢票策略
+
+策略写法：'07:00-12:00' 为时间范围，'G1234/G1236' 为指定车次，'@二等座/一等座' 限定席别，
+用 '>' 连接多个目标为多目标优先级，如 'G1234@二等座>07:00-09:00'。
+
+开源协议：MIT License
+"""
+import argparse
+import bisect
+import json
+import math
+import random
+import sys
+import time
+from datetime import datetime
+
+try:
+    import numpy as np
+except ImportError:  # NumPy 可选，缺失时逐场计算
+    np = None
+
+from train_table import (SEAT_CLASSES, PriorityStrategy, TimeRangeStrategy, TrainNumberStrategy, compile_target,
+                         compile_strategy, hhmm_to_minutes)
+
+# 合成时间线中会放票的席别（商务座、一等座、二等座）
+SYNTHETIC_CLASSES = (0, 2, 3)
+# 每次查询的耗时（秒）：点击查询到读完结果表
+DEFAULT_POLL_COST = 0.15
+# 命中后到订单提交的耗时（秒），期间车票仍需有余
+DEFAULT_BOOK_LATENCY = 1.2
+# 向量化计算时每批的场数，控制内存占用
+_CHUNK = 256
+
+
+class Timeline:
+    """一场开售的余票时间线
+
+    trains 为 [(车次, 出发时刻)]，windows 为 {(车次下标, 席别下标): [(开始, 结束), ...]}，
+    时刻均为相对开售时刻的秒数，区间左闭右开。
+    """
+    __slots__ = ('trains', 'windows')
+
+    def __init__(self, trains, windows):
+        self.trains = trains
+        self.windows = windows
+
+
+class SyntheticSales:
+    """合成开售时间线：车次表固定（由 seed 决定），每场的放票、售罄与退票回流随机"""
+
+    def __init__(self, rows=60, open_ratio=0.4, release_spread=2.0, hold=8.0, refund_per_min=0.3,
+                 refund_hold=3.0, horizon=900.0, seed=12306):
+        rng = random.Random(seed)
+        self.trains = []
+        used = set()
+        for i in range(rows):
+            tn = f'{rng.choice("GGGDDC")}{rng.randint(100, 9999)}'
+            while tn in used:
+                tn = f'{rng.choice("GGGDDC")}{rng.randint(100, 9999)}'
+            used.add(tn)
+            dep = 6 * 60 + i * (17 * 60 // max(rows, 1))
+            self.trains.append((tn, f'{dep // 60:02d}:{dep % 60:02d}'))
+        self.open_ratio = open_ratio
+        self.release_spread = release_spread
+        self.hold = hold
+        self.refund_rate = refund_per_min / 60.0
+        self.refund_hold = refund_hold
+        self.horizon = horizon
+
+    def sample(self, rng):
+        """随机生成一场开售；各车次席别的余票时间段在首次用到时才生成"""
+        return Timeline(self.trains, _SyntheticWindows(self, rng.getrandbits(32)))
+
+    def spans(self, seed, ti, ci):
+        """第 seed 场开售中车次 ti 席别 ci 的余票时间段"""
+        if ci not in SYNTHETIC_CLASSES:
+            return []
+        released = random.Random(seed * 4096 + ti).random() < self.open_ratio
+        rng = random.Random((seed * 4096 + ti) * 16 + ci)
+        spans = []
+        if released and rng.random() < 0.8:
+            start = rng.uniform(0, self.release_spread)
+            spans.append((start, start + rng.expovariate(1 / self.hold)))
+        t = 0.0
+        while self.refund_rate > 0:
+            t += rng.expovariate(self.refund_rate)
+            if t >= self.horizon:
+                break
+            spans.append((t, t + rng.expovariate(1 / self.refund_hold)))
+        return spans
+
+    def sample_spans(self, n, seed):
+        """一次生成 n 场开售的全部余票时间段（NumPy），分布与 sample 相同，但随机数序列不同，不与 sample 逐场对应"""
+        rng = np.random.default_rng(seed)
+        n_train, classes = len(self.trains), np.asarray(SYNTHETIC_CLASSES)
+        shape = (n, n_train, len(classes))
+        released = (rng.random((n, n_train)) < self.open_ratio)[:, :, None] & (rng.random(shape) < 0.8)
+        sale, train, cls = np.nonzero(released)
+        start = rng.uniform(0, self.release_spread, len(sale))
+        end = start + rng.exponential(self.hold, len(sale))
+        # 退票回流：泊松过程，次数服从泊松分布、时刻在 [0, horizon) 内均匀分布
+        counts = rng.poisson(self.refund_rate * self.horizon, shape).ravel()
+        cell = np.repeat(np.arange(counts.size), counts)
+        r_start = rng.uniform(0, self.horizon, cell.size)
+        return SpanTable(self.trains, n,
+                         np.concatenate([sale, cell // (n_train * len(classes))]),
+                         np.concatenate([train, cell // len(classes) % n_train]),
+                         np.concatenate([classes[cls], classes[cell % len(classes)]]),
+                         np.concatenate([start, r_start]),
+                         np.concatenate([end, r_start + rng.exponential(self.refund_hold, cell.size)]))
+
+
+class RecordedSales:
+    """由一条记录的时间线生成多场开售：每场在开售时刻上加 ±shift 秒内的均匀随机偏移"""
+
+    def __init__(self, timeline, shift=1.0):
+        self.timeline = timeline
+        self.trains = timeline.trains
+        self.shift = shift
+
+    def sample(self, rng):
+        offset = rng.uniform(-self.shift, self.shift)
+        return Timeline(self.trains, {k: [(a + offset, b + offset) for a, b in v]
+                                      for k, v in self.timeline.windows.items()})
+
+    def sample_spans(self, n, seed):
+        flat = [(ti, ci, a, b) for (ti, ci), spans in self.timeline.windows.items() for a, b in spans]
+        train, cls, start, end = (np.asarray(col) for col in zip(*flat)) if flat else ([], [], [], [])
+        offset = np.random.default_rng(seed).uniform(-self.shift, self.shift, n)
+        sale = np.repeat(np.arange(n), len(flat))
+        return SpanTable(self.trains, n, sale, np.tile(train, n), np.tile(cls, n),
+                         np.tile(start, n) + offset[sale], np.tile(end, n) + offset[sale])
+
+
+class SpanTable:
+    """多场开售的余票时间段，NumPy 平铺存放：第 i 段属于第 sale[i] 场、车次 train[i]、席别 cls[i]，
+    时段为 [start[i], end[i])；按场排序，便于分批计算"""
+
+    def __init__(self, trains, sales, sale, train, cls, start, end):
+        order = np.argsort(sale, kind='stable')
+        self.trains = trains
+        self.sales = sales
+        self.sale = np.asarray(sale, dtype=np.intp)[order]
+        self.train = np.asarray(train, dtype=np.intp)[order]
+        self.cls = np.asarray(cls, dtype=np.intp)[order]
+        self.start = np.asarray(start, dtype=float)[order]
+        self.end = np.asarray(end, dtype=float)[order]
+
+    def for_candidates(self, cands):
+        """按候选列表挑出时间段，返回 (场, 候选序号, 开始, 结束)，仍按场排序"""
+        key = self.train * len(SEAT_CLASSES) + self.cls
+        picks, owners = [], []
+        for c, (ti, classes) in enumerate(cands):
+            wanted = [ti * len(SEAT_CLASSES) + ci for ci in (classes if classes is not None
+                                                              else range(len(SEAT_CLASSES)))]
+            idx = np.nonzero(np.isin(key, wanted))[0]
+            picks.append(idx)
+            owners.append(np.full(idx.size, c, dtype=np.intp))
+        if not picks:
+            return (np.zeros(0, dtype=np.intp),) * 2 + (np.zeros(0),) * 2
+        idx, cand = np.concatenate(picks), np.concatenate(owners)
+        order = np.argsort(idx, kind='stable')
+        idx, cand = idx[order], cand[order]
+        return self.sale[idx], cand, self.start[idx], self.end[idx]
+
+
+class _SyntheticWindows:
+    """合成时间线的 windows：只生成策略候选用到的 (车次, 席别)，并缓存"""
+
+    def __init__(self, source, seed):
+        self.source = source
+        self.seed = seed
+        self._cache = {}
+
+    def get(self, key, default=()):
+        spans = self._cache.get(key)
+        if spans is None:
+            spans = self._cache[key] = self.source.spans(self.seed, *key)
+        return spans or default
+
+
+def timeline_from_recording(path):
+    """把 availability_recorder 的记录转为 Timeline（开售时刻取备注 sale_start，没有时取第一轮）"""
+    from availability_recorder import read_frames
+
+    index = {}
+    trains = []
+    opened = {}
+    windows = {}
+    t0 = first_at = last_at = None
+    for frame in read_frames(path):
+        if t0 is None:
+            first_at = frame.at
+            try:
+                t0 = datetime.strptime(frame.notes.get('sale_start', ''), '%Y-%m-%d %H:%M:%S').timestamp()
+            except ValueError:
+                t0 = frame.at
+        last_at = frame.at
+        for train in frame.changed:
+            row = frame.rows.get(train)
+            if train not in index:
+                index[train] = len(trains)
+                trains.append((train, row.depart if row is not None else None))
+            ti = index[train]
+            for ci in range(len(SEAT_CLASSES)):
+                is_open = row is not None and row.bookable and ci < len(row.avail) and row.avail[ci] > 0
+                key = (ti, ci)
+                if is_open and key not in opened:
+                    opened[key] = frame.at - t0
+                elif not is_open and key in opened:
+                    windows.setdefault(key, []).append((opened.pop(key), frame.at - t0))
+    if t0 is None:
+        raise ValueError(f'{path} 中没有轮询记录')
+    for key, start in opened.items():
+        windows.setdefault(key, []).append((start, last_at - t0))
+    print(f'记录 {path}：{len(trains)} 个车次，时长 {last_at - first_at:.1f}s，{sum(map(len, windows.values()))} 段余票')
+    return Timeline(trains, windows)
+
+
+def parse_strategy(spec, default_seats=()):
+    """解析命令行策略写法，返回 train_table 中的策略对象"""
+    targets = []
+    for part in spec.split('>'):
+        part = part.strip()
+        body, _, seats = part.partition('@')
+        start, sep, end = body.partition('-')
+        if sep and hhmm_to_minutes(start.strip()) is not None and hhmm_to_minutes(end.strip()) is not None:
+            target = {'start': start.strip(), 'end': end.strip()}
+        else:
+            target = {'train': body}
+        if seats:
+            target['seats'] = seats
+        targets.append(compile_target(target, default_seats))
+    return targets[0] if len(targets) == 1 else PriorityStrategy(targets)
+
+
+def _classes(strategy):
+    return tuple(i for _, i in strategy.seat_classes) or None
+
+
+def candidates(strategy, trains):
+    """按策略 pick 的优先顺序列出候选：[(车次下标, 席别下标元组或 None 表示不限)]"""
+    if isinstance(strategy, PriorityStrategy):
+        return [c for t in strategy.targets for c in candidates(t, trains)]
+    classes = _classes(strategy)
+    if isinstance(strategy, TrainNumberStrategy):
+        index = {tn: i for i, (tn, _) in enumerate(trains)}
+        return [(index[t], classes) for t in strategy.targets if t in index]
+    if isinstance(strategy, TimeRangeStrategy):
+        rows = [(hhmm_to_minutes(dep), i) for i, (_, dep) in enumerate(trains)]
+        rows = sorted((m, i) for m, i in rows if m is not None and strategy.start_min <= m <= strategy.end_min)
+        return [(i, classes) for _, i in rows]
+    raise TypeError(f'不支持的策略类型: {type(strategy).__name__}')
+
+
+def _merge(spans):
+    out = []
+    for a, b in sorted(spans):
+        if out and a <= out[-1][1]:
+            out[-1] = (out[-1][0], max(out[-1][1], b))
+        else:
+            out.append((a, b))
+    return out
+
+
+def candidate_windows(timeline, cands):
+    """每个候选可预订的时间段（所需席别任一有票即可），已合并排序"""
+    out = []
+    for ti, classes in cands:
+        spans = []
+        for ci in (classes if classes is not None else range(len(SEAT_CLASSES))):
+            spans.extend(timeline.windows.get((ti, ci), ()))
+        out.append(_merge(spans))
+    return out
+
+
+class Cadence:
+    """刷新节奏：每轮间隔在 [low, high] 内均匀随机（low == high 为固定间隔），再加每次查询耗时"""
+
+    def __init__(self, spec, poll_cost=DEFAULT_POLL_COST):
+        low, _, high = str(spec).partition('-')
+        self.low = float(low)
+        self.high = float(high) if high else self.low
+        if not 0 < self.low <= self.high:
+            raise ValueError(f'刷新间隔格式错误: {spec}')
+        self.poll_cost = poll_cost
+        self.label = f'{self.low:g}s' if self.low == self.high else f'{self.low:g}-{self.high:g}s'
+
+    def poll_times(self, rng, attempts):
+        """一场开售的各次查询时刻（相对开售时刻的秒数）"""
+        t = self.poll_cost
+        out = [t]
+        for _ in range(attempts - 1):
+            t += rng.uniform(self.low, self.high) + self.poll_cost
+            out.append(t)
+        return out
+
+    def poll_times_array(self, seed, sales, attempts):
+        """sales 场的查询时刻矩阵 (场, 次)（NumPy）"""
+        gaps = np.random.default_rng(seed).uniform(self.low, self.high, (sales, attempts)) + self.poll_cost
+        gaps[:, 0] = self.poll_cost
+        return np.cumsum(gaps, axis=1)
+
+
+def _open_at(spans, t):
+    i = bisect.bisect_right(spans, (t, math.inf)) - 1
+    return i >= 0 and spans[i][0] <= t < spans[i][1]
+
+
+def _simulate_python(windows_per_sale, times_per_sale, latency):
+    """逐场计算，返回 [(命中的查询序号或 -1, 出票时刻)]
+
+    某次查询时按优先顺序选中第一个有票的候选，latency 秒后提交订单时该候选仍有票记为命中。
+    """
+    out = []
+    for windows, times in zip(windows_per_sale, times_per_sale):
+        result = (-1, math.nan)
+        for k, t in enumerate(times):
+            pick = next((spans for spans in windows if _open_at(spans, t)), None)
+            if pick is not None and _open_at(pick, t + latency):
+                result = (k, t + latency)
+                break
+        out.append(result)
+    return out
+
+
+def _coverage(flat, n_poll, sale, cand, start, end, shape, tmax, stride):
+    """各时间段覆盖的查询序号区间 [ks, ke) 写入差分数组后累加，返回 (场, 候选, 次) 是否有票"""
+    base = sale * stride
+    ks = np.searchsorted(flat, np.clip(start, -1.0, tmax + 1.0) + base) - sale * n_poll
+    ke = np.searchsorted(flat, np.clip(end, -1.0, tmax + 1.0) + base) - sale * n_poll
+    row = (sale * shape[1] + cand) * shape[2]
+    size = shape[0] * shape[1] * shape[2]
+    count = np.bincount(row + ks, minlength=size) - np.bincount(row + ke, minlength=size)
+    return np.cumsum(count.reshape(shape), axis=2)[:, :, :shape[2] - 1] > 0
+
+
+def _simulate_numpy(spans, times, latency):
+    """向量化计算，spans 为 SpanTable.for_candidates 的结果，times 为 (场, 次) 查询时刻；返回值同 _simulate_python
+
+    各场查询时刻首尾相接成一个有序数组，一次 searchsorted 把全部时间段换算成覆盖的查询序号区间，
+    计算量与时间段数和查询次数成正比；按 _CHUNK 场分批控制内存。
+    """
+    sale, cand, start, end = spans
+    n_cand = int(cand.max()) + 1 if cand.size else 1
+    out = []
+    for lo in range(0, times.shape[0], _CHUNK):
+        t = times[lo:lo + _CHUNK]
+        n_sale, n_poll = t.shape
+        i, j = np.searchsorted(sale, [lo, lo + n_sale])
+        if i == j:
+            out.extend([(-1, math.nan)] * n_sale)
+            continue
+        s, c, a, b = sale[i:j] - lo, cand[i:j], start[i:j], end[i:j]
+        tmax = float(t.max()) + latency
+        stride = tmax + 2.0
+        flat = (t + np.arange(n_sale)[:, None] * stride).ravel()
+        shape = (n_sale, n_cand, n_poll + 1)
+        now = _coverage(flat, n_poll, s, c, a, b, shape, tmax, stride)
+        # 查询时刻 t 之后 latency 秒仍有票，等价于时间段整体左移 latency 后覆盖 t
+        later = _coverage(flat, n_poll, s, c, a - latency, b - latency, shape, tmax, stride)
+        first = now.argmax(1)                                                 # 每次查询选中的候选
+        ok = now.any(1) & np.take_along_axis(later, first[:, None, :], 1)[:, 0, :]
+        hit = ok.any(1)
+        k = ok.argmax(1)
+        at = t[np.arange(n_sale), k] + latency
+        out.extend((int(ki), float(ai)) if h else (-1, math.nan) for ki, ai, h in zip(k, at, hit))
+    return out
+
+
+def _percentile(sorted_values, p):
+    if not sorted_values:
+        return math.nan
+    k = max(0, min(len(sorted_values) - 1, math.ceil(p / 100 * len(sorted_values)) - 1))
+    return sorted_values[k]
+
+
+class SweepResult:
+    __slots__ = ('strategy', 'cadence', 'sales', 'hits', 'book_at', 'queries')
+
+    def __init__(self, strategy, cadence, results, attempts):
+        self.strategy = strategy
+        self.cadence = cadence
+        self.sales = len(results)
+        self.book_at = sorted(at for k, at in results if k >= 0)
+        self.hits = len(self.book_at)
+        self.queries = sum(k + 1 if k >= 0 else attempts for k, _ in results) / max(1, len(results))
+
+    @property
+    def hit_rate(self):
+        return self.hits / self.sales if self.sales else 0.0
+
+    def as_dict(self):
+        return {'strategy': self.strategy, 'cadence': self.cadence, 'sales': self.sales,
+                'hit_rate': round(self.hit_rate, 4), 'queries': round(self.queries, 1),
+                **{f'p{p}_s': round(_percentile(self.book_at, p), 3) if self.hits else None for p in (50, 90)}}
+
+
+def run_sweep(source, strategies, cadences, sales=2000, attempts=200, latency=DEFAULT_BOOK_LATENCY, seed=1,
+              use_numpy=None):
+    """对每个 (策略, 刷新节奏) 组合在同一批 sales 场开售上模拟，返回 SweepResult 列表
+
+    source 为 SyntheticSales 或 RecordedSales，strategies 为 [(名称, 策略对象)]。
+    各组合使用相同的时间线和查询时刻（共同随机数），差异只来自策略与节奏本身。
+    """
+    use_numpy = np is not None if use_numpy is None else use_numpy
+    results = []
+    if use_numpy:
+        table = source.sample_spans(sales, seed)
+        spans = [table.for_candidates(candidates(strategy, source.trains)) for _, strategy in strategies]
+        for cadence in cadences:
+            times = cadence.poll_times_array(seed, sales, attempts)
+            for (name, _), sp in zip(strategies, spans):
+                results.append(SweepResult(name, cadence.label, _simulate_numpy(sp, times, latency), attempts))
+        return results
+    rng = random.Random(seed)
+    timelines = [source.sample(rng) for _ in range(sales)]
+    windows = [[candidate_windows(tl, candidates(strategy, tl.trains)) for tl in timelines]
+               for _, strategy in strategies]
+    for cadence in cadences:
+        rng = random.Random(seed)
+        times = [cadence.poll_times(rng, attempts) for _ in timelines]
+        for (name, _), wins in zip(strategies, windows):
+            results.append(SweepResult(name, cadence.label, _simulate_python(wins, times, latency), attempts))
+    return results
+
+
+def _default_strategies(trains):
+    """未指定策略时的默认对比：上午时间范围 / 最接近 8 点的两趟车 / 两者组成的优先级列表"""
+    morning = [(abs(hhmm_to_minutes(dep) - 480), tn) for tn, dep in trains if hhmm_to_minutes(dep) is not None]
+    picks = '/'.join(tn for _, tn in sorted(morning)[:2])
+    return ['07:00-12:00', picks, f'{picks}>07:00-12:00']
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='抢票策略离线模拟')
+    parser.add_argument('timeline', nargs='?', default='synthetic', help="'synthetic' 或 availability_recorder 记录文件")
+    parser.add_argument('--strategy', action='append', default=[], help="如 '07:00-12:00@二等座'、'G1234/G1236'、'A>B'")
+    parser.add_argument('--config', help='加入配置文件（config.json）中的抢票策略')
+    parser.add_argument('--interval', action='append', default=[], help="刷新间隔秒数，如 '0.5' 或 '2-4'，可多次指定")
+    parser.add_argument('--sales', type=int, default=2000, help='模拟的开售场数')
+    parser.add_argument('--attempts', type=int, default=200, help='每场最多查询次数')
+    parser.add_argument('--poll-cost', type=float, default=DEFAULT_POLL_COST, help='每次查询耗时（秒）')
+    parser.add_argument('--book-latency', type=float, default=DEFAULT_BOOK_LATENCY, help='命中到提交订单的耗时（秒）')
+    parser.add_argument('--shift', type=float, default=1.0, help='记录时间线每场的开售时刻随机偏移（±秒）')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--no-numpy', action='store_true', help='强制使用纯 Python 计算')
+    parser.add_argument('--json', help='把结果写入 JSON 文件')
+    args = parser.parse_args(argv)
+
+    if args.timeline == 'synthetic':
+        source = SyntheticSales()
+    else:
+        source = RecordedSales(timeline_from_recording(args.timeline), args.shift)
+
+    specs = args.strategy or _default_strategies(source.trains)
+    try:
+        strategies = [(spec, parse_strategy(spec)) for spec in specs]
+        if args.config:
+            with open(args.config, encoding='utf-8') as f:
+                strategy = compile_strategy(json.load(f))
+            strategies.append((strategy.describe(), strategy))
+        cadences = [Cadence(spec, args.poll_cost) for spec in (args.interval or ['0.5', '1', '2-4'])]
+    except ValueError as e:
+        print(f'参数有误：{e}')
+        return 1
+    for name, strategy in strategies:
+        if not candidates(strategy, source.trains):
+            print(f'⚠ 策略 {name} 在时间线中没有候选车次')
+    use_numpy = np is not None and not args.no_numpy
+    if not use_numpy:
+        print('未使用 NumPy，逐场计算（较慢）')
+
+    t0 = time.perf_counter()
+    results = run_sweep(source, strategies, cadences, args.sales, args.attempts, args.book_latency, args.seed,
+                        use_numpy)
+    elapsed = time.perf_counter() - t0
+
+    width = max(len(r.strategy) for r in results) + 2
+    print(f"{'策略':<{width}}{'刷新':>8}{'命中率':>8}{'出票p50 s':>11}{'出票p90 s':>11}{'查询次数':>9}")
+    for r in results:
+        p50, p90 = (f'{_percentile(r.book_at, p):.2f}' if r.hits else '-' for p in (50, 90))
+        print(f'{r.strategy:<{width}}{r.cadence:>8}{r.hit_rate:>8.1%}{p50:>11}{p90:>11}{r.queries:>9.1f}')
+    print(f'{args.sales} 场 × {len(results)} 组参数，用时 {elapsed:.2f}s')
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump([r.as_dict() for r in results], f, ensure_ascii=False, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,156 @@
+"""
+鲸介12306 抢票助手 - 在线选座
+
+确认对话框中的选座面板按席别排布座位字母（二等座 A B C | D F，一等座 A C | D F，商务座 A | C F），
+每个乘车人选一个座位，面板里有几排就出现几组 1A、2A……形式的座位。
+原先只在面板中找到第一个链接点一下，靠窗/靠过道的偏好不起作用；现在：
+    1. 一次脚本读出整个面板：各座位的排号、字母、是否已选/不可选，以及订单页的席别和已勾选的乘车人数；
+    2. 按席别把字母映射为靠窗/中间/过道，为每位乘车人挑座位：多人时优先同一排相邻、不跨过道；
+    3. 再用一次脚本点击选中的全部座位（已选中的不再点击，避免取消选择）。
+选座共两次 WebDriver 往返。
+
+开源协议：MIT License
+"""
+import re
+
+# 座位字母 → 位置（window 靠窗 / middle 中间 / aisle 过道），按面板中的左右顺序排列，'|' 为过道
+SEAT_LAYOUTS = {
+    '二等座': ('A', 'B', 'C', '|', 'D', 'F'),
+    '一等座': ('A', 'C', '|', 'D', 'F'),
+    '商务座': ('A', '|', 'C', 'F'),
+}
+SEAT_POSITIONS = {
+    '二等座': {'A': 'window', 'B': 'middle', 'C': 'aisle', 'D': 'aisle', 'F': 'window'},
+    '一等座': {'A': 'window', 'C': 'aisle', 'D': 'aisle', 'F': 'window'},
+    '商务座': {'A': 'window', 'C': 'aisle', 'F': 'window'},
+}
+# 与商务座同为 2+1 / 1+2 布局的席别
+_LAYOUT_ALIASES = {'特等座': '商务座', '优选一等座': '一等座'}
+
+# 偏好 → 各位置的优先级（越小越好）
+_RANK = {
+    'window': {'window': 0, 'middle': 1, 'aisle': 2},
+    'aisle': {'aisle': 0, 'middle': 1, 'window': 2},
+    'first': {'window': 0, 'middle': 0, 'aisle': 0},
+}
+
+_SEAT_ID_RE = re.compile(r'^(\d+)([A-Z])$')
+
+# 读取选座面板：[[座位 id, 是否已选, 是否不可选], ...]、订单页所选席别、已勾选乘车人数；面板不存在时返回 null
+_SEAT_PANEL_JS = r"""
+var panel = document.querySelector('.seat-sel-bd');
+if (!panel) { return null; }
+var seats = [], links = panel.querySelectorAll('a[id]');
+for (var i = 0; i < links.length; i++) {
+    var a = links[i];
+    if (!/^\d+[A-Z]$/.test(a.id)) { continue; }
+    var off = a.classList.contains('disabled') || a.getAttribute('disabled') !== null || !a.getClientRects().length;
+    seats.push([a.id, a.classList.contains('cur'), off]);
+}
+var s = document.getElementById('seatType_1');
+var seatType = s && s.selectedIndex >= 0 ? (s.options[s.selectedIndex].textContent || '').trim() : '';
+var n = document.querySelectorAll('input[id^="normalPassenger_"]:checked').length;
+return [seats, seatType, n];
+"""
+
+# 点击 arguments[0] 中尚未选中的座位，返回点击后处于选中状态的座位 id
+_CLICK_SEATS_JS = r"""
+var ids = arguments[0], done = [];
+for (var i = 0; i < ids.length; i++) {
+    var a = document.getElementById(ids[i]);
+    if (!a) { continue; }
+    if (!a.classList.contains('cur')) { a.click(); }
+    if (a.classList.contains('cur')) { done.push(ids[i]); }
+}
+return done;
+"""
+
+
+def layout_for(seat_type, letters):
+    """按订单页席别（如“二等座（¥150.0）”）确定布局；无法识别时按面板中出现的字母推断"""
+    seat_type = seat_type or ''
+    for name in list(SEAT_LAYOUTS) + list(_LAYOUT_ALIASES):
+        if seat_type.startswith(name):
+            return _LAYOUT_ALIASES.get(name, name)
+    letters = set(letters)
+    if 'B' in letters:
+        return '二等座'
+    if 'D' in letters:
+        return '一等座'
+    return '商务座'
+
+
+def parse_panel(raw):
+    """把面板脚本返回的座位列表整理为 {排号: [(字母, id, 是否已选, 是否不可选)]}，每排按字母排序"""
+    rows = {}
+    for seat_id, cur, off in raw or ():
+        m = _SEAT_ID_RE.match(seat_id)
+        if m:
+            rows.setdefault(int(m.group(1)), []).append((m.group(2), seat_id, bool(cur), bool(off)))
+    for seats in rows.values():
+        seats.sort()
+    return rows
+
+
+def choose_seats(rows, count, preference='first', layout='二等座'):
+    """为 count 位乘车人挑座位，返回座位 id 列表（按乘车人顺序）
+
+    preference 为 first / window / aisle。单人时取偏好位置最好的座位；多人时优先同一排相邻且不跨过道的座位组，
+    组内至少有一个偏好位置，凑不出时退回逐个按偏好挑选。
+    """
+    count = max(1, int(count))
+    rank = _RANK.get(preference, _RANK['first'])
+    positions = SEAT_POSITIONS[layout]
+    order = SEAT_LAYOUTS[layout]
+    side = {}
+    s = 0
+    for letter in order:
+        if letter == '|':
+            s += 1
+        else:
+            side[letter] = s
+
+    def score(letter):
+        return rank.get(positions.get(letter, 'middle'), 1)
+
+    free = [(r, letter, seat_id) for r in sorted(rows) for letter, seat_id, cur, off in rows[r] if not off]
+    if count > 1:
+        best = None
+        for r in sorted(rows):
+            seats = [(letter, seat_id) for letter, seat_id, cur, off in rows[r] if not off and letter in side]
+            seats.sort(key=lambda x: order.index(x[0]))
+            for i in range(len(seats) - count + 1):
+                block = seats[i:i + count]
+                letters = [letter for letter, _ in block]
+                # 相邻：字母在布局中连续（过道两侧也算相邻，但排在不跨过道的组之后）
+                idx = [order.index(letter) for letter in letters]
+                if any(b - a > (2 if order[a + 1] == '|' else 1) for a, b in zip(idx, idx[1:])):
+                    continue
+                crosses = len({side[letter] for letter in letters}) > 1
+                key = (crosses, min(score(letter) for letter in letters), sum(score(letter) for letter in letters), r, i)
+                if best is None or key < best[0]:
+                    best = (key, [seat_id for _, seat_id in block])
+        if best is not None:
+            # 偏好位置的座位留给第一位乘车人
+            return sorted(best[1], key=lambda seat_id: score(seat_id[-1]))
+    free.sort(key=lambda x: (score(x[1]), x[0], order.index(x[1]) if x[1] in order else len(order)))
+    return [seat_id for _, _, seat_id in free[:count]]
+
+
+def select_seats(driver, preferred_type='first', passengers=None):
+    """读取选座面板并为每位乘车人选座，返回 (选中的座位 id 列表, 布局名)；面板不存在时返回 (None, '')
+
+    passengers 为乘车人数，缺省取订单页已勾选的乘车人数。
+    """
+    res = driver.execute_script(_SEAT_PANEL_JS)
+    if res is None:
+        return None, ''
+    raw, seat_type, checked = res
+    rows = parse_panel(raw)
+    if not rows:
+        return [], ''
+    layout = layout_for(seat_type, {letter for seats in rows.values() for letter, *_ in seats})
+    ids = choose_seats(rows, passengers or checked or 1, preferred_type, layout)
+    if not ids:
+        return [], layout
+    return driver.execute_script(_CLICK_SEATS_JS, ids), layout
@@ -0,0 +1,140 @@
+"""
+鲸介12306 抢票助手 - 服务器时钟同步与精确开售触发
+
+通过多次请求的 HTTP Date 响应头估计本机与 12306 服务器的时钟偏差：
+Date 只精确到秒，因此每个样本给出偏差的一个区间 [D - 收到时刻, D + 1 - 发出时刻]，
+去掉往返时间明显偏长的样本后求区间交集；之后把请求对准估计的服务器整秒边界，
+每个样本把区间二分一次，最终精度受往返时间限制，通常为毫秒级。
+开售等待采用“先睡眠、最后几十毫秒自旋”的混合方式。
+
+开源协议：MIT License
+"""
+import math
+import time
+from collections import namedtuple
+from email.utils import parsedate_to_datetime
+
+import urllib3
+
+DEFAULT_SYNC_URL = 'https://kyfw.12306.cn/otn/'
+# 样本过滤时在往返时间上限之外额外容忍的抖动（秒），避免本机 / 局域网上亚毫秒级的往返时间把正常样本滤掉
+RTT_SLACK = 0.002
+
+ClockSample = namedtuple('ClockSample', 't_send t_recv server_second')
+
+
+class ServerClock:
+    """本机时钟 + 偏差 = 服务器时钟"""
+
+    def __init__(self, offset=0.0, uncertainty=None, samples=0):
+        self.offset = offset
+        self.uncertainty = uncertainty
+        self.samples = samples
+
+    def now(self):
+        """当前服务器时间戳"""
+        return time.time() + self.offset
+
+    def to_local(self, server_ts):
+        return server_ts - self.offset
+
+    def describe(self):
+        if not self.samples:
+            return '未同步服务器时钟，使用本机时间'
+        err = f'±{self.uncertainty * 1000:.0f}ms' if self.uncertainty is not None else '误差未知'
+        return f'服务器时钟偏差 {self.offset * 1000:+.0f}ms（{err}，{self.samples} 个样本）'
+
+
+def estimate_offset(samples):
+    """由样本估计 (offset, uncertainty)
+
+    仅保留往返时间不超过中位数 2 倍（另加 RTT_SLACK 余量）的样本：慢样本的区间本来就宽，只有排队造成的
+    异常值才需要去掉，按中位数一刀切会丢掉一半二分得到的边界样本。区间交集为空（网络抖动）时退回到中点估计的中位数。
+    """
+    if not samples:
+        raise ValueError('没有可用的时钟样本')
+    rtts = sorted(s.t_recv - s.t_send for s in samples)
+    cutoff = 2 * rtts[(len(rtts) - 1) // 2] + RTT_SLACK
+    good = [s for s in samples if s.t_recv - s.t_send <= cutoff]
+    lo = max(s.server_second - s.t_recv for s in good)
+    hi = min(s.server_second + 1 - s.t_send for s in good)
+    if lo <= hi:
+        return (lo + hi) / 2, (hi - lo) / 2
+    mids = sorted(s.server_second + 0.5 - (s.t_send + s.t_recv) / 2 for s in good)
+    return mids[len(mids) // 2], 0.5
+
+
+def _sample(pool, url, timeout):
+    t0 = time.time()
+    resp = pool.request('HEAD', url, timeout=timeout, headers={'Connection': 'keep-alive'})
+    t1 = time.time()
+    date = resp.headers.get('Date')
+    if not date:
+        raise ValueError('响应缺少 Date 头')
+    return ClockSample(t0, t1, parsedate_to_datetime(date).timestamp())
+
+
+def collect_samples(url=DEFAULT_SYNC_URL, count=6, spacing=0.137, refine=8, timeout=3.0, pool=None,
+                    sleep=time.sleep):
+    """对 url 发 HEAD 请求收集时钟样本
+
+    先以非整数秒间隔采 count 个粗样本（首个请求只用于建立连接），
+    再做 refine 次二分：让请求恰好在估计的服务器整秒边界到达。
+    sleep 可换成可取消的等待（CancelToken.sleep）。
+    """
+    pool = pool or urllib3.PoolManager(maxsize=1, retries=False)
+    t = urllib3.Timeout(connect=timeout, read=timeout)
+    _sample(pool, url, t)
+    samples = []
+    for _ in range(count):
+        samples.append(_sample(pool, url, t))
+        sleep(spacing)
+    rtt = sorted(s.t_recv - s.t_send for s in samples)[len(samples) // 2]
+    for _ in range(refine):
+        offset, uncertainty = estimate_offset(samples)
+        if uncertainty <= rtt / 2:
+            break
+        now = time.time()
+        boundary = math.floor(now + offset) + 1
+        send_at = boundary - offset - rtt / 2
+        if send_at - now < 0.05:
+            send_at += 1
+        sleep(send_at - now)
+        samples.append(_sample(pool, url, t))
+    return samples
+
+
+def sync_server_clock(url=DEFAULT_SYNC_URL, count=6, refine=8, timeout=3.0, sleep=time.sleep):
+    """同步服务器时钟，失败时返回零偏差的 ServerClock"""
+    try:
+        samples = collect_samples(url, count=count, refine=refine, timeout=timeout, sleep=sleep)
+        offset, uncertainty = estimate_offset(samples)
+        return ServerClock(offset, uncertainty, len(samples))
+    except Exception as e:
+        print(f'服务器时钟同步失败: {e}，改用本机时间')
+        return ServerClock()
+
+
+def precise_wait_until(local_ts, spin=0.02, coarse=1.0, sleep=time.sleep):
+    """等待到本机时间戳 local_ts：先分段睡眠，最后 spin 秒忙等
+
+    换算到 perf_counter 时间轴，避免等待过程中系统时间被调整。
+    """
+    deadline = time.perf_counter() + (local_ts - time.time())
+    while True:
+        remaining = deadline - time.perf_counter()
+        if remaining <= spin:
+            break
+        sleep(min(coarse, remaining - spin))
+    while time.perf_counter() < deadline:
+        pass
+    return time.perf_counter() - deadline
+
+
+def wait_for_sale(clock, start_server_ts, lead=0.0, sleep=time.sleep):
+    """按服务器时钟等待开售，提前 lead 秒触发，返回触发误差（秒，正数为晚到）"""
+    target = clock.to_local(start_server_ts - lead)
+    remaining = target - time.time()
+    if remaining <= 0:
+        return -remaining
+    return precise_wait_until(target, sleep=sleep)
@@ -0,0 +1,180 @@
+"""
+鲸介12306 抢票助手 - 本地车站字典
+
+随程序附带车站表 station_names.txt（站名、电报码、全拼、简拼），加载为排序前缀索引，
+离线解析站名只需微秒级；购票页直接写入隐藏的电报码字段，不再输入后等待下拉联想。
+站名不能唯一解析时返回 None，由调用方回退到下拉联想，不会猜错车站。
+
+附带的车站表只含常用车站，可用 12306 的 station_name.js 重建为完整表：
+
+    python station_index.py refresh station_name.js     # 从车站列表文件重建
+    python station_index.py check [--budget-ms 50]      # 检查加载耗时是否在预算内
+    python station_index.py lookup gzn                  # 按前缀查询
+
+开源协议：MIT License
+"""
+import argparse
+import sys
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from collections import namedtuple
+from pathlib import Path
+
+DEFAULT_STATION_FILE = Path(__file__).resolve().with_name('station_names.txt')
+# 启动时加载车站表的耗时预算（毫秒），超出时提示
+DEFAULT_LOAD_BUDGET_MS = 50
+
+Station = namedtuple('Station', 'name code pinyin abbr')
+
+
+class StationIndex:
+    """车站前缀索引：站名 / 全拼 / 简拼 排序后与车站序号并列存放，前缀查询用二分"""
+
+    def __init__(self, stations):
+        self.stations = list(stations)
+        self._by_name = {}
+        self._by_code = {}
+        pairs = []
+        for i, s in enumerate(self.stations):
+            self._by_name.setdefault(s.name, s)
+            self._by_code.setdefault(s.code, s)
+            for key in {s.name, s.pinyin, s.abbr}:
+                if key:
+                    pairs.append((key, i))
+        pairs.sort()
+        self._keys = [k for k, _ in pairs]
+        self._ids = array('I', [i for _, i in pairs])
+        self.load_ms = 0.0
+
+    def __len__(self):
+        return len(self.stations)
+
+    def _range(self, key):
+        lo = bisect_left(self._keys, key)
+        hi = lo
+        while hi < len(self._keys) and self._keys[hi].startswith(key):
+            hi += 1
+        return lo, hi
+
+    def lookup(self, prefix, limit=10):
+        """按站名 / 全拼 / 简拼前缀查询，返回至多 limit 个车站（按原表顺序）"""
+        key = prefix.strip().lower()
+        if not key:
+            return []
+        lo, hi = self._range(key)
+        ids = sorted(set(self._ids[lo:hi]))
+        return [self.stations[i] for i in ids[:limit]]
+
+    def resolve(self, text):
+        """站名、电报码、全拼或简拼精确匹配且唯一时返回 Station，否则返回 None"""
+        t = text.strip()
+        s = self._by_name.get(t)
+        if s is not None:
+            return s
+        if len(t) == 3 and t.isascii() and t.isalpha() and t.isupper():
+            return self._by_code.get(t)
+        key = t.lower()
+        lo, hi = self._range(key)
+        ids = {self._ids[i] for i in range(lo, hi) if self._keys[i] == key}
+        return self.stations[ids.pop()] if len(ids) == 1 else None
+
+
+def parse_station_js(text):
+    """解析 12306 station_name.js（'@bjb|北京北|VAP|beijingbei|bjb|0|...' 格式），按电报码去重"""
+    seen = set()
+    stations = []
+    for record in text.split('@')[1:]:
+        f = record.split('|')
+        if len(f) < 5 or not f[1] or not f[2] or f[2] in seen:
+            continue
+        seen.add(f[2])
+        stations.append(Station(f[1], f[2], f[3].lower(), f[4].lower()))
+    return stations
+
+
+def read_stations(path=DEFAULT_STATION_FILE):
+    """读取车站表（每行 站名|电报码|全拼|简拼，# 开头为注释）"""
+    stations = []
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            f4 = line.split('|')
+            if len(f4) >= 4:
+                stations.append(Station(*f4[:4]))
+    return stations
+
+
+def write_stations(stations, path=DEFAULT_STATION_FILE, source=''):
+    with open(path, 'w', encoding='utf-8', newline='\n') as f:
+        f.write('# 车站表：站名|电报码|全拼|简拼\n')
+        f.write(f'# 由 station_index.py refresh 生成{("，来源 " + source) if source else ""}\n')
+        for s in stations:
+            f.write('|'.join(s) + '\n')
+
+
+def load_index(path=DEFAULT_STATION_FILE):
+    """加载车站表并建立索引，记录耗时；文件不存在时返回空索引（全部回退到下拉联想）"""
+    t0 = time.perf_counter()
+    try:
+        stations = read_stations(path)
+    except FileNotFoundError:
+        print(f'未找到车站表 {path}，将使用下拉联想填写车站')
+        stations = []
+    index = StationIndex(stations)
+    index.load_ms = (time.perf_counter() - t0) * 1000
+    return index
+
+
+_default_index = None
+_default_lock = threading.Lock()
+
+
+def default_index(budget_ms=None):
+    """进程内共享的默认车站索引，首次调用时加载；超出加载预算时提示"""
+    global _default_index
+    with _default_lock:
+        if _default_index is None:
+            _default_index = load_index()
+            budget = float(budget_ms or DEFAULT_LOAD_BUDGET_MS)
+            if _default_index.load_ms > budget:
+                print(f'⚠ 车站表加载耗时 {_default_index.load_ms:.1f}ms，超出预算 {budget:.0f}ms')
+        return _default_index
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='本地车站字典')
+    sub = parser.add_subparsers(dest='command', required=True)
+    p = sub.add_parser('refresh', help='从 12306 station_name.js 重建车站表')
+    p.add_argument('source', help='station_name.js 文件路径')
+    p.add_argument('--out', default=str(DEFAULT_STATION_FILE))
+    p = sub.add_parser('check', help='检查车站表加载耗时')
+    p.add_argument('--budget-ms', type=float, default=DEFAULT_LOAD_BUDGET_MS)
+    p = sub.add_parser('lookup', help='按站名 / 全拼 / 简拼前缀查询')
+    p.add_argument('prefix')
+    args = parser.parse_args(argv)
+
+    if args.command == 'refresh':
+        with open(args.source, encoding='utf-8') as f:
+            stations = parse_station_js(f.read())
+        if not stations:
+            print(f'{args.source} 中没有解析到车站，未修改车站表')
+            return 1
+        write_stations(stations, args.out, source=Path(args.source).name)
+        print(f'✓ 已写入 {len(stations)} 个车站到 {args.out}')
+    elif args.command == 'check':
+        index = load_index()
+        ok = index.load_ms <= args.budget_ms
+        print(f"{len(index)} 个车站，加载 {index.load_ms:.1f}ms（预算 {args.budget_ms:.0f}ms）{'✓' if ok else '✗ 超出预算'}")
+        return 0 if ok else 1
+    else:
+        for s in load_index().lookup(args.prefix):
+            print(f'{s.name}\t{s.code}\t{s.pinyin}\t{s.abbr}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,96 @@
+"""
+鲸介12306 抢票助手 - 余票变化记录格式测试
+
+写入若干轮车次表（重复与新出现的车次、余票减少的负差值、空轮询、车次消失、时钟回拨），
+read_frames 逐轮读回的余票、可预订状态与备注应与写入时一致；
+文件在任意位置截断时只丢弃不完整的最后一轮，多次追加的记录段按顺序连续读出。
+
+开源协议：MIT License
+"""
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from availability_recorder import AvailabilityRecorder, read_frames, summarize
+from train_table import TrainRow, TrainTable
+
+T0 = 1767225600.0
+
+
+def _row(train, depart, seats=None, bookable=True):
+    cols = ['无'] * 12
+    for i, text in (seats or {}).items():
+        cols[i] = text
+    return TrainRow(train, depart, None if depart is None else '23:59', tuple(cols), 'btn' if bookable else None)
+
+
+POLLS = [
+    (T0, [_row('G1', '08:00', {3: '有'}), _row('G2', '09:00', bookable=False)]),
+    (T0 + 1.5, [_row('G1', '08:00', {3: '有'}), _row('G2', '09:00', bookable=False)]),
+    (T0 + 2.0, []),
+    (T0 + 3.25, [_row('G1', '08:00', {3: '2', 2: '5'}), _row('G2', '09:00', {3: '有'}),
+                 _row('D7', None, {9: '12'})]),
+    (T0 + 3.0, [_row('G1', '08:00', {2: '1'}), _row('D7', None, {9: '3'}, bookable=False)]),
+    (T0 + 4.0, [_row('G1', '08:00', {2: '1'}), _row('K9', '21:30', {7: '有', 10: '1'}),
+                _row('G2', '09:00', {3: '1'})]),
+]
+
+
+def _expected(rows):
+    return {r.train: (r.depart, r.arrive, r.avail, r.bookable) for r in rows}
+
+
+def _got(frame):
+    return {t: (r.depart, r.arrive, r.avail, r.bookable) for t, r in frame.rows.items()}
+
+
+def _write(path, polls=POLLS, notes=()):
+    rec = AvailabilityRecorder(str(path))
+    for key, value in notes:
+        rec.note(key, value)
+    for at, rows in polls:
+        rec.record(TrainTable(rows), at=at)
+    rec.close()
+    return rec
+
+
+def test_round_trip(tmp_path):
+    path = tmp_path / 'avail.bin'
+    rec = _write(path, notes=[('route', 'IZQ-IOQ'), ('date', '2026-02-05')])
+    # Frame.rows 由读取端原地更新，逐轮取出比较
+    frames = [(f.at, _got(f), f.changed, dict(f.notes)) for f in read_frames(str(path))]
+    assert len(frames) == rec.polls == len(POLLS)
+    for (frame_at, got, _, _), (at, rows) in zip(frames, POLLS):
+        assert frame_at == int(at * 1000) / 1000
+        assert got == _expected(rows)
+    assert frames[0][3] == {'route': 'IZQ-IOQ', 'date': '2026-02-05'}
+    # 余票不变的轮询只记录时间；空轮询表示车次全部消失
+    assert frames[1][2] == ()
+    assert set(frames[2][2]) == {'G1', 'G2'}
+    assert set(frames[4][2]) == {'G1', 'D7', 'G2'}
+    assert frames[5][1]['K9'][2][7] == 99 and frames[5][1]['G2'][2][3] == 1
+    assert path.stat().st_size == rec.bytes
+
+
+def test_truncated_file_keeps_complete_polls(tmp_path):
+    path = tmp_path / 'avail.bin'
+    _write(path)
+    data = path.read_bytes()
+    full = [_got(f) for f in read_frames(str(path))]
+    cut = tmp_path / 'cut.bin'
+    for size in range(len(data)):
+        cut.write_bytes(data[:size])
+        got = [_got(f) for f in read_frames(str(cut))]
+        assert got == full[:len(got)]
+        assert len(got) < len(full)
+
+
+def test_appended_segments(tmp_path):
+    path = tmp_path / 'avail.bin'
+    _write(path, POLLS[:2])
+    _write(path, POLLS[3:4])
+    assert [_got(f) for f in read_frames(str(path))] == [_expected(rows) for _, rows in POLLS[:2] + POLLS[3:4]]
+    st = summarize(str(path))
+    assert st['polls'] == 3 and st['first_open'] == {'G1': T0, 'G2': T0 + 3.25, 'D7': T0 + 3.25}
@@ -0,0 +1,104 @@
+"""
+鲸介12306 抢票助手 - 守护进程浏览器池测试
+
+用桩浏览器替换 clone_logged_in_driver，验证失效浏览器的替换：
+同一个失效浏览器被多个线程同时归还时只替换一次、不抛出 ValueError，多出来的新浏览器会被关闭；
+无法替换时移出浏览器池，retire 对已移出的浏览器不做任何事。
+
+开源协议：MIT License
+"""
+import sys
+import threading
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import booking_daemon
+from booking_daemon import BrowserPool
+
+
+class StubDriver:
+    def __init__(self, name, alive=True):
+        self.name = name
+        self.alive = alive
+        self.quits = 0
+
+    @property
+    def current_url(self):
+        if not self.alive:
+            raise RuntimeError('session deleted')
+        return 'https://kyfw.12306.cn/otn/leftTicket/init'
+
+    def quit(self):
+        self.quits += 1
+        self.alive = False
+
+    def __repr__(self):
+        return f'StubDriver({self.name})'
+
+
+def _pool(monkeypatch, n=3, clone_delay=0.0, fail=False):
+    created = []
+
+    def clone(donor, settings):
+        time.sleep(clone_delay)
+        if fail:
+            raise RuntimeError('clone failed')
+        d = StubDriver(f'clone{len(created)}')
+        created.append(d)
+        return d
+
+    monkeypatch.setattr(booking_daemon, 'clone_logged_in_driver', clone)
+    pool = BrowserPool(n, {})
+    pool._drivers = [StubDriver(f'd{i}') for i in range(n)]
+    return pool, created
+
+
+def test_replace_dead_driver(monkeypatch):
+    pool, created = _pool(monkeypatch)
+    dead = pool._drivers[1]
+    dead.alive = False
+    pool.release(dead)
+    assert pool._drivers[1] is created[0] and pool._idle == [created[0]]
+    assert dead.quits == 1
+    # 已被替换的浏览器再次归还时不报错，也不再替换
+    pool.release(dead)
+    assert len(created) == 1 and pool.total == 3 and pool._idle == [created[0]]
+
+
+def test_concurrent_release_of_same_dead_driver(monkeypatch):
+    pool, created = _pool(monkeypatch, clone_delay=0.05)
+    dead = pool._drivers[0]
+    dead.alive = False
+    errors = []
+
+    def release():
+        try:
+            pool.release(dead)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=release) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert errors == []
+    assert pool.total == 3 and dead not in pool._drivers
+    fresh = [d for d in created if d in pool._drivers]
+    assert len(fresh) == 1 and pool._idle == fresh
+    # 其余线程打开的浏览器都已关闭
+    assert all(d.quits == 1 for d in created if d not in fresh)
+
+
+def test_unreplaceable_driver_is_removed(monkeypatch):
+    pool, _ = _pool(monkeypatch, fail=True)
+    dead = pool._drivers[2]
+    dead.alive = False
+    pool.release(dead)
+    assert pool.total == 2 and dead not in pool._drivers and pool._idle == []
+    pool.release(dead)
+    pool.retire(dead)
+    assert pool.total == 2
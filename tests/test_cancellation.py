@@ -0,0 +1,105 @@
+"""
+鲸介12306 抢票助手 - 协作式取消测试
+
+在内存版 FakeWebDriver 上验证：刷新间隔的等待中取消时轮询立即返回；
+等待结果表重绘、等待订单页元素（execute_async_script 分片等待）时取消在数个 SLICE 内生效；
+Cancelled 继承 BaseException，在各步骤的 except Exception 中不会被吞掉，也不计为 WebDriver 错误。
+
+开源协议：MIT License
+"""
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / 'benchmarks'))
+
+from booking_core import _CANCELLED_MSG, book_by_time_range, select_seat_fast
+from cancellation import SLICE, CancelToken, Cancelled
+from fake_site import FakeSite
+from fake_webdriver import FakeWebDriver
+from metrics import METRICS
+from order_flow import OrderFlow
+from tracing import NullTracer
+
+# 取消后允许的最长停止延迟（秒）
+PROMPT = 3 * SLICE + 0.1
+
+
+def _driver(open_ratio=0.0, **kw):
+    site = FakeSite(rows=10, open_ratio=open_ratio, open_at=0.0, open_spread=0.0)
+    return FakeWebDriver(site, **dict(dict(rtt=0, render_delay=0.001), **kw))
+
+
+def _cancel_after(seconds, token):
+    """seconds 秒后取消 token，返回取消时刻的列表（取消后填入）"""
+    fired = []
+
+    def fire():
+        fired.append(time.perf_counter())
+        token.cancel()
+    threading.Timer(seconds, fire).start()
+    return fired
+
+
+def test_cancel_during_refresh_interval():
+    cancel = CancelToken()
+    driver = _driver()
+    fired = _cancel_after(0.1, cancel)
+    result = book_by_time_range(driver, '00:00', '23:59', max_attempts=100, refresh_interval=(5, 5), cancel=cancel)
+    assert result.row is None and result.message == _CANCELLED_MSG
+    assert time.perf_counter() - fired[0] < PROMPT
+    assert driver.refreshes == 0
+
+
+def test_cancel_while_waiting_for_table_render():
+    cancel = CancelToken()
+    driver = _driver(render_delay=30.0)
+    fired = _cancel_after(0.1, cancel)
+    with pytest.raises(Cancelled):
+        book_by_time_range(driver, '00:00', '23:59', max_attempts=100, refresh_interval=(0, 0), cancel=cancel)
+    assert time.perf_counter() - fired[0] < PROMPT
+
+
+def test_cancel_while_waiting_for_order_page():
+    cancel = CancelToken()
+    driver = _driver(open_ratio=1.0, passenger_delay=0.01, confirm_delay=30.0)
+    assert book_by_time_range(driver, '00:00', '23:59', max_attempts=2, refresh_interval=(0.001, 0.002)).row
+    flow = OrderFlow(driver, {'ticket_type': 'adult'}, seat_selector=select_seat_fast, dialog_grace=0.01,
+                     step_timeout=60.0, cancel=cancel)
+    fired = _cancel_after(0.1, cancel)
+    with pytest.raises(Cancelled):
+        flow.run()
+    assert time.perf_counter() - fired[0] < PROMPT
+    assert driver.order_done_at is None
+    assert [t.step for t in flow.timings][-1] == 'submit'
+
+
+class CancellingTracer(NullTracer):
+    """进入 stage 阶段时取消令牌，模拟在两次 WebDriver 调用之间点击停止"""
+
+    def __init__(self, token, stage):
+        self.token = token
+        self.stage = stage
+
+    @contextmanager
+    def span(self, stage, **attrs):
+        if stage == self.stage:
+            self.token.cancel()
+        yield attrs
+
+
+def test_cancelled_is_not_swallowed_by_step_handlers(capsys):
+    cancel = CancelToken()
+    errors = METRICS.snapshot().total('webdriver_errors_total')
+    with pytest.raises(Cancelled):
+        book_by_time_range(_driver(), '00:00', '23:59', max_attempts=5, refresh_interval=(0, 0), cancel=cancel,
+                           tracer=CancellingTracer(cancel, 'parse'))
+    assert '尝试失败' not in capsys.readouterr().out
+    assert METRICS.snapshot().total('webdriver_errors_total') == errors
+    assert issubclass(Cancelled, BaseException) and not issubclass(Cancelled, Exception)
@@ -0,0 +1,93 @@
+"""
+鲸介12306 抢票助手 - 并行窗口的并发监控预订测试
+
+两个并行窗口按 worker_slice 切分主查询与 watch_queries：窗口 1 只监控另一日期的查询，
+命中后必须先把购票页切换到该日期再点击预订，余票记录也只记录页面上的主查询。
+使用内存版 FakeWebDriver 和返回固定结果的查询引擎，不访问网络。
+
+开源协议：MIT License
+"""
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / 'benchmarks'))
+
+from booking_core import book_with_fanout, fanout_queries
+from fake_site import FakeSite
+from fake_webdriver import FakeWebDriver
+from fanout_poller import WatchQuery
+from train_table import TimeRangeStrategy
+
+MAIN_DATE = '2026-02-05'
+WATCH_DATE = '2026-02-06'
+
+
+class DateEngine:
+    """只有 open_date 这一天有余票的查询引擎"""
+
+    base_url = 'https://kyfw.12306.cn'
+
+    def __init__(self, site, open_date):
+        self.site = site
+        self.open_date = open_date
+        self.dates = []
+
+    def query_url(self, travel_date, from_code, to_code, purpose='ADULT'):
+        return f'{self.base_url}/otn/leftTicket/query?date={travel_date}'
+
+    def query(self, travel_date, from_code, to_code, purpose='ADULT'):
+        self.dates.append(travel_date)
+        is_open = travel_date == self.open_date
+        return [{'train': t.train, 'depart': t.depart, 'arrive': t.arrive,
+                 'seats': list(t.seats_open if is_open else t.seats_closed), 'book': 'secret' if is_open else None}
+                for t in self.site.trains]
+
+
+class ListRecorder:
+    def __init__(self):
+        self.tables = []
+
+    def record(self, table, at=None):
+        self.tables.append(table)
+
+
+def _params(worker):
+    return {'travel_date': MAIN_DATE, 'watch_queries': [{'travel_date': WATCH_DATE}], 'worker_slice': (worker, 2)}
+
+
+def test_slices_keep_the_page_query():
+    page0, queries0 = fanout_queries(_params(0), 'IZQ', 'IOQ')
+    page1, queries1 = fanout_queries(_params(1), 'IZQ', 'IOQ')
+    assert page0 == page1 == WatchQuery(MAIN_DATE, 'IZQ', 'IOQ')
+    assert queries0 == [page0]
+    assert queries1 == [WatchQuery(WATCH_DATE, 'IZQ', 'IOQ')]
+
+
+def _book(worker, open_date):
+    site = FakeSite(rows=10, open_ratio=1.0, open_at=0.0, open_spread=0.0)
+    driver = FakeWebDriver(site, rtt=0, render_delay=0.001, travel_date=MAIN_DATE)
+    engine = DateEngine(site, open_date)
+    recorder = ListRecorder()
+    page_query, queries = fanout_queries(_params(worker), site.from_code, site.to_code)
+    result = book_with_fanout(driver, engine, TimeRangeStrategy('00:00', '23:59'), queries, request_budget=5,
+                              interval=(0.001, 0.002), recorder=recorder, page_query=page_query)
+    return driver, engine, recorder, result
+
+
+def test_watch_hit_switches_page_date_before_booking():
+    driver, engine, recorder, result = _book(1, WATCH_DATE)
+    assert result.row is not None
+    assert driver.booked_train == result.row.train
+    assert driver.booked_date == WATCH_DATE
+    # 窗口 1 没有监控主查询，另一日期的车次表不应写进记录
+    assert engine.dates and set(engine.dates) == {WATCH_DATE}
+    assert recorder.tables == []
+
+
+def test_page_hit_books_without_switching():
+    driver, engine, recorder, result = _book(0, MAIN_DATE)
+    assert result.row is not None
+    assert driver.booked_date == MAIN_DATE
+    assert len(recorder.tables) == len(engine.dates)
@@ -0,0 +1,116 @@
+"""
+鲸介12306 抢票助手 - 多日期 / 多站点并发监控测试
+
+查询分布在两个主机上的桩引擎记录每个主机同时进行中的请求数：不超过 per_host_limit，
+总请求数不超过 request_budget；第一个命中后其余查询停止请求，取消令牌可中止监控，
+监控协程内的异常会被记录和计数而不是静默丢弃。
+
+开源协议：MIT License
+"""
+import sys
+import threading
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from cancellation import CancelToken
+from fanout_poller import FanoutPoller, WatchQuery
+from train_table import TimeRangeStrategy
+
+HOSTS = {'IZQ': 'a.example.com', 'SHH': 'b.example.com'}
+QUERIES = [WatchQuery(f'2026-02-0{d}', frm, 'IOQ') for d in range(1, 5) for frm in HOSTS]
+CLOSED = {'train': 'G1', 'depart': '08:00', 'arrive': '10:00', 'seats': ['无'] * 12, 'book': None}
+OPEN = dict(CLOSED, seats=['有'] * 12, book='secret')
+
+
+class TwoHostEngine:
+    """按出发站把查询分到两个主机，记录各主机的最大并发；hit 中的查询从第 hit_after 次请求起有票"""
+
+    def __init__(self, delay=0.01, hit=(), hit_after=1):
+        self.delay = delay
+        self.hit = set(hit)
+        self.hit_after = hit_after
+        self.calls = []
+        self.in_flight = {h: 0 for h in HOSTS.values()}
+        self.peak = dict(self.in_flight)
+        self._lock = threading.Lock()
+
+    def query_url(self, travel_date, from_code, to_code, purpose='ADULT'):
+        return f'https://{HOSTS[from_code]}/otn/leftTicket/query?date={travel_date}'
+
+    def query(self, travel_date, from_code, to_code, purpose='ADULT'):
+        host = HOSTS[from_code]
+        q = WatchQuery(travel_date, from_code, to_code, purpose)
+        with self._lock:
+            self.calls.append(q)
+            n = self.calls.count(q)
+            self.in_flight[host] += 1
+            self.peak[host] = max(self.peak[host], self.in_flight[host])
+        time.sleep(self.delay)
+        with self._lock:
+            self.in_flight[host] -= 1
+        return [OPEN if q in self.hit and n >= self.hit_after else CLOSED]
+
+
+def _poller(engine, **kw):
+    kw.setdefault('interval', (0.001, 0.002))
+    return FanoutPoller(engine, QUERIES, TimeRangeStrategy('00:00', '23:59'), **kw)
+
+
+def test_per_host_limit_and_budget():
+    engine = TwoHostEngine()
+    poller = _poller(engine, per_host_limit=2, request_budget=40)
+    assert poller.watch() is None
+    assert poller.requests == len(engine.calls) == 40
+    assert set(engine.peak.values()) == {2}
+    assert poller.errors == 0
+
+
+def test_budget_smaller_than_query_count():
+    engine = TwoHostEngine()
+    poller = _poller(engine, per_host_limit=3, request_budget=5)
+    assert poller.watch() is None
+    assert len(engine.calls) == poller.requests == 5
+    assert max(engine.peak.values()) <= 3
+
+
+def test_first_hit_stops_other_queries():
+    target = QUERIES[3]
+    engine = TwoHostEngine(hit=[target], hit_after=3)
+    poller = _poller(engine, request_budget=1000)
+    hit = poller.watch()
+    assert hit is not None and hit.query == target and hit.row.train == 'G1'
+    assert engine.calls.count(target) == 3
+    made = len(engine.calls)
+    time.sleep(0.05)
+    assert len(engine.calls) == made < 1000
+
+
+def test_cancel_token_stops_polling():
+    cancel = CancelToken()
+    engine = TwoHostEngine()
+    poller = _poller(engine, request_budget=10 ** 6, cancel=cancel)
+    threading.Timer(0.1, cancel.cancel).start()
+    t0 = time.perf_counter()
+    assert poller.watch() is None
+    assert time.perf_counter() - t0 < 0.5
+    made = len(engine.calls)
+    time.sleep(0.05)
+    assert len(engine.calls) == made
+
+
+def test_watcher_exception_is_counted():
+    broken = QUERIES[0]
+
+    def on_poll(query, rows):
+        if query == broken:
+            raise ValueError('bad snapshot')
+        return None
+
+    engine = TwoHostEngine()
+    poller = _poller(engine, request_budget=30, on_poll=on_poll)
+    assert poller.watch() is None
+    assert poller.crashed == 1 and poller.errors == 1
+    assert engine.calls.count(broken) == 1
@@ -0,0 +1,118 @@
+"""
+鲸介12306 抢票助手 - 运行指标测试
+
+用独立的 Metrics 实例验证：已结束线程的分片并入基础分片，计数、直方图与时刻不丢失，分片数不随线程数增长；
+Prometheus 文本输出的 HELP / TYPE 行、标签排序与转义、直方图累计桶，以及写入线程结束后的计数器总数。
+
+开源协议：MIT License
+"""
+import sys
+import threading
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from metrics import PREFIX, Metrics
+
+
+def _in_thread(fn):
+    t = threading.Thread(target=fn)
+    t.start()
+    t.join()
+
+
+def _series(text):
+    """{指标行名（含标签）: 值}，跳过注释行"""
+    out = {}
+    for line in text.splitlines():
+        if line and not line.startswith('#'):
+            name, value = line.rsplit(' ', 1)
+            out[name] = value
+    return out
+
+
+def test_dead_thread_shards_fold_into_base():
+    m = Metrics(buckets=(0.01, 0.1))
+
+    def work():
+        m.inc('polls_total')
+        m.inc('webdriver_errors_total', type='TimeoutException')
+        m.observe('parse_seconds', 0.005)
+        m.stamp('last_success')
+
+    for _ in range(50):
+        _in_thread(work)
+    snap = m.snapshot()
+    assert snap.total('polls_total') == 50
+    assert snap.by_label('webdriver_errors_total') == {(('type', 'TimeoutException'),): 50}
+    h = snap.hists[('parse_seconds', ())]
+    assert h[:3] == [50, 0, 0] and h[-1] == 50
+    assert snap.quantile('parse_seconds', 0.5) == 0.01
+    assert snap.age('last_success') is not None
+    # 读取时已结束线程的分片全部并入基础分片
+    assert m._shards == []
+    assert m._base.counters[('polls_total', ())] == 50
+
+
+def test_live_threads_keep_their_shards():
+    m = Metrics()
+    started, release = threading.Barrier(4), threading.Event()
+
+    def work():
+        m.inc('polls_total', 2)
+        started.wait()
+        release.wait()
+        m.inc('polls_total', 3)
+
+    threads = [threading.Thread(target=work) for _ in range(3)]
+    for t in threads:
+        t.start()
+    started.wait()
+    assert m.snapshot().total('polls_total') == 6
+    assert len(m._shards) == 3
+    release.set()
+    for t in threads:
+        t.join()
+    # 新线程注册分片时合并已结束的三个分片，只留下它自己的
+    _in_thread(lambda: m.inc('polls_total'))
+    assert len(m._shards) == 1
+    assert m.snapshot().total('polls_total') == 16
+    assert m._shards == []
+
+
+def test_exposition_format():
+    m = Metrics(buckets=(0.001, 0.01))
+
+    def work():
+        m.inc('click_attempts_total', result='ok')
+        m.inc('click_attempts_total', 2, result='failed')
+        m.inc('webdriver_errors_total', type='Weird "x"\\y\nz')
+        m.inc('custom_total', b='2', a='1')
+        m.observe('parse_seconds', 0.0005)
+        m.observe('parse_seconds', 0.005)
+        m.observe('parse_seconds', 0.5)
+
+    _in_thread(work)
+    text = m.exposition()
+    lines = text.splitlines()
+    assert f'# HELP {PREFIX}click_attempts_total 点击预订次数' in lines
+    assert f'# TYPE {PREFIX}click_attempts_total counter' in lines
+    assert f'# TYPE {PREFIX}parse_seconds histogram' in lines
+    assert f'# TYPE {PREFIX}custom_total untyped' in lines
+    assert f'# TYPE {PREFIX}uptime_seconds gauge' in lines
+    series = _series(text)
+    assert series[f'{PREFIX}click_attempts_total{{result="ok"}}'] == '1'
+    assert series[f'{PREFIX}click_attempts_total{{result="failed"}}'] == '2'
+    assert series[f'{PREFIX}webdriver_errors_total{{type="Weird \\"x\\"\\\\y\\nz"}}'] == '1'
+    assert series[f'{PREFIX}custom_total{{a="1",b="2"}}'] == '1'
+    assert series[f'{PREFIX}parse_seconds_bucket{{le="0.001"}}'] == '1'
+    assert series[f'{PREFIX}parse_seconds_bucket{{le="0.01"}}'] == '2'
+    assert series[f'{PREFIX}parse_seconds_bucket{{le="+Inf"}}'] == '3'
+    assert series[f'{PREFIX}parse_seconds_count'] == '3'
+    assert float(series[f'{PREFIX}parse_seconds_sum']) == round(0.5055, 6)
+    assert f'{PREFIX}last_success_age_seconds' not in series
+    # 每个指标的 TYPE 只出现一次，按指标名排序
+    names = [line.split()[2] for line in lines if line.startswith('# TYPE')]
+    assert len(names) == len(set(names)) and names == sorted(names)
+    assert text.endswith('\n')
@@ -0,0 +1,63 @@
+"""
+鲸介12306 抢票助手 - 下单流程状态机测试
+
+在内存版 FakeWebDriver 上先用快照模式抢到车次，再运行 OrderFlow：
+乘车人 → 票种 → 席别 → 提交订单 → 选座 → 最终确认都应完成，选座按偏好避开已售座位；
+订单页元素一直不出现时在对应步骤中止并返回 False。
+
+开源协议：MIT License
+"""
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / 'benchmarks'))
+
+from booking_core import book_by_time_range, select_seat_fast
+from fake_site import FakeSite
+from fake_webdriver import FakeWebDriver
+from order_flow import OrderFlow
+
+STEPS = ['passenger', 'ticket_type', 'seat_type', 'student_confirm', 'submit', 'confirm_dialog', 'seat', 'confirm']
+
+
+def _booked_driver(**kw):
+    site = FakeSite(rows=10, open_ratio=1.0, open_at=0.0, open_spread=0.0)
+    kw = dict(dict(rtt=0, render_delay=0.001, passenger_delay=0.01, confirm_delay=0.02), **kw)
+    driver = FakeWebDriver(site, **kw)
+    result = book_by_time_range(driver, '00:00', '23:59', max_attempts=2, refresh_interval=(0.001, 0.002))
+    assert result.row is not None and driver.page == 'order'
+    return driver
+
+
+def test_single_passenger_completes():
+    driver = _booked_driver(taken={'1A'})
+    flow = OrderFlow(driver, {'ticket_type': 'adult', 'seat_position_preference': 'window'},
+                     seat_selector=select_seat_fast, dialog_grace=0.01)
+    assert flow.run() is True
+    assert driver.order_done_at is not None
+    assert driver.selected_seats == ['1F']
+    assert [t.step for t in flow.timings] == STEPS
+    status = {t.step: t.status for t in flow.timings}
+    assert status['student_confirm'] == 'skipped' and status['seat_type'] == 'skipped'
+    assert status['seat'] == 'ok' and status['confirm'] == 'ok'
+    assert '下单耗时' in flow.report()
+
+
+def test_two_passengers_sit_together():
+    driver = _booked_driver(seat_type='一等座')
+    flow = OrderFlow(driver, {'ticket_type': 'adult', 'passenger_count': 2, 'seat_position_preference': 'aisle'},
+                     seat_selector=select_seat_fast, dialog_grace=0.01)
+    assert flow.run() is True
+    assert driver.passengers == 2
+    assert sorted(driver.selected_seats) == ['1A', '1C']
+
+
+def test_missing_confirm_dialog_stops_flow():
+    driver = _booked_driver(confirm_delay=10.0)
+    flow = OrderFlow(driver, {'ticket_type': 'adult'}, seat_selector=select_seat_fast, dialog_grace=0.01,
+                     step_timeout=0.1)
+    assert flow.run() is False
+    assert driver.order_done_at is None
+    assert flow.timings[-1].step == 'confirm_dialog' and flow.timings[-1].status == 'failed'
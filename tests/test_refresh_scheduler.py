@@ -0,0 +1,106 @@
+"""
+鲸介12306 抢票助手 - 刷新节奏调度测试
+
+用假时钟驱动 AdaptiveScheduler，验证密集 → 衰减 → 稳态三个阶段、失败退避序列，
+以及令牌桶在任意一分钟内不超过 max_per_minute 个请求。
+
+用法：
+    python -m pytest tests
+
+开源协议：MIT License
+"""
+import random
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from refresh_scheduler import AdaptiveScheduler, TokenBucket
+
+
+class FakeClock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+def make(clock, **kw):
+    kw.setdefault('max_per_minute', 10000)
+    kw.setdefault('bucket_capacity', 10000)
+    return AdaptiveScheduler(clock=clock, rng=random.Random(0), **kw)
+
+
+def test_burst_then_decay_then_steady():
+    clock = FakeClock()
+    s = make(clock, sale_start=clock.now, burst=(0.3, 0.6), burst_seconds=30, steady=(2, 4), decay_seconds=120)
+    assert s.base_interval(clock.now) == (0.3, 0.6)
+    assert s.base_interval(clock.now + 29.9) == (0.3, 0.6)
+    mid = s.base_interval(clock.now + 30 + 60)
+    assert mid == (0.3 + (2 - 0.3) * 0.5, 0.6 + (4 - 0.6) * 0.5)
+    assert s.base_interval(clock.now + 30 + 120) == (2, 4)
+    assert s.base_interval(clock.now + 3600) == (2, 4)
+
+    delays = []
+    for _ in range(400):
+        d = s.next_delay()
+        delays.append((clock.now - s.sale_start, d))
+        clock.advance(d)
+    burst = [d for t, d in delays if t < 30]
+    steady = [d for t, d in delays if t >= 150]
+    assert burst and all(0.3 <= d <= 0.6 for d in burst)
+    assert steady and all(2 <= d <= 4 for d in steady)
+
+
+def test_no_sale_start_uses_steady():
+    clock = FakeClock()
+    s = make(clock, steady=(2, 4))
+    assert all(2 <= s.next_delay() <= 4 for _ in range(50))
+
+
+def test_backoff_sequence_and_reset():
+    clock = FakeClock()
+    s = make(clock, steady=(2, 2), backoff_base=2.0, backoff_max=30.0)
+    seq = []
+    for _ in range(6):
+        s.record(False)
+        seq.append(s.next_delay())
+        clock.advance(seq[-1])
+    assert seq == [2, 4, 8, 16, 30, 30]
+    s.record(True)
+    assert s.next_delay() == 2
+
+
+def test_backoff_never_shortens_the_interval():
+    clock = FakeClock()
+    s = make(clock, steady=(5, 5), backoff_base=2.0)
+    s.record(False)
+    assert s.next_delay() == 5
+
+
+def test_bucket_capacity_counts_toward_per_minute_limit():
+    clock = FakeClock()
+    bucket = TokenBucket(per_minute=60, capacity=20, clock=clock)
+    times = [bucket.reserve(clock.now) for _ in range(200)]
+    # 开始时可以立即用掉桶里的 20 个令牌，但第一分钟总数仍不超过 60
+    assert times[:20] == [clock.now] * 20
+    assert sum(1 for t in times if t < clock.now + 60) == 60
+    for i in range(len(times) - 60):
+        assert times[i + 60] - times[i] >= 60 - 1e-9
+
+
+def test_scheduler_respects_per_minute_cap_during_burst():
+    clock = FakeClock()
+    s = AdaptiveScheduler(sale_start=clock.now, burst=(0.1, 0.1), burst_seconds=600, max_per_minute=60,
+                          bucket_capacity=20, clock=clock, rng=random.Random(0))
+    sent = []
+    for _ in range(150):
+        clock.advance(s.next_delay())
+        sent.append(clock.now)
+    for i in range(len(sent) - 60):
+        assert sent[i + 60] - sent[i] >= 60 - 1e-9
@@ -0,0 +1,147 @@
+"""
+鲸介12306 抢票助手 - 轮询行差分测试
+
+FakePage 按 booking_core 页面脚本的规则生成快照：同一缓存键下指纹未变的行只返回 train / fp / book。
+验证 RowDiffer 只重新解析变化的行、沿用未变化行的 TrainRow，缓存失配时换键并保留余票基线，
+以及车次消失再出现时分别报告 gone / appeared。
+
+开源协议：MIT License
+"""
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from train_table import RowDiffer
+
+NONE = ['无'] * 12
+
+
+def _seats(**cols):
+    seats = list(NONE)
+    for i, text in cols.items():
+        seats[int(i[1:])] = text
+    return seats
+
+
+class FakePage:
+    """页面端的车次表与按缓存键保存的行指纹"""
+
+    def __init__(self, rows):
+        self.rows = {r[0]: r for r in rows}  # train -> (train, depart, arrive, seats, bookable)
+        self._fps = {}
+
+    def set(self, train, seats, bookable=True):
+        _, depart, arrive, _, _ = self.rows[train]
+        self.rows[train] = (train, depart, arrive, seats, bookable)
+
+    def snapshot(self, key):
+        prev = self._fps.get(key, {})
+        nxt = {}
+        out = []
+        for train, depart, arrive, seats, bookable in self.rows.values():
+            book = f'btn-{train}' if bookable else None
+            fp = f"{train}|{'|'.join(seats)}|{1 if bookable else 0}"
+            nxt[train] = fp
+            if prev.get(train) == fp:
+                out.append({'train': train, 'fp': fp, 'book': book})
+            else:
+                out.append({'train': train, 'depart': depart, 'arrive': arrive, 'seats': list(seats), 'fp': fp,
+                            'book': book})
+        self._fps[key] = nxt
+        return out
+
+
+def _page():
+    return FakePage([('G1', '08:00', '10:00', _seats(c3='有'), True),
+                     ('G2', '09:00', '11:00', NONE, False),
+                     ('G3', '10:00', '12:00', _seats(c2='5'), True)])
+
+
+def _poll(differ, page, at):
+    return differ.update(page.snapshot(differ.key), at=at)
+
+
+def test_first_poll_is_baseline():
+    differ = RowDiffer()
+    table, diff = _poll(differ, _page(), 1.0)
+    assert [r.train for r in table.rows] == ['G1', 'G2', 'G3']
+    assert len(diff.changed) == 3 and diff.appeared == () and diff.gone == ()
+    assert differ.parsed == 3
+
+
+def test_unchanged_rows_come_back_short_and_are_reused():
+    page, differ = _page(), RowDiffer()
+    table1, _ = _poll(differ, page, 1.0)
+    snap = page.snapshot(differ.key)
+    assert all(set(s) == {'train', 'fp', 'book'} for s in snap)
+    table2, diff = differ.update(snap, at=2.0)
+    assert diff.changed == () and diff.appeared == () and diff.gone == ()
+    assert table2 is table1
+    assert table2.get('G1').avail[3] == 99 and table2.get('G3').avail[2] == 5
+    assert table2.get('G1').book == 'btn-G1'
+    assert (differ.parsed, differ.reused) == (3, 3)
+
+
+def test_changed_row_reports_new_seats():
+    page, differ = _page(), RowDiffer()
+    table1, _ = _poll(differ, page, 1.0)
+    g1 = table1.get('G1')
+    page.set('G2', _seats(c3='3', c2='有'))
+    table2, diff = _poll(differ, page, 2.0)
+    assert [r.train for r in diff.changed] == ['G2']
+    assert len(diff.appeared) == 1
+    appeared = diff.appeared[0]
+    assert (appeared.train, appeared.depart, appeared.seats) == ('G2', '09:00', ('一等座', '二等座'))
+    assert table2.get('G2').bookable and table2.get('G2').avail[3] == 3
+    assert table2.get('G1') is g1
+    assert diff.at == 2.0
+
+
+def test_sold_out_row_is_gone():
+    page, differ = _page(), RowDiffer()
+    _poll(differ, page, 1.0)
+    page.set('G3', NONE, bookable=False)
+    _, diff = _poll(differ, page, 2.0)
+    assert diff.gone == ('G3',) and diff.appeared == ()
+
+
+def test_cache_key_reset_keeps_baseline():
+    page, differ = _page(), RowDiffer()
+    _poll(differ, page, 1.0)
+    # 页面端仍按旧键认为行未变化，本地缓存却已丢失（例如换了 RowDiffer 的解析缓存）
+    snap = page.snapshot(differ.key)
+    differ._rows = {}
+    old_key = differ.key
+    table, diff = differ.update(snap, at=2.0)
+    assert differ.key != old_key
+    assert len(table) == 0 and diff.changed == () and diff.gone == () and diff.appeared == ()
+    # 新键下页面返回完整行：余票与基线相同，不报告变化
+    table, diff = _poll(differ, page, 3.0)
+    assert [r.train for r in table.rows] == ['G1', 'G2', 'G3']
+    assert diff.appeared == () and diff.gone == ()
+    page.set('G2', _seats(c3='有'))
+    _, diff = _poll(differ, page, 4.0)
+    assert [a.train for a in diff.appeared] == ['G2']
+
+
+def test_row_disappears_and_comes_back():
+    page, differ = _page(), RowDiffer()
+    _poll(differ, page, 1.0)
+    g3 = page.rows.pop('G3')
+    table, diff = _poll(differ, page, 2.0)
+    assert diff.gone == ('G3',) and table.get('G3') is None
+    page.rows['G3'] = g3
+    table, diff = _poll(differ, page, 3.0)
+    assert [a.train for a in diff.appeared] == ['G3'] and diff.appeared[0].seats == ('一等座',)
+    assert table.get('G3').avail[2] == 5
+
+
+def test_empty_snapshot_keeps_baseline():
+    page, differ = _page(), RowDiffer()
+    _poll(differ, page, 1.0)
+    _, diff = differ.update([], at=2.0)
+    assert diff == (2.0, (), (), ())
+    _, diff = _poll(differ, page, 3.0)
+    assert diff.appeared == () and diff.gone == ()
@@ -0,0 +1,93 @@
+"""
+鲸介12306 抢票助手 - 在线选座测试
+
+按表格逐项验证 layout_for 对订单页席别文本与面板字母的识别，
+以及 choose_seats 在各布局、各偏好、已售座位、乘车人多于每排座位数时挑出的座位。
+
+开源协议：MIT License
+"""
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from seat_map import SEAT_LAYOUTS, choose_seats, layout_for, parse_panel
+
+
+def _panel(layout, rows=2, taken=()):
+    letters = [letter for letter in SEAT_LAYOUTS[layout] if letter != '|']
+    return parse_panel([[f'{r}{letter}', False, f'{r}{letter}' in taken]
+                        for r in range(1, rows + 1) for letter in letters])
+
+
+@pytest.mark.parametrize('seat_type, letters, expected', [
+    ('二等座（¥150.0）', 'ACDF', '二等座'),
+    ('一等座（¥240.0）', 'ABCDF', '一等座'),
+    ('商务座（¥480.0）', 'ACF', '商务座'),
+    ('特等座（¥480.0）', 'ACF', '商务座'),
+    ('优选一等座（¥300.0）', 'ACDF', '一等座'),
+    # 无法识别的席别按面板字母推断
+    ('', 'ABCDF', '二等座'),
+    ('硬座（¥80.0）', 'ACDF', '一等座'),
+    (None, 'ACF', '商务座'),
+    ('未知席别', '', '商务座'),
+])
+def test_layout_for(seat_type, letters, expected):
+    assert layout_for(seat_type, letters) == expected
+
+
+@pytest.mark.parametrize('layout, count, preference, expected', [
+    ('二等座', 1, 'first', ['1A']),
+    ('二等座', 1, 'window', ['1A']),
+    ('二等座', 1, 'aisle', ['1C']),
+    ('二等座', 2, 'window', ['1A', '1B']),
+    ('二等座', 2, 'aisle', ['1C', '1B']),
+    ('二等座', 3, 'window', ['1A', '1B', '1C']),
+    ('一等座', 1, 'window', ['1A']),
+    ('一等座', 1, 'aisle', ['1C']),
+    ('一等座', 2, 'window', ['1A', '1C']),
+    ('商务座', 1, 'aisle', ['1C']),
+    ('商务座', 2, 'window', ['1F', '1C']),
+    # 同一排凑不出相邻座位时，过道两侧也算相邻
+    ('二等座', 4, 'window', ['1A', '1B', '1C', '1D']),
+    ('一等座', 3, 'aisle', ['1C', '1D', '1A']),
+])
+def test_choose_seats_by_layout(layout, count, preference, expected):
+    assert choose_seats(_panel(layout), count, preference, layout) == expected
+
+
+@pytest.mark.parametrize('layout, taken, count, preference, expected', [
+    # 第一排靠窗已售，单人换到第一排另一侧靠窗
+    ('二等座', {'1A'}, 1, 'window', ['1F']),
+    # 第一排 A B 已售：第二排的 A B 比第一排的 D F 更符合偏好（只有一个过道座位）
+    ('二等座', {'1A', '1B'}, 2, 'window', ['2A', '2B']),
+    # 两个过道座位隔着过道，不如同侧的 C A
+    ('一等座', {'1A', '1C', '1D', '1F'}, 2, 'aisle', ['2C', '2A']),
+    ('商务座', {'1A', '1C', '1F', '2C'}, 1, 'aisle', ['2A']),
+    ('商务座', {'1A', '1C', '1F', '2A', '2C', '2F'}, 1, 'first', []),
+])
+def test_choose_seats_skips_taken(layout, taken, count, preference, expected):
+    assert choose_seats(_panel(layout, taken=taken), count, preference, layout) == expected
+
+
+@pytest.mark.parametrize('layout, rows, count, expected', [
+    # 乘车人多于每排座位数：逐个按偏好挑选
+    ('商务座', 2, 4, ['1A', '1F', '2A', '2F']),
+    ('一等座', 1, 5, ['1A', '1F', '1C', '1D']),
+    ('二等座', 1, 6, ['1A', '1F', '1B', '1C', '1D']),
+])
+def test_more_passengers_than_a_row(layout, rows, count, expected):
+    assert choose_seats(_panel(layout, rows=rows), count, 'window', layout) == expected
+
+
+def test_unknown_letters_and_preference():
+    rows = parse_panel([['1A', False, False], ['1E', False, False], ['3C', True, False], ['bad', False, False]])
+    assert sorted(rows) == [1, 3]
+    # 布局中没有的字母按中间位置计（排在过道座位之前），未知偏好按 first 处理
+    assert choose_seats(rows, 2, 'window', '二等座') == ['1A', '1E']
+    assert choose_seats(rows, 3, 'aisle', '二等座') == ['3C', '1E', '1A']
+    assert choose_seats(rows, 1, 'nonsense', '二等座') == ['1A']
+    assert choose_seats(rows, 0, 'window', '二等座') == ['1A']
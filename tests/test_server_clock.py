@@ -0,0 +1,41 @@
+"""
+鲸介12306 抢票助手 - 服务器时钟同步测试
+
+estimate_offset 用构造的样本验证区间交集收敛到往返时间量级；
+sync_server_clock 对 Date 头偏离本机 -2345ms 的本地模拟站点同步，误差应在估计的不确定度之内。
+
+开源协议：MIT License
+"""
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / 'benchmarks'))
+
+from fake_site import FakeSite, FakeSiteServer
+from server_clock import ClockSample, estimate_offset, sync_server_clock
+
+
+def _sample(offset, t_send, rtt):
+    """服务器在往返中点处理请求，Date 取整到秒"""
+    server_ts = t_send + rtt / 2 + offset
+    return ClockSample(t_send, t_send + rtt, float(int(server_ts)))
+
+
+def test_interval_intersection_narrows_to_rtt():
+    offset = -2.345
+    samples = [_sample(offset, 1000 + i * 0.137, 0.001) for i in range(8)]
+    # 对准估计的整秒边界两侧各一个样本
+    samples += [_sample(offset, 1003.344, 0.001), _sample(offset, 1004.346, 0.001)]
+    est, unc = estimate_offset(samples)
+    assert abs(est - offset) <= unc <= 0.005
+
+
+def test_sync_against_skewed_server():
+    skew = -2.345
+    with FakeSiteServer(FakeSite(rows=5), clock_skew=skew) as server:
+        clock = sync_server_clock(server.base_url + '/otn/')
+    assert clock.samples > 0
+    assert clock.uncertainty < 0.01
+    assert abs(clock.offset - skew) <= clock.uncertainty + 0.001
@@ -0,0 +1,74 @@
+"""
+鲸介12306 抢票助手 - 本地车站字典测试
+
+用随程序附带的 station_names.txt 验证 StationIndex.resolve：站名、电报码、全拼、简拼精确且唯一时解析，
+只是前缀或同时对应多个车站（如简拼 sz 对应深圳、苏州）时返回 None 交给下拉联想；
+lookup 按前缀列出候选，以及 station_name.js 的解析。
+
+开源协议：MIT License
+"""
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from station_index import DEFAULT_STATION_FILE, StationIndex, load_index, parse_station_js
+
+
+@pytest.fixture(scope='module')
+def index():
+    idx = load_index(DEFAULT_STATION_FILE)
+    assert len(idx) > 0
+    return idx
+
+
+@pytest.mark.parametrize('text, code', [
+    # 站名精确匹配，即使它同时是其他站名的前缀
+    ('广州', 'GZQ'),
+    ('广州南', 'IZQ'),
+    (' 深圳北 ', 'IOQ'),
+    # 电报码
+    ('IZQ', 'IZQ'),
+    ('SHH', 'SHH'),
+    # 全拼 / 简拼精确且唯一，不区分大小写
+    ('guangzhounan', 'IZQ'),
+    ('ShenzhenBei', 'IOQ'),
+    ('gzn', 'IZQ'),
+    ('Szb', 'IOQ'),
+])
+def test_resolve_exact(index, text, code):
+    assert index.resolve(text).code == code
+
+
+@pytest.mark.parametrize('text', [
+    # 只是前缀
+    'guangzhoun', 'gz n', 'shenzhenb', 'beijin',
+    # 简拼同时对应多个车站
+    'sz', 'hk', 'sy',
+    # 三个大写字母只按电报码查找
+    'SZB',
+    # 不存在
+    '广州南站', 'XXX', '', '   ',
+])
+def test_resolve_returns_none(index, text):
+    assert index.resolve(text) is None
+
+
+def test_ambiguous_abbr_lists_all_candidates(index):
+    assert {s.name for s in index.lookup('sz')} >= {'深圳', '苏州', '深圳北'}
+    assert [s.name for s in index.lookup('gz')] == ['广州', '广州东', '广州南']
+    assert [s.name for s in index.lookup('广州')] == ['广州', '广州东', '广州南']
+    assert len(index.lookup('b', limit=3)) == 3
+    assert index.lookup('  ') == []
+
+
+def test_parse_station_js():
+    text = "var station_names ='@bjb|北京北|VAP|beijingbei|bjb|0@gzn|广州南|IZQ|GuangZhouNan|gzn|1@dup|重复|VAP|x|x|2@bad|缺|'"
+    stations = parse_station_js(text)
+    assert [(s.name, s.code, s.pinyin, s.abbr) for s in stations] == [
+        ('北京北', 'VAP', 'beijingbei', 'bjb'), ('广州南', 'IZQ', 'guangzhounan', 'gzn')]
+    idx = StationIndex(stations)
+    assert idx.resolve('gzn').name == '广州南' and idx.resolve('北京北').code == 'VAP'
@@ -0,0 +1,155 @@
+"""
+鲸介12306 抢票助手 - 车次表、席别解析与抢票策略测试
+
+seat_count / parse_seat_classes 对单元格文本与席别名称的解析、12 个席别列的顺序，
+compile_target / compile_strategy 构建的策略，以及时间范围、指定车次、多目标优先级三种策略的选择与并列时的先后。
+booking 循环收到已编译的策略时直接使用，不再按原始参数重新编译。
+
+开源协议：MIT License
+"""
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / 'benchmarks'))
+
+from booking_core import book_by_time_range, book_by_train_number
+from fake_site import FakeSite
+from fake_webdriver import FakeWebDriver
+from ticket_query import SEAT_FIELD_INDEX
+from train_table import (SEAT_CLASSES, SEAT_PLENTY, PriorityStrategy, TimeRangeStrategy, TrainNumberStrategy,
+                         TrainRow, TrainTable, compile_strategy, compile_target, parse_seat_classes, seat_count)
+
+
+def _row(train, depart, bookable=True, **cols):
+    seats = ['无'] * 12
+    for name, text in cols.items():
+        seats[SEAT_CLASSES.index(name)] = text
+    return TrainRow(train, depart, '23:00', tuple(seats), f'btn-{train}' if bookable else None)
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('有', SEAT_PLENTY), ('12', 12), ('1', 1), ('0', 0),
+    ('无', 0), ('--', 0), ('*', 0), ('候补', 0), ('', 0), (' 5', 0),
+])
+def test_seat_count(text, expected):
+    assert seat_count(text) == expected
+
+
+def test_seat_class_columns():
+    assert SEAT_CLASSES == ('商务座', '优选一等座', '一等座', '二等座', '高级软卧', '软卧', '动卧', '硬卧', '软座',
+                            '硬座', '无座', '其他')
+    assert len(SEAT_FIELD_INDEX) == len(SEAT_CLASSES)
+    row = TrainRow('G1', '08:00', '10:00', tuple(str(i + 1) for i in range(12)), 'btn')
+    for i, name in enumerate(SEAT_CLASSES):
+        assert row.first_available(((name, i),)) == name
+        assert row.avail[i] == i + 1
+
+
+@pytest.mark.parametrize('names, expected', [
+    ('二等座/一等座', (('二等座', 3), ('一等座', 2))),
+    ('一等, 二等、商务', (('一等座', 2), ('二等座', 3), ('商务座', 0))),
+    (['特等座', '商务座', '硬卧'], (('商务座', 0), ('硬卧', 7))),
+    ('不限', ()),
+    ('', ()),
+    ((), ()),
+])
+def test_parse_seat_classes(names, expected):
+    assert parse_seat_classes(names) == expected
+
+
+def test_unknown_seat_class():
+    with pytest.raises(ValueError):
+        parse_seat_classes('二等座/站票')
+
+
+def test_time_range_picks_earliest_with_seats():
+    table = TrainTable([
+        _row('G5', '09:30', 二等座='有'),
+        _row('G3', '08:10', bookable=False, 二等座='有'),
+        _row('G4', '08:40', 二等座='--', 一等座='3'),
+        _row('G2', '07:59', 二等座='有'),
+        _row('G6', '09:00', 二等座='1'),
+    ])
+    assert TimeRangeStrategy('08:00', '10:00').pick(table).train == 'G4'
+    strategy = TimeRangeStrategy('08:00', '10:00', '二等座')
+    assert strategy.pick(table).train == 'G6'
+    assert strategy.seat_for(table.get('G6')) == '二等座'
+    assert TimeRangeStrategy('08:00', '10:00', '商务座').pick(table) is None
+    with pytest.raises(ValueError):
+        TimeRangeStrategy('8:00', '10:00')
+
+
+def test_train_number_follows_target_order():
+    table = TrainTable([
+        _row('G1', '07:00', 二等座='有'),
+        _row('G2', '08:00', 一等座='2'),
+        _row('G3', '09:00', bookable=False, 二等座='有'),
+    ])
+    assert TrainNumberStrategy('g3/g2 g1').pick(table).train == 'G2'
+    strategy = TrainNumberStrategy('G3/G2/G1', '二等座')
+    assert strategy.targets == ('G3', 'G2', 'G1')
+    assert strategy.pick(table).train == 'G1'
+    assert TrainNumberStrategy(['G9']).pick(table) is None
+    with pytest.raises(ValueError):
+        TrainNumberStrategy(' / ')
+
+
+def test_priority_tie_breaks():
+    table = TrainTable([
+        _row('G1', '07:00', 二等座='有', 一等座='有'),
+        _row('G2', '08:00', 二等座='5'),
+        _row('G7', '08:30', 一等座='1'),
+    ])
+    # 两个目标都能命中时取排在前面的目标，而不是更早出发的车次
+    strategy = PriorityStrategy([compile_target({'train': 'G2'}), compile_target({'start': '06:00', 'end': '09:00'})])
+    assert strategy.pick(table).train == 'G2'
+    # 同一行被多个目标选中时，席别取第一个选中它的目标
+    strategy = PriorityStrategy([compile_target({'train': 'G1', 'seats': '一等座'}),
+                                 compile_target({'start': '06:00', 'end': '07:30'}, '二等座')])
+    row = strategy.pick(table)
+    assert row.train == 'G1' and strategy.seat_for(row) == '一等座'
+    assert strategy.seat_classes == (('一等座', 2), ('二等座', 3))
+    # 前面的目标无票时落到后面的目标
+    strategy = PriorityStrategy([compile_target({'train': 'G2', 'seats': '商务座'}),
+                                 compile_target({'start': '08:00', 'end': '09:00', 'seats': '一等座'})])
+    row = strategy.pick(table)
+    assert row.train == 'G7' and strategy.seat_for(row) == '一等座'
+    with pytest.raises(ValueError):
+        PriorityStrategy([])
+
+
+def test_compile_target_and_strategy():
+    t = compile_target({'train': 'G1/G2'}, '二等座')
+    assert isinstance(t, TrainNumberStrategy) and t.targets == ('G1', 'G2') and t.seat_classes == (('二等座', 3),)
+    t = compile_target({'seats': '一等座'}, '二等座')
+    assert isinstance(t, TimeRangeStrategy) and (t.start, t.end) == ('00:00', '23:59')
+    assert t.seat_classes == (('一等座', 2),)
+
+    base = {'depart_time_range': {'start': '07:00', 'end': '09:00'}, 'seat_category': '二等座'}
+    s = compile_strategy(base)
+    assert isinstance(s, TimeRangeStrategy) and s.describe() == '时间范围 [07:00 - 09:00] 席别 [二等座]'
+    s = compile_strategy(dict(base, target_train_number=' g1/G2 '))
+    assert isinstance(s, TrainNumberStrategy) and s.targets == ('G1', 'G2')
+    s = compile_strategy(dict(base, booking_targets=[{'train': 'G1'}, {'start': '10:00', 'end': '11:00'}]))
+    assert isinstance(s, PriorityStrategy) and [type(t) for t in s.targets] == [TrainNumberStrategy,
+                                                                                 TimeRangeStrategy]
+    assert all(t.seat_classes == (('二等座', 3),) for t in s.targets)
+
+
+def test_booking_uses_compiled_strategy():
+    site = FakeSite(rows=10, open_ratio=1.0, open_at=0.0, open_spread=0.0)
+    target = site.trains[3].train
+    # 位置参数留空：只有传入的策略决定选哪一行
+    for book, args, strategy in [
+        (book_by_time_range, (None, None), TimeRangeStrategy(site.trains[3].depart, '23:59', '二等座')),
+        (book_by_train_number, (None,), TrainNumberStrategy([target], '二等座')),
+    ]:
+        driver = FakeWebDriver(site, rtt=0, render_delay=0.001)
+        result = book(driver, *args, max_attempts=2, refresh_interval=(0.001, 0.002), strategy=strategy)
+        assert result.row is not None and result.seat == '二等座'
+        assert driver.booked_train == result.row.train
+        assert strategy.pick(TrainTable([result.row])) is result.row
@@ -0,0 +1,138 @@
+"""
+鲸介12306 抢票助手 - 余票接口直连查询
+
+复用已登录浏览器的 Cookie，通过长连接池直接请求余票查询接口，
+把 | 分隔的结果记录解析成与页面快照相同结构的数据，浏览器只在下单时使用。
+
+开源协议：MIT License
+"""
+import json
+import time
+from urllib.parse import urlencode
+
+import urllib3
+
+DEFAULT_BASE_URL = 'https://kyfw.12306.cn'
+DEFAULT_QUERY_PATH = 'otn/leftTicket/queryG'
+
+# 页面 queryLeftTable 各席别列顺序，对应结果记录中的字段下标（None 表示接口无此字段）
+# 商务座/特等座, 优选一等座, 一等座, 二等座, 高级软卧, 软卧, 动卧, 硬卧, 软座, 硬座, 无座, 其他
+SEAT_FIELD_INDEX = (32, None, 31, 30, 21, 23, 33, 28, 24, 29, 26, 22)
+_TZ_INDEX = 25
+
+
+class QueryError(Exception):
+    """余票接口返回异常"""
+
+
+def parse_result_record(record):
+    """解析一条 | 分隔的余票记录，返回与 booking_core.snapshot_rows 相同结构的 dict
+
+    可预订时 book 为 secretStr（真值），否则为 None。
+    """
+    f = record.split('|')
+    if len(f) < 34:
+        return None
+    seats = []
+    for i, idx in enumerate(SEAT_FIELD_INDEX):
+        v = f[idx] if idx is not None else ''
+        if i == 0 and not v:
+            v = f[_TZ_INDEX]
+        seats.append(v or '--')
+    bookable = f[11] == 'Y' and '预订' in f[1]
+    return {
+        'train': f[3].upper(),
+        'depart': f[8] or None,
+        'arrive': f[9] or None,
+        'seats': seats,
+        'book': (f[0] or f[3]) if bookable else None,
+        'from_code': f[6],
+        'to_code': f[7],
+    }
+
+
+def cookie_header_from_driver(driver):
+    """把浏览器 Cookie 拼成请求头"""
+    return '; '.join(f"{c['name']}={c['value']}" for c in driver.get_cookies())
+
+
+def station_codes_from_page(driver):
+    """读取购票页隐藏字段中的出发/到达站电报码"""
+    return driver.execute_script(
+        "var f = document.getElementById('fromStation'), t = document.getElementById('toStation');"
+        "return [f ? f.value : '', t ? t.value : ''];"
+    )
+
+
+class TicketQueryEngine:
+    """基于长连接池的余票查询"""
+
+    def __init__(self, cookie_header='', user_agent=None, base_url=DEFAULT_BASE_URL,
+                 query_path=DEFAULT_QUERY_PATH, timeout=3.0, maxsize=4):
+        self.base_url = base_url.rstrip('/')
+        self.query_path = query_path.strip('/')
+        self.timeout = urllib3.Timeout(connect=timeout, read=timeout)
+        self.headers = {
+            'Accept': 'application/json, text/javascript, */*; q=0.01',
+            'X-Requested-With': 'XMLHttpRequest',
+            'Referer': f'{self.base_url}/otn/leftTicket/init',
+            'Connection': 'keep-alive',
+        }
+        if cookie_header:
+            self.headers['Cookie'] = cookie_header
+        if user_agent:
+            self.headers['User-Agent'] = user_agent
+        self.pool = urllib3.PoolManager(num_pools=2, maxsize=maxsize, retries=False)
+
+    @classmethod
+    def from_driver(cls, driver, **kwargs):
+        """用 setup_browser_and_login 返回的浏览器会话构建查询引擎"""
+        kwargs.setdefault('user_agent', driver.execute_script('return navigator.userAgent;'))
+        return cls(cookie_header_from_driver(driver), **kwargs)
+
+    def query_url(self, travel_date, from_code, to_code, purpose='ADULT'):
+        qs = urlencode([
+            ('leftTicketDTO.train_date', travel_date),
+            ('leftTicketDTO.from_station', from_code),
+            ('leftTicketDTO.to_station', to_code),
+            ('purpose_codes', purpose),
+        ])
+        return f'{self.base_url}/{self.query_path}?{qs}'
+
+    def fetch(self, travel_date, from_code, to_code, purpose='ADULT', _redirected=False):
+        """请求一次余票接口，返回原始 JSON"""
+        resp = self.pool.request('GET', self.query_url(travel_date, from_code, to_code, purpose),
+                                 headers=self.headers, timeout=self.timeout)
+        if resp.status != 200:
+            raise QueryError(f'余票接口 HTTP {resp.status}')
+        try:
+            data = json.loads(resp.data.decode('utf-8'))
+        except ValueError:
+            raise QueryError('余票接口返回非 JSON（可能登录已失效或被限流）')
+        # 接口地址变更时服务端会在 c_url 中给出新路径
+        if not data.get('status') and data.get('c_url') and not _redirected:
+            self.query_path = data['c_url'].strip('/')
+            if not self.query_path.startswith('otn/'):
+                self.query_path = 'otn/' + self.query_path
+            return self.fetch(travel_date, from_code, to_code, purpose, _redirected=True)
+        return data
+
+    def query(self, travel_date, from_code, to_code, purpose='ADULT'):
+        """查询并解析为快照行列表"""
+        data = self.fetch(travel_date, from_code, to_code, purpose)
+        payload = data.get('data') or {}
+        rows = []
+        for rec in payload.get('result') or ():
+            row = parse_result_record(rec)
+            if row is not None:
+                rows.append(row)
+        return rows
+
+    def ping(self):
+        """向站点根路径发一次 HEAD 请求，提前建立长连接（DNS、TCP、TLS），返回耗时 ms"""
+        t0 = time.perf_counter()
+        self.pool.request('HEAD', f'{self.base_url}/otn/', headers=self.headers, timeout=self.timeout)
+        return (time.perf_counter() - t0) * 1000
+
+    def close(self):
+        self.pool.clear()
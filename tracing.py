@@ -0,0 +1,151 @@
+"""
+鲸介12306 抢票助手 - 抢票阶段耗时追踪
+
+在抢票流程各阶段记录 span（单调时钟，纳秒精度），运行中只往内存列表追加元组，
+结束时一次性以 JSONL 追加写入追踪文件，开销可忽略，可常开。
+
+查看多次运行的各阶段 p50 / p95 / max：
+    python tracing.py report booking_trace.jsonl [更多文件...]
+
+开源协议：MIT License
+"""
+import json
+import math
+import os
+import sys
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import datetime
+
+DEFAULT_TRACE_FILE = 'booking_trace.jsonl'
+
+
+class Tracer:
+    """一次抢票运行的追踪器"""
+
+    def __init__(self, path=DEFAULT_TRACE_FILE, run_id=None, flush_every=512):
+        self.path = path
+        self.run_id = run_id or f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{os.getpid()}"
+        self.flush_every = flush_every
+        self._t0 = time.perf_counter_ns()
+        self._buf = []
+
+    @contextmanager
+    def span(self, stage, **attrs):
+        start = time.perf_counter_ns()
+        try:
+            yield attrs
+        except BaseException as e:
+            attrs['error'] = type(e).__name__
+            raise
+        finally:
+            self._buf.append((stage, start, time.perf_counter_ns(), attrs))
+            if len(self._buf) >= self.flush_every:
+                self.flush()
+
+    def record(self, stage, dur_ms, **attrs):
+        """记录一段已在别处测得的耗时（如下单状态机的步骤耗时）"""
+        end = time.perf_counter_ns()
+        self._buf.append((stage, end - int(dur_ms * 1e6), end, attrs))
+
+    def flush(self):
+        if not self._buf:
+            return
+        buf, self._buf = self._buf, []
+        with open(self.path, 'a', encoding='utf-8') as f:
+            for stage, start, end, attrs in buf:
+                rec = {'run': self.run_id, 'stage': stage,
+                       'start_ms': round((start - self._t0) / 1e6, 3),
+                       'dur_ms': round((end - start) / 1e6, 3)}
+                if attrs:
+                    rec['attrs'] = attrs
+                f.write(json.dumps(rec, ensure_ascii=False) + '\n')
+
+    def close(self):
+        try:
+            self.flush()
+        except OSError as e:
+            print(f'写入追踪文件失败: {e}')
+
+
+class NullTracer:
+    """关闭追踪时使用，所有操作为空"""
+    run_id = None
+
+    @contextmanager
+    def span(self, stage, **attrs):
+        yield attrs
+
+    def record(self, stage, dur_ms, **attrs):
+        pass
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+
+NULL_TRACER = NullTracer()
+
+
+def make_tracer(params, tag=None):
+    """trace_file 为空字符串时关闭追踪；tag 附加在运行 ID 后，用于区分并行窗口"""
+    path = params.get('trace_file', DEFAULT_TRACE_FILE)
+    if not path:
+        return NULL_TRACER
+    tracer = Tracer(path)
+    if tag:
+        tracer.run_id = f'{tracer.run_id}-{tag}'
+    return tracer
+
+
+def _percentile(sorted_values, p):
+    """最近秩百分位"""
+    if not sorted_values:
+        return 0.0
+    k = max(0, min(len(sorted_values) - 1, math.ceil(p / 100 * len(sorted_values)) - 1))
+    return sorted_values[k]
+
+
+def load_stage_durations(paths):
+    """读取追踪文件，返回 ({阶段: [耗时ms...]}（按首次出现顺序）, 运行数)"""
+    stages = OrderedDict()
+    runs = set()
+    for path in paths:
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                rec = json.loads(line)
+                runs.add(rec.get('run'))
+                stages.setdefault(rec['stage'], []).append(rec['dur_ms'])
+    return stages, len(runs)
+
+
+def report(paths):
+    stages, runs = load_stage_durations(paths)
+    if not stages:
+        print('追踪文件中没有记录')
+        return
+    print(f'共 {runs} 次运行')
+    print(f"{'阶段':<14}{'次数':>8}{'p50 ms':>12}{'p95 ms':>12}{'max ms':>12}")
+    for stage, values in stages.items():
+        values.sort()
+        print(f'{stage:<14}{len(values):>8}{_percentile(values, 50):>12.1f}'
+              f'{_percentile(values, 95):>12.1f}{values[-1]:>12.1f}')
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if len(argv) < 2 or argv[0] != 'report':
+        print('用法: python tracing.py report <trace.jsonl> [...]')
+        return 2
+    report(argv[1:])
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,363 @@
+"""
+鲸介12306 抢票助手 - 车次表与匹配策略
+
+把一次查询结果整理成带索引的内存表，抢票策略在构建时预先编译，
+每轮轮询只做字典查找 / 二分查找，不再重复解析时间字符串。
+每行的席别列在构建时解析为余票数，策略只选中所需席别确有余票的车次。
+轮询时 RowDiffer 按行指纹只重新解析变化的行，并给出每轮新出现余票的车次与时刻。
+
+开源协议：MIT License
+"""
+import itertools
+import re
+import time
+from bisect import bisect_left
+from collections import namedtuple
+
+_TRAIN_SPLIT_RE = re.compile(r'[\s/,，、|]+')
+
+# 查询结果表席别列顺序（与 ticket_query.SEAT_FIELD_INDEX 一致）
+SEAT_CLASSES = ('商务座', '优选一等座', '一等座', '二等座', '高级软卧', '软卧', '动卧', '硬卧', '软座', '硬座', '无座', '其他')
+_SEAT_ALIASES = {'特等座': 0, '商务': 0, '特等': 0, '一等': 2, '二等': 3, '高软': 4}
+SEAT_INDEX = {**{name: i for i, name in enumerate(SEAT_CLASSES)}, **_SEAT_ALIASES}
+# 页面只显示“有”（余票充足）时记为的张数
+SEAT_PLENTY = 99
+
+
+def hhmm_to_minutes(hhmm):
+    """将 HH:MM 转为分钟数，格式不合法返回 None"""
+    if not hhmm or len(hhmm) != 5 or hhmm[2] != ':':
+        return None
+    try:
+        h, m = int(hhmm[:2]), int(hhmm[3:])
+    except ValueError:
+        return None
+    if not (0 <= h < 24 and 0 <= m < 60):
+        return None
+    return h * 60 + m
+
+
+def seat_count(text):
+    """席别单元格文本转余票数：'有' 为 SEAT_PLENTY，数字为张数，'无' / '--' / '候补' / '*' 等为 0"""
+    if text == '有':
+        return SEAT_PLENTY
+    return int(text) if text.isdigit() else 0
+
+
+def parse_seat_classes(names):
+    """把 '二等座/一等座' 或名称列表解析为 (席别名, 列下标) 元组（保持优先顺序），'不限' 表示不限席别
+
+    未知席别抛出 ValueError。
+    """
+    if isinstance(names, str):
+        names = _TRAIN_SPLIT_RE.split(names.strip())
+    out = []
+    for name in names:
+        if not name or name == '不限':
+            continue
+        if name not in SEAT_INDEX:
+            raise ValueError(f'未知席别: {name}')
+        i = SEAT_INDEX[name]
+        if all(i != j for _, j in out):
+            out.append((SEAT_CLASSES[i], i))
+    return tuple(out)
+
+
+def parse_train_numbers(text):
+    """把 'G1234/G1236' 之类的输入拆成去重后的车次元组（保持顺序）"""
+    out = []
+    for t in _TRAIN_SPLIT_RE.split((text or '').strip().upper()):
+        if t and t not in out:
+            out.append(t)
+    return tuple(out)
+
+
+class TrainRow:
+    """查询结果中的一行"""
+    __slots__ = ('train', 'depart', 'arrive', 'depart_min', 'arrive_min', 'seats', 'avail', 'book')
+
+    def __init__(self, train, depart, arrive, seats=(), book=None):
+        self.train = train
+        self.depart = depart
+        self.arrive = arrive
+        self.depart_min = hhmm_to_minutes(depart)
+        self.arrive_min = hhmm_to_minutes(arrive)
+        self.seats = seats
+        self.avail = tuple(seat_count(s) for s in seats)
+        self.book = book
+
+    @property
+    def bookable(self):
+        return self.book is not None
+
+    def first_available(self, seat_classes):
+        """seat_classes 中第一个有余票的席别名；未限定席别时返回 ''，都无票返回 None"""
+        if not seat_classes:
+            return ''
+        avail = self.avail
+        for name, i in seat_classes:
+            if i < len(avail) and avail[i] > 0:
+                return name
+        return None
+
+    def __repr__(self):
+        return f'TrainRow({self.train!r}, {self.depart!r}, bookable={self.bookable})'
+
+
+class TrainTable:
+    """按车次建字典索引、按出发时刻排序的车次表"""
+    __slots__ = ('rows', 'by_train', '_by_depart', '_depart_keys')
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.by_train = {}
+        for r in rows:
+            if r.train and r.train not in self.by_train:
+                self.by_train[r.train] = r
+        self._by_depart = sorted((r for r in rows if r.depart_min is not None), key=lambda r: r.depart_min)
+        self._depart_keys = [r.depart_min for r in self._by_depart]
+
+    @classmethod
+    def from_snapshot(cls, snapshot):
+        """由 booking_core.snapshot_rows 的返回值构建"""
+        return cls([
+            TrainRow(s.get('train') or '', s.get('depart'), s.get('arrive'),
+                     tuple(s.get('seats') or ()), s.get('book'))
+            for s in snapshot or ()
+        ])
+
+    def __len__(self):
+        return len(self.rows)
+
+    def get(self, train):
+        return self.by_train.get(train)
+
+    def depart_times(self):
+        return [r.depart for r in self._by_depart]
+
+    def departing_between(self, start_min, end_min):
+        """按出发时刻升序迭代 [start_min, end_min] 内的车次"""
+        rows = self._by_depart
+        i = bisect_left(self._depart_keys, start_min)
+        while i < len(rows) and rows[i].depart_min <= end_min:
+            yield rows[i]
+            i += 1
+
+
+# 一轮轮询相对上一轮的变化：at 为读取时刻（time.time()），changed 为重新解析的行，
+# appeared 为新出现余票的车次（Appeared），gone 为不再可预订或已从结果表中消失的车次号
+PollDiff = namedtuple('PollDiff', 'at changed appeared gone')
+Appeared = namedtuple('Appeared', 'train depart seats')
+
+_differ_ids = itertools.count(1)
+
+
+def _newly_available(old, row):
+    """row 相对 old 新出现余票的席别名"""
+    if not row.bookable:
+        return ()
+    was = old.avail if old is not None and old.bookable else ()
+    return tuple(SEAT_CLASSES[i] for i, n in enumerate(row.avail)
+                 if n > 0 and (i >= len(was) or was[i] == 0))
+
+
+class RowDiffer:
+    """跨轮询复用行解析结果
+
+    行指纹为 车次 + 各席别列文本 + 是否可预订，指纹未变的行沿用上一轮的 TrainRow（只更新预订按钮），
+    只有指纹变化的行才重新解析。key 传给 booking_core.snapshot_rows，使页面端对未变化的行也跳过提取。
+    余票变化（appeared / gone）与上一轮看到的各车次状态比较，换缓存键不影响；第一轮只作为基线，不报告变化，
+    空表（页面繁忙）不更新基线。
+    """
+
+    def __init__(self):
+        self._rows = {}
+        self._seen = None
+        self._table = None
+        self.key = None
+        self._rekey()
+        self.parsed = 0
+        self.reused = 0
+
+    def _rekey(self):
+        self.key = f'rd{next(_differ_ids)}-{time.monotonic_ns()}'
+        self._rows = {}
+
+    def update(self, snapshot, at=None):
+        """用一轮快照更新，返回 (TrainTable, PollDiff)"""
+        at = time.time() if at is None else at
+        rows, changed, appeared, gone = [], [], [], []
+        cached = self._rows
+        seen = self._seen
+        current = {}
+        skipped = set()
+        stale = False
+        for s in snapshot or ():
+            train = s.get('train') or ''
+            seats = s.get('seats')
+            fp = s.get('fp') or (train, tuple(seats or ()), s.get('book') is not None)
+            prev = cached.get(train)
+            if prev is not None and prev[0] == fp:
+                row = prev[1]
+                row.book = s.get('book')
+                self.reused += 1
+            elif seats is None:
+                # 页面端认为未变化，本地却没有缓存：本轮跳过该行，换新缓存键让下一轮整表重取
+                stale = True
+                skipped.add(train)
+                continue
+            else:
+                row = TrainRow(train, s.get('depart'), s.get('arrive'), tuple(seats), s.get('book'))
+                self.parsed += 1
+                changed.append(row)
+                if seen is not None:
+                    old = seen.get(train)
+                    newly = _newly_available(old, row)
+                    if newly:
+                        appeared.append(Appeared(train, row.depart, newly))
+                    elif old is not None and old.bookable and not row.bookable:
+                        gone.append(train)
+            current[train] = (fp, row)
+            rows.append(row)
+        if seen is not None and current:
+            gone.extend(train for train, old in seen.items()
+                        if old.bookable and train not in current and train not in skipped)
+        if changed or self._table is None or len(rows) != len(self._table.rows):
+            self._table = TrainTable(rows)
+        self._rows = current
+        if current or skipped:
+            latest = {train: row for train, (_, row) in current.items()}
+            if seen is not None:
+                latest.update((train, seen[train]) for train in skipped if train in seen)
+            self._seen = latest
+        if stale:
+            self._rekey()
+        return self._table, PollDiff(at, tuple(changed), tuple(appeared), tuple(gone))
+
+
+def _describe_seats(seat_classes):
+    return f" 席别 [{'/'.join(name for name, _ in seat_classes)}]" if seat_classes else ''
+
+
+class TimeRangeStrategy:
+    """时间范围内最早的、所需席别有余票的可预订车次
+
+    seats 为按优先顺序的席别（'二等座/一等座' 或列表），为空时不限席别。
+    """
+    __slots__ = ('start', 'end', 'start_min', 'end_min', 'seat_classes')
+
+    def __init__(self, start_hhmm, end_hhmm, seats=()):
+        self.start, self.end = start_hhmm, end_hhmm
+        self.start_min = hhmm_to_minutes(start_hhmm)
+        self.end_min = hhmm_to_minutes(end_hhmm)
+        if self.start_min is None or self.end_min is None:
+            raise ValueError(f'时间范围格式错误: {start_hhmm}-{end_hhmm}')
+        self.seat_classes = parse_seat_classes(seats)
+
+    def pick(self, table):
+        for r in table.departing_between(self.start_min, self.end_min):
+            if r.book is not None and r.first_available(self.seat_classes) is not None:
+                return r
+        return None
+
+    def seat_for(self, row):
+        """row 上将要预订的席别名（未限定席别时为 ''）"""
+        return row.first_available(self.seat_classes)
+
+    def relevant(self, row):
+        """row 变化时是否可能改变选择结果"""
+        return row.depart_min is not None and self.start_min <= row.depart_min <= self.end_min
+
+    def describe(self):
+        return f'时间范围 [{self.start} - {self.end}]' + _describe_seats(self.seat_classes)
+
+
+class TrainNumberStrategy:
+    """按优先顺序匹配指定车次中所需席别有余票的任意一个"""
+    __slots__ = ('targets', 'seat_classes')
+
+    def __init__(self, targets, seats=()):
+        self.targets = parse_train_numbers(targets) if isinstance(targets, str) else tuple(targets)
+        if not self.targets:
+            raise ValueError('未设置目标车次')
+        self.seat_classes = parse_seat_classes(seats)
+
+    def pick(self, table):
+        for t in self.targets:
+            r = table.by_train.get(t)
+            if r is not None and r.book is not None and r.first_available(self.seat_classes) is not None:
+                return r
+        return None
+
+    def seat_for(self, row):
+        return row.first_available(self.seat_classes)
+
+    def relevant(self, row):
+        return row.train in self.targets
+
+    def describe(self):
+        return f"指定车次 [{'/'.join(self.targets)}]" + _describe_seats(self.seat_classes)
+
+
+class PriorityStrategy:
+    """按优先顺序的多个目标（车次或时间范围 + 席别），返回第一个命中目标选中的车次"""
+    __slots__ = ('targets',)
+
+    def __init__(self, targets):
+        self.targets = tuple(targets)
+        if not self.targets:
+            raise ValueError('未设置抢票目标')
+
+    def pick(self, table):
+        for t in self.targets:
+            r = t.pick(table)
+            if r is not None:
+                return r
+        return None
+
+    def seat_for(self, row):
+        """第一个会选中 row 的目标所要的席别"""
+        table = TrainTable([row])
+        for t in self.targets:
+            if t.pick(table) is row:
+                return t.seat_for(row)
+        return None
+
+    def relevant(self, row):
+        return any(t.relevant(row) for t in self.targets)
+
+    @property
+    def seat_classes(self):
+        """全部目标席别的并集（保持优先顺序），供订单页选择席别"""
+        out = []
+        for t in self.targets:
+            out.extend(sc for sc in t.seat_classes if sc not in out)
+        return tuple(out)
+
+    def describe(self):
+        return '多目标 ' + ' > '.join(t.describe() for t in self.targets)
+
+
+def compile_target(target, default_seats=()):
+    """单个目标（{"train": "G1/G2"} 或 {"start": "07:00", "end": "09:00"}，可带 "seats"）转为策略对象"""
+    seats = target.get('seats', default_seats)
+    if target.get('train'):
+        return TrainNumberStrategy(target['train'], seats)
+    return TimeRangeStrategy(target.get('start', '00:00'), target.get('end', '23:59'), seats)
+
+
+def compile_strategy(params):
+    """根据抢票参数构建策略对象（每次抢票只构建一次）
+
+    booking_targets 非空时为多目标优先级列表，每项为 {"train": "G1/G2"} 或 {"start": "07:00", "end": "09:00"}，
+    可带 "seats"；未带 seats 的目标及单目标策略使用 seat_category。
+    """
+    seats = params.get('seat_category') or ()
+    targets = params.get('booking_targets')
+    if targets:
+        return PriorityStrategy([compile_target(t, seats) for t in targets])
+    ttn = (params.get('target_train_number') or '').strip()
+    if ttn:
+        return TrainNumberStrategy(ttn, seats)
+    tr = params['depart_time_range']
+    return TimeRangeStrategy(tr['start'], tr['end'], seats)
@@ -0,0 +1,171 @@
+"""
+鲸介12306 抢票助手 - 开售前预热
+
+开售前 warmup_seconds 秒（默认 30 秒）执行一次预热，把首次查询路径上能提前做的事都做完：
+    1. 在购票页内请求登录配置接口：既校验会话仍然有效，也让浏览器建立好到 12306 的连接；
+    2. 预先解析 DNS（接口直连模式还会用一次 HEAD 请求预热长连接池）；
+    3. 检查购票页仍在、查询按钮存在、出发/到达站和日期未被重置，否则由调用方重新填写。
+预热后到开售前每隔 warmup_keepalive 秒在页面内发一次保活请求，避免连接空闲被服务端关闭，
+开售时刻只剩点击查询一个动作。
+
+开源协议：MIT License
+"""
+import socket
+import time
+from urllib.parse import urlsplit
+
+from cancellation import NEVER_CANCELLED
+
+DEFAULT_WARMUP_SECONDS = 30.0
+DEFAULT_KEEPALIVE_INTERVAL = 10.0
+# 最后一次保活距开售至少留出的时间（秒），避免与开售时的查询请求争用连接
+KEEPALIVE_GUARD = 2.0
+WARMUP_HOSTS = ('kyfw.12306.cn',)
+
+# 页面内请求登录配置接口，返回 [HTTP 状态, 是否登录(未知为 null), 耗时 ms]
+_PING_JS = """
+var done = arguments[arguments.length - 1], t0 = performance.now();
+var x = new XMLHttpRequest();
+x.open('POST', '/otn/login/conf');
+x.timeout = 3000;
+x.setRequestHeader('X-Requested-With', 'XMLHttpRequest');
+x.onload = function () {
+  var ok = null;
+  try { var d = JSON.parse(x.responseText).data; if (d) ok = d.is_login === 'Y'; } catch (e) {}
+  done([x.status, ok, performance.now() - t0]);
+};
+x.onerror = x.ontimeout = function () { done([0, null, performance.now() - t0]); };
+x.send();
+"""
+
+# 购票页表单状态：[在购票页, 有查询按钮, 出发站电报码, 到达站电报码, 出发日期]
+_FORM_STATE_JS = """
+function v(id) { var e = document.getElementById(id); return e ? e.value : ''; }
+return [location.pathname.indexOf('/otn/leftTicket/init') >= 0, !!document.getElementById('query_ticket'),
+        v('fromStation'), v('toStation'), v('train_date')];
+"""
+
+
+def resolve_hosts(hosts=WARMUP_HOSTS):
+    """预先解析域名，让系统 DNS 缓存命中；返回总耗时 ms，解析失败的域名忽略"""
+    t0 = time.perf_counter()
+    for host in hosts:
+        try:
+            socket.getaddrinfo(host, 443, type=socket.SOCK_STREAM)
+        except OSError:
+            pass
+    return (time.perf_counter() - t0) * 1000
+
+
+def page_ping(driver, timeout=5.0):
+    """在页面内请求登录配置接口，返回 (HTTP 状态, 是否登录, 耗时 ms)；请求失败时状态为 0"""
+    if driver.timeouts.script < timeout:
+        driver.set_script_timeout(timeout)
+    status, logged_in, ms = driver.execute_async_script(_PING_JS)
+    return int(status), logged_in, float(ms)
+
+
+class WarmupReport:
+    __slots__ = ('session_ok', 'ping_ms', 'dns_ms', 'pool_ms', 'page_ready', 'problem')
+
+    def __init__(self):
+        self.session_ok = None
+        self.ping_ms = None
+        self.dns_ms = None
+        self.pool_ms = None
+        self.page_ready = False
+        self.problem = ''
+
+    def describe(self):
+        parts = [{True: '会话有效', False: '会话已失效', None: '会话状态未知'}[self.session_ok]]
+        if self.ping_ms is not None:
+            parts.append(f'页面连接 {self.ping_ms:.0f}ms')
+        if self.dns_ms is not None:
+            parts.append(f'DNS {self.dns_ms:.0f}ms')
+        if self.pool_ms is not None:
+            parts.append(f'接口连接 {self.pool_ms:.0f}ms')
+        parts.append('查询页就绪' if self.page_ready else f'查询页需重新填写（{self.problem}）')
+        return '，'.join(parts)
+
+
+class Warmup:
+    """开售前预热；engine 为接口直连模式的 TicketQueryEngine（浏览器查询模式为 None）
+
+    expect 为期望的表单值 {'from': 电报码, 'to': 电报码, 'date': 日期}，值为空表示只要求非空。
+    """
+
+    def __init__(self, driver, expect, engine=None, cancel=NEVER_CANCELLED, hosts=None):
+        self.driver = driver
+        self.expect = expect
+        self.engine = engine
+        self.cancel = cancel
+        self.hosts = hosts
+        self.pings = 0
+
+    def _hosts(self):
+        if self.hosts is not None:
+            return self.hosts
+        hosts = list(WARMUP_HOSTS)
+        if self.engine is not None:
+            host = urlsplit(self.engine.base_url).hostname
+            if host and host not in hosts:
+                hosts.append(host)
+        return hosts
+
+    def check_page(self):
+        """检查购票页表单，返回问题描述，就绪时返回空字符串"""
+        on_page, has_button, from_code, to_code, date = self.driver.execute_script(_FORM_STATE_JS)
+        if not on_page:
+            return '不在购票页'
+        if not has_button:
+            return '缺少查询按钮'
+        for label, key, value in (('出发站', 'from', from_code), ('到达站', 'to', to_code), ('日期', 'date', date)):
+            want = self.expect.get(key)
+            if not value or (want and value != want):
+                return f'{label}已被重置'
+        return ''
+
+    def run(self):
+        """执行一次预热，返回 WarmupReport；各项失败只记录，不中断抢票"""
+        report = WarmupReport()
+        self.cancel.check()
+        try:
+            status, report.session_ok, report.ping_ms = page_ping(self.driver)
+            if status == 0:
+                report.session_ok = None
+            self.pings += 1
+        except Exception as e:
+            print(f'预热会话校验失败：{e}')
+        self.cancel.check()
+        report.dns_ms = resolve_hosts(self._hosts())
+        if self.engine is not None:
+            try:
+                report.pool_ms = self.engine.ping()
+            except Exception as e:
+                print(f'预热接口连接失败：{e}')
+        self.cancel.check()
+        try:
+            report.problem = self.check_page()
+        except Exception as e:
+            report.problem = f'页面检查失败：{e}'
+        report.page_ready = not report.problem
+        return report
+
+    def keep_alive_until(self, deadline, interval=DEFAULT_KEEPALIVE_INTERVAL):
+        """每隔 interval 秒发一次保活请求，最后一次落在本地时刻 deadline 前 KEEPALIVE_GUARD 秒"""
+        interval = max(float(interval), 1.0)
+        while True:
+            remaining = deadline - KEEPALIVE_GUARD - time.time()
+            if remaining <= 0:
+                return
+            self.cancel.sleep(min(interval, remaining))
+            try:
+                page_ping(self.driver)
+                self.pings += 1
+            except Exception:
+                pass
+            if self.engine is not None:
+                try:
+                    self.engine.ping()
+                except Exception:
+                    pass
@@ -0,0 +1,114 @@
+"""
+鲸介12306 抢票助手 - 多浏览器并行抢票
+
+N 个已登录的浏览器各自独立轮询，按刷新间隔错开相位，等效检测间隔缩短约 N 倍，
+而单个浏览器的请求频率不变。接口直连的多组监控查询按工作者切片。
+
+预订闸门保证只会提交一个订单：点击“预订”前必须先 claim，第一个 claim 的工作者
+独占后续的全部预订与下单步骤（点击失败也不释放），并取消其余工作者的取消令牌，
+使它们立即停止轮询与等待。
+
+开源协议：MIT License
+"""
+import threading
+
+from selenium import webdriver
+
+from booking_core import run_booking_with_driver
+from browser_session import HOME_URL, apply_lean_mode, copy_session, edge_options, lean_settings
+from cancellation import CancelToken
+
+# 错开相位所依据的刷新周期（秒），对应 refresh_scheduler 两种模式的典型间隔
+DEFAULT_STAGGER = {'fixed': 3.0, 'adaptive': 0.45}
+
+
+class BookingGate:
+    """多个工作者共享的预订闸门；tokens 为各工作者的取消令牌"""
+
+    def __init__(self, tokens):
+        self._lock = threading.Lock()
+        self.tokens = list(tokens)
+        self.owner = None
+
+    def claim(self, worker):
+        """申请预订权；第一个申请者获得并一直持有，同时取消其余工作者"""
+        with self._lock:
+            if self.owner is None:
+                self.owner = worker
+                for i, token in enumerate(self.tokens):
+                    if i != worker:
+                        token.cancel()
+            return self.owner == worker
+
+    def handle(self, worker):
+        return GateHandle(self, worker)
+
+
+class GateHandle:
+    """单个工作者看到的闸门，传给轮询循环和 run_booking_with_driver"""
+
+    def __init__(self, gate, worker):
+        self.gate = gate
+        self.worker = worker
+
+    def claim(self):
+        return self.gate.claim(self.worker)
+
+    @property
+    def owns(self):
+        return self.gate.owner == self.worker
+
+
+def clone_logged_in_driver(driver, params=None):
+    """新开一个浏览器并复用 driver 的登录会话，停在 12306 首页；沿用 params 中的精简模式设置"""
+    lean = lean_settings(params or {})
+    clone = webdriver.Edge(options=edge_options(None, lean['lean'], lean['headless']))
+    try:
+        if lean['lean']:
+            apply_lean_mode(clone, lean['blocked'])
+        copied = copy_session(driver, clone)
+        clone.get(HOME_URL)
+        print(f'✓ 已打开并行浏览器，复制 {copied} 个 Cookie')
+        return clone
+    except Exception:
+        clone.quit()
+        raise
+
+
+class WorkerPool:
+    """在多个已登录浏览器上并行执行 run_booking_with_driver，第一个开始预订者胜出"""
+
+    def __init__(self, drivers, params, stagger=None, cancel=None):
+        self.drivers = list(drivers)
+        self.params = params
+        mode = 'fixed' if params.get('refresh_mode') == 'fixed' else 'adaptive'
+        self.stagger = float(stagger if stagger is not None else params.get('stagger_seconds') or DEFAULT_STAGGER[mode])
+        self.cancel_token = cancel or CancelToken()
+        self.tokens = [self.cancel_token.child() for _ in self.drivers]
+        self.gate = BookingGate(self.tokens)
+        self.errors = {}
+
+    def _run_worker(self, i, driver):
+        n = len(self.drivers)
+        params = dict(self.params, worker_slice=(i, n))
+        try:
+            run_booking_with_driver(driver, params, cancel=self.tokens[i], gate=self.gate.handle(i),
+                                    phase=self.stagger * i / n)
+        except Exception as e:
+            self.errors[i] = e
+            print(f'[窗口{i}] 抢票出错: {e}')
+
+    def run(self):
+        """阻塞直到所有工作者结束，返回胜出工作者的序号（无人预订时为 None）"""
+        n = len(self.drivers)
+        print(f'并行 {n} 个浏览器，相位间隔 {self.stagger / n:.2f}s')
+        threads = [threading.Thread(target=self._run_worker, args=(i, d), name=f'booking-worker-{i}', daemon=True)
+                   for i, d in enumerate(self.drivers)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        return self.gate.owner
+
+    def cancel(self):
+        self.cancel_token.cancel()